@@ -1,5 +1,6 @@
 import sys
 import os
+import shutil
 import chainlit as cl
 from langchain_core.messages import HumanMessage
 
@@ -62,7 +63,9 @@ async def on_message(message: cl.Message):
         
         inputs = {
             "question": message.content,
-            "messages": history
+            "messages": history,
+            # Sin checkpointer: la continuación del último resultado ("más") vive en la sesión
+            "continuation": cl.user_session.get("continuation")
         }
         
         # Feedback visual
@@ -70,19 +73,22 @@ async def on_message(message: cl.Message):
         await msg.update()
         
         # Ejecución del Grafo (Async)
-        config = {"recursion_limit": 50} # Límite de seguridad
+        # thread_id = sesión de Chainlit: trazas y equidad del planificador de LLM por usuario
+        config = {"recursion_limit": 50, "configurable": {"thread_id": cl.context.session.id}} # Límite de seguridad
         result = await graph.ainvoke(inputs, config=config)
         
         # Actualizar historial con lo que devolvió el agente (incluye ToolMessages, AIMessages, etc)
         new_history = result["messages"]
         cl.user_session.set("history", new_history)
+        cl.user_session.set("continuation", result.get("continuation"))
         
         # Extraer última respuesta del asistente
         # LangGraph devuelve toda la lista, el último debe ser AIMessage
         final_response_content = new_history[-1].content
         
-        # Enviar respuesta final
+        # Enviar respuesta final (con exportación del resultado completo si hubo SQL)
         msg.content = final_response_content
+        msg.actions = export_actions(result)
         await msg.update()
         
     except Exception as e:
@@ -90,3 +96,51 @@ async def on_message(message: cl.Message):
         msg.content = error_msg
         await msg.update()
         print(f"Error en Chainlit handler: {e}")
+
+# --- EXPORTACIÓN (CSV / PARQUET) ---
+
+def export_actions(result: dict) -> list:
+    """Botones de exportación bajo una respuesta SQL exitosa (la consulta queda en la sesión)."""
+    from sql_agent.core.result import QueryResult
+    from sql_agent.database.export import ResultExporter
+
+    query_result = QueryResult.from_payload(result.get("query_result"))
+    if result.get("intent") != "DATABASE" or not query_result or not query_result.ok or not query_result.row_count:
+        return []
+    cl.user_session.set("export_sql", result.get("sql_query"))
+    return [
+        cl.Action(name="export_result", payload={"format": fmt}, label=f"⬇️ Exportar {fmt.upper()}")
+        for fmt in ResultExporter.formats()
+    ]
+
+@cl.action_callback("export_result")
+async def on_export(action: cl.Action):
+    """Exporta el resultado completo de la última consulta y lo adjunta como archivo."""
+    from sql_agent.database.export import ResultExporter
+
+    sql = cl.user_session.get("export_sql")
+    if not sql:
+        await cl.Message(content="⚠️ No hay una consulta para exportar.").send()
+        return
+
+    fmt = action.payload.get("format", "csv")
+    msg = cl.Message(content=f"⏳ _Exportando el resultado completo a {fmt.upper()}..._")
+    await msg.send()
+    try:
+        summary = await ResultExporter.export(sql, fmt)
+    except Exception as e:
+        msg.content = f"❌ **No se pudo exportar:** {e}"
+        await msg.update()
+        return
+
+    try:
+        rows = f"{summary.rows:,}".replace(",", ".")
+        note = " (recortado a `export.max_rows`)" if summary.truncated else ""
+        await cl.Message(
+            content=f"📁 **{summary.filename}**: {rows} filas · {summary.bytes / 1_048_576:.1f} MB{note}",
+            elements=[cl.File(name=summary.filename, path=summary.path, display="inline")],
+        ).send()
+        await msg.remove()
+    finally:
+        # Chainlit ya copió el archivo a su almacenamiento de sesión
+        shutil.rmtree(os.path.dirname(summary.path), ignore_errors=True)
@@ -0,0 +1,5 @@
+"""
+Benchmark offline del SQL Agent.
+Modelo de chat falso (latencia configurable) + SQLite sembrada desde
+business_context.yaml para medir el camino caliente sin red ni MySQL.
+"""
@@ -0,0 +1,54 @@
+"""
+Uso:
+    python -m benchmarks --turns 200 --concurrency 16 --latency-ms 40
+    python -m benchmarks --save-baseline          # guarda benchmarks/baseline.json
+    python -m benchmarks --tolerance 0.25         # compara contra la línea base
+"""
+import sys
+import json
+import asyncio
+import argparse
+
+from benchmarks.harness import (
+    DEFAULT_BASELINE, DEFAULT_DB_PATH, compare_to_baseline, load_baseline, run_benchmark, save_baseline,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline del SQL Agent (LLM falso + SQLite)")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia simulada del LLM falso")
+    parser.add_argument("--rows", type=int, default=500, help="Filas sintéticas por tabla")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"🏁 Benchmark: {args.turns} turnos | concurrencia {args.concurrency} | LLM {args.latency_ms}ms")
+    report = asyncio.run(run_benchmark(args.turns, args.concurrency, args.latency_ms, args.rows, args.db_path))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"💾 Línea base guardada en {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("ℹ️ Sin línea base: ejecuta con --save-baseline para crearla.")
+        return 0
+
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print("❌ Regresiones detectadas:")
+        for line in regressions:
+            print(f"   - {line}")
+        return 1
+    print("✅ Sin regresiones respecto a la línea base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Corpus de preguntas de negocio (español) para el benchmark offline.
+Cada entrada define la intención y el SQL (compatible con SQLite) que
+devolverá el modelo falso, de modo que el camino caliente sea determinista.
+"""
+
+CORPUS = [
+    {
+        "question": "¿Cuántos usuarios activos hay?",
+        "intent": "DATABASE",
+        "sql": "SELECT COUNT(*) FROM users WHERE status = '1'",
+    },
+    {
+        "question": "¿Cuál es la deuda total de los usuarios?",
+        "intent": "DATABASE",
+        "sql": "SELECT SUM(balance) AS total_debt FROM users",
+    },
+    {
+        "question": "¿Qué comercios tienen más ventas?",
+        "intent": "DATABASE",
+        "sql": (
+            "SELECT m.trade_name, SUM(p.total) AS sales FROM purchase p "
+            "JOIN merchant m ON p.merchant_id = m.uuid "
+            "GROUP BY m.trade_name ORDER BY sales DESC LIMIT 5"
+        ),
+    },
+    {
+        "question": "¿Cuántas cuotas pendientes hay?",
+        "intent": "DATABASE",
+        "sql": "SELECT COUNT(*) FROM purchase_payment WHERE type = 'quote' AND status = '0'",
+    },
+    {
+        "question": "Muéstrame los últimos pagos verificados",
+        "intent": "DATABASE",
+        "sql": "SELECT reference, amount, created_at FROM payment_checked ORDER BY created_at DESC LIMIT 40",
+    },
+    {
+        "question": "¿Cuál es la tasa de aprobación de solicitudes?",
+        "intent": "DATABASE",
+        "sql": (
+            "SELECT COUNT(CASE WHEN status = '1' THEN 1 END) * 1.0 / COUNT(*) AS approval_rate "
+            "FROM purchase_intent"
+        ),
+    },
+    {
+        "question": "¿Cuántos usuarios tienen score mayor a 500?",
+        "intent": "DATABASE",
+        "sql": "SELECT COUNT(*) FROM users_score WHERE score > 500",
+    },
+    {
+        "question": "Explica por qué sube la morosidad de las cuotas",
+        "intent": "DATABASE",
+        "sql": "SELECT status, COUNT(*) AS total_quotes FROM purchase_payment WHERE type = 'quote' GROUP BY status",
+    },
+    {
+        "question": "Dame el límite de crédito promedio por nivel de score",
+        "intent": "DATABASE",
+        # Columna inexistente a propósito: ejercita el Self-Healing (reintentos)
+        "sql": "SELECT AVG(credit_limit_avg) FROM users",
+    },
+    {
+        "question": "Hola, buenos días",
+        "intent": "GENERAL",
+        "sql": None,
+    },
+]
@@ -0,0 +1,175 @@
+"""
+Harness del benchmark offline: ejecuta `build_graph()` contra el modelo falso
+y una base SQLite sembrada, reproduce el corpus con concurrencia configurable
+y reporta percentiles por nodo, throughput y crecimiento de memoria.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+CONTEXT_PATH = os.path.join(ROOT_DIR, "config", "business_context.yaml")
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, "logs", "benchmark.db")
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+
+
+def configure_offline_env(db_path: str, latency_ms: float):
+    """Variables de entorno para modo offline (antes de importar sql_agent.graph)."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por interpolación lineal (pct en 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+        for name, values in sorted(samples.items())
+    }
+
+
+async def run_benchmark(turns: int = 100, concurrency: int = 8, latency_ms: float = 50.0,
+                        rows_per_table: int = 500, db_path: str = DEFAULT_DB_PATH) -> Dict[str, Any]:
+    from benchmarks.seed import seed_sqlite
+    from benchmarks.corpus import CORPUS
+
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    seed_sqlite(db_path, CONTEXT_PATH, rows_per_table=rows_per_table)
+    configure_offline_env(db_path, latency_ms)
+
+    from langchain_core.messages import HumanMessage
+    from langgraph.checkpoint.memory import MemorySaver
+    from sql_agent.graph import build_graph
+    from sql_agent.llm.fake import FakeChatModel
+    from sql_agent.database.connection import DatabaseManager
+    from sql_agent.semantic.entity_index import EntityIndex
+    from sql_agent.utils import metrics, tracing
+    from sql_agent.utils.executor import LoopLagMonitor
+
+    for item in CORPUS:
+        FakeChatModel.script(item["question"], item["sql"], item["intent"])
+
+    spans: Dict[str, List[float]] = defaultdict(list)
+    prompt_tokens: Dict[str, Dict[str, int]] = defaultdict(lambda: {"prompt": 0, "cached": 0})
+
+    def collect(record: Dict[str, Any]):
+        if "duration_ms" in record:
+            spans[f"{record['kind']}:{record['name']}"].append(record["duration_ms"])
+        if record.get("kind") == "llm" and record.get("prompt_tokens"):
+            tokens = prompt_tokens[record.get("node", "-")]
+            tokens["prompt"] += record["prompt_tokens"]
+            tokens["cached"] += record.get("cached_tokens", 0)
+
+    graph = build_graph(checkpointer=MemorySaver())
+    tracing.add_listener(collect)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    turn_latencies: List[float] = []
+    errors = 0
+
+    async def one_turn(i: int):
+        nonlocal errors
+        item = CORPUS[i % len(CORPUS)]
+        inputs = {
+            "question": item["question"],
+            "messages": [HumanMessage(content=item["question"])],
+            "intent": "", "sql_query": "", "sql_result": "", "query_result": None, "iterations": 0,
+        }
+        # Un hilo por "usuario" simulado (la memoria crece como en el bridge)
+        config = {"configurable": {"thread_id": f"bench-{i % (concurrency * 4)}"}}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await graph.ainvoke(inputs, config=config)
+            except Exception as e:
+                errors += 1
+                print(f"   ❌ Turno {i} falló: {e}")
+            turn_latencies.append((time.perf_counter() - start) * 1000)
+
+    # Calentamiento (compilación, primer connect) fuera de la medición
+    await one_turn(0)
+    turn_latencies.clear()
+    spans.clear()
+    prompt_tokens.clear()
+
+    tracemalloc.start()
+    mem_start, _ = tracemalloc.get_traced_memory()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_turn(i) for i in range(turns)))
+    wall = time.perf_counter() - wall_start
+    mem_end, mem_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracing.remove_listener(collect)
+    await EntityIndex.stop()
+    await LoopLagMonitor.stop()
+    await DatabaseManager.close()
+
+    return {
+        "config": {"turns": turns, "concurrency": concurrency, "latency_ms": latency_ms,
+                   "rows_per_table": rows_per_table},
+        "throughput_tps": round(turns / wall, 2) if wall else 0.0,
+        "wall_s": round(wall, 3),
+        "errors": errors,
+        "turn": summarize({"turn": turn_latencies})["turn"],
+        "spans": summarize(spans),
+        "loop_stalls": int(metrics.LOOP_STALLS.value()),
+        # Fracción del prompt servida desde la caché de prefijos, por nodo
+        "prompt_cache": {
+            node: {**tokens, "hit_ratio": round(tokens["cached"] / tokens["prompt"], 3)}
+            for node, tokens in sorted(prompt_tokens.items())
+        },
+        "memory": {
+            "growth_kb": round((mem_end - mem_start) / 1024, 1),
+            "peak_kb": round(mem_peak / 1024, 1),
+        },
+    }
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Lista de regresiones: p95 por span/turno o throughput peor que la línea base ± tolerancia."""
+    regressions = []
+    for name, stats in baseline.get("spans", {}).items():
+        current = report["spans"].get(name)
+        if current and stats.get("p95_ms") and current["p95_ms"] > stats["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > {stats['p95_ms']}ms (+{int(tolerance * 100)}%)")
+    base_turn = baseline.get("turn", {}).get("p95_ms")
+    if base_turn and report["turn"]["p95_ms"] > base_turn * (1 + tolerance):
+        regressions.append(f"turn: p95 {report['turn']['p95_ms']}ms > {base_turn}ms")
+    base_tps = baseline.get("throughput_tps")
+    if base_tps and report["throughput_tps"] < base_tps * (1 - tolerance):
+        regressions.append(f"throughput: {report['throughput_tps']} tps < {base_tps} tps")
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
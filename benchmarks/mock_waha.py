@@ -0,0 +1,79 @@
+"""
+Servidor WAHA simulado (aiohttp) para load tests offline del bridge.
+Acepta sendText y startTyping/stopTyping y registra cada entrega con su
+instante de llegada para medir latencia extremo a extremo.
+"""
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+@dataclass
+class Delivery:
+    chat_id: str
+    text: str
+    received_at: float
+
+
+@dataclass
+class MockWahaServer:
+    host: str = "127.0.0.1"
+    port: int = 0
+    deliveries: List[Delivery] = field(default_factory=list)
+    typing_events: List[Dict[str, Any]] = field(default_factory=list)
+    _runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _send_text(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.deliveries.append(Delivery(body.get("chatId", ""), body.get("text", ""), time.perf_counter()))
+        return web.json_response({"id": f"mock-{len(self.deliveries)}"}, status=201)
+
+    async def _typing(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.typing_events.append({
+            "chat_id": body.get("chatId", ""),
+            "action": request.match_info["action"],
+            "at": time.perf_counter(),
+        })
+        return web.json_response({"result": True})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/sendText", self._send_text)
+        app.router.add_post("/api/{action:startTyping|stopTyping}", self._typing)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Puerto real si se pidió 0 (asignación automática)
+        self.port = site._server.sockets[0].getsockname()[1]
+        print(f"📱 Mock WAHA escuchando en {self.base_url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def wait_for(self, expected: int, timeout: float) -> bool:
+        """Espera hasta recibir `expected` entregas o agotar el timeout."""
+        deadline = time.perf_counter() + timeout
+        while len(self.deliveries) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        return len(self.deliveries) >= expected
+
+
+async def serve_forever(port: int):
+    server = MockWahaServer(port=port)
+    await server.start()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
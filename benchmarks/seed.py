@@ -0,0 +1,108 @@
+"""
+Genera una base SQLite de prueba a partir de los `models` de business_context.yaml.
+Los datos son sintéticos y deterministas (semilla fija).
+"""
+import os
+import uuid
+import random
+import sqlite3
+import datetime
+from typing import Any, Dict, List
+
+import yaml
+
+NUMERIC_TYPES = ("number", "custom", "sum", "avg", "max", "min", "count")
+WORDS = ["Farma", "Todo", "Central", "Plaza", "Express", "Market", "Tech", "Moda", "Casa", "Salud"]
+
+
+def _table_name(model: Dict[str, Any]) -> str:
+    return model["source"].split(".")[-1]
+
+
+def _columns(model: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Columnas físicas del modelo (entities + dimensions + measures con 'col')."""
+    columns: Dict[str, Dict[str, Any]] = {"id": {"type": "id"}, "uuid": {"type": "uuid"}}
+    for entity in model.get("entities", []) or []:
+        if entity.get("col") and entity["col"] not in columns:
+            columns[entity["col"]] = {"type": "fk" if entity.get("type") == "foreign" else "uuid",
+                                      "entity": entity.get("name")}
+    for dim in model.get("dimensions", []) or []:
+        if dim.get("col"):
+            columns.setdefault(dim["col"], {"type": dim.get("type", "string"),
+                                            "allowed": dim.get("allowed_values")})
+    for measure in model.get("measures", []) or []:
+        if measure.get("col"):
+            columns.setdefault(measure["col"], {"type": "number"})
+    # Columnas usadas por las fórmulas SQL virtuales del contexto
+    if _table_name(model) == "purchase":
+        columns.setdefault("initial_fee", {"type": "number"})
+    if _table_name(model) == "purchase_payment":
+        columns.setdefault("valid_until_time", {"type": "epoch"})
+    return columns
+
+
+def _sql_type(spec: Dict[str, Any]) -> str:
+    if spec["type"] in ("id", "epoch"):
+        return "INTEGER"
+    if spec["type"] in NUMERIC_TYPES:
+        return "REAL"
+    return "TEXT"
+
+
+def _value(spec: Dict[str, Any], rng: random.Random, row: int, fk_pool: Dict[str, List[str]]) -> Any:
+    kind = spec["type"]
+    if kind == "id":
+        return row + 1
+    if kind == "uuid":
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+    if kind == "fk":
+        pool = fk_pool.get(spec.get("entity")) or []
+        return rng.choice(pool) if pool else str(uuid.UUID(int=rng.getrandbits(128)))
+    if spec.get("allowed"):
+        return str(rng.choice(spec["allowed"]))
+    if kind in NUMERIC_TYPES:
+        return round(rng.uniform(0, 2000), 2)
+    if kind == "time":
+        base = datetime.datetime(2025, 1, 1)
+        return (base + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365))).isoformat(sep=" ")
+    if kind == "epoch":
+        return int(datetime.datetime(2025, 1, 1).timestamp()) + rng.randint(0, 86400 * 400)
+    if kind == "categorical":
+        return str(rng.randint(0, 2))
+    return f"{rng.choice(WORDS)} {rng.choice(WORDS)} {row}"
+
+
+def seed_sqlite(db_path: str, context_path: str, rows_per_table: int = 500, seed: int = 42) -> Dict[str, int]:
+    """Crea (o recrea) la base SQLite y devuelve {tabla: filas}."""
+    with open(context_path, "r", encoding="utf-8") as f:
+        context = yaml.safe_load(f) or {}
+    models = context.get("models", [])
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = random.Random(seed)
+    fk_pool: Dict[str, List[str]] = {}
+    summary: Dict[str, int] = {}
+
+    # Primero los modelos con entidades primarias para poblar las FKs
+    ordered = sorted(models, key=lambda m: 0 if any(
+        e.get("type") == "primary" for e in m.get("entities", []) or []) else 1)
+
+    with sqlite3.connect(db_path) as conn:
+        for model in ordered:
+            table = _table_name(model)
+            columns = _columns(model)
+            ddl = ", ".join(f'"{name}" {_sql_type(spec)}' for name, spec in columns.items())
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({ddl})')
+
+            rows = [[_value(spec, rng, i, fk_pool) for spec in columns.values()] for i in range(rows_per_table)]
+            placeholders = ", ".join("?" for _ in columns)
+            conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+            summary[table] = len(rows)
+
+            for entity in model.get("entities", []) or []:
+                if entity.get("type") == "primary" and entity.get("col") in columns:
+                    idx = list(columns).index(entity["col"])
+                    fk_pool.setdefault(entity["name"], [r[idx] for r in rows])
+        conn.commit()
+    return summary
@@ -0,0 +1,194 @@
+"""
+Load test del bridge de WhatsApp (/webhook) contra un WAHA simulado.
+
+Modo por defecto (offline): el bridge se importa en proceso con el LLM falso y
+SQLite, y los eventos se envían por ASGI (sin red). Con --target se apunta a un
+bridge ya desplegado (que debe tener WAHA_BASE_URL apuntando a --waha-port).
+
+Uso:
+    python -m benchmarks.webhook_load --users 50 --messages 5 --latency-ms 40
+    python -m benchmarks.webhook_load --target http://localhost:8001 --waha-port 3900
+    python -m benchmarks.webhook_load --mock-waha-only --waha-port 3900
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.harness import CONTEXT_PATH, DEFAULT_DB_PATH, configure_offline_env, summarize
+from benchmarks.mock_waha import MockWahaServer, serve_forever
+
+WEBHOOK_SECRET = "load-test-secret"
+
+# Mensajes que terminan en el resumen del LLM (el modelo falso repite la etiqueta #N)
+LOAD_MESSAGES = [
+    ("Hola, buenos días", "GENERAL", None),
+    ("Explica por qué sube la morosidad de las cuotas", "DATABASE",
+     "SELECT status, COUNT(*) AS total_quotes FROM purchase_payment WHERE type = 'quote' GROUP BY status"),
+    ("Muéstrame los últimos pagos verificados", "DATABASE",
+     "SELECT reference, amount, created_at FROM payment_checked ORDER BY created_at DESC LIMIT 40"),
+]
+
+
+def waha_event(remote_jid: str, text: str, msg_id: str, push_name: str = "Load Test") -> Dict[str, Any]:
+    """Evento `message` tal como lo envía WAHA al webhook."""
+    return {
+        "event": "message",
+        "session": "default",
+        "payload": {
+            "id": msg_id,
+            "timestamp": int(time.time()),
+            "from": remote_jid,
+            "fromMe": False,
+            "body": text,
+            "hasMedia": False,
+            "_data": {"notifyName": push_name},
+        },
+    }
+
+
+class WebhookLoadTest:
+    def __init__(self, users: int, messages: int, think_ms: float, target: Optional[str], seed: int = 7):
+        self.users = users
+        self.messages = messages
+        self.think_ms = think_ms
+        self.target = target
+        self.rng = random.Random(seed)
+        self.sent: Dict[Tuple[str, int], float] = {}
+        self.errors: List[str] = []
+
+    async def _post(self, client, event: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        url = "/webhook" if self.target is None else f"{self.target.rstrip('/')}/webhook"
+        if self.target is None:
+            resp = await client.post(url, params={"secret": WEBHOOK_SECRET}, json=event)
+            return resp.status_code, resp.json()
+        async with client.post(url, params={"secret": WEBHOOK_SECRET}, json=event) as resp:
+            return resp.status, await resp.json(content_type=None)
+
+    async def _user(self, client, index: int):
+        jid = f"58414{index:07d}@c.us"
+        tasks = []
+        for seq in range(1, self.messages + 1):
+            question = LOAD_MESSAGES[(index + seq) % len(LOAD_MESSAGES)][0]
+            event = waha_event(jid, f"{question} #{seq}", f"{jid}-{seq}", f"Usuario {index}")
+            self.sent[(jid, seq)] = time.perf_counter()
+            # WAHA dispara el webhook al llegar cada mensaje, sin esperar la respuesta anterior
+            tasks.append(asyncio.create_task(self._send(client, event)))
+            await asyncio.sleep(self.rng.expovariate(1000.0 / self.think_ms) if self.think_ms else 0)
+        await asyncio.gather(*tasks)
+
+    async def _send(self, client, event: Dict[str, Any]):
+        try:
+            status, body = await self._post(client, event)
+            if status != 200 or body.get("status") != "processed":
+                self.errors.append(f"{status}: {body}")
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+    async def run(self, client) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._user(client, i) for i in range(self.users)))
+        return time.perf_counter() - start
+
+    def report(self, waha: MockWahaServer, wall: float) -> Dict[str, Any]:
+        latencies: List[float] = []
+        delivered_tags = defaultdict(list)
+        for delivery in waha.deliveries:
+            match = re.search(r"#(\d+)", delivery.text)
+            if not match:
+                continue
+            seq = int(match.group(1))
+            delivered_tags[delivery.chat_id].append(seq)
+            sent_at = self.sent.get((delivery.chat_id, seq))
+            if sent_at is not None:
+                latencies.append((delivery.received_at - sent_at) * 1000)
+
+        # Violación de orden: una respuesta llega antes que la de un mensaje anterior del mismo usuario
+        violations = 0
+        for seqs in delivered_tags.values():
+            violations += sum(1 for a, b in zip(seqs, seqs[1:]) if b < a)
+
+        total = self.users * self.messages
+        delivered = len(waha.deliveries)
+        return {
+            "config": {"users": self.users, "messages_per_user": self.messages, "think_ms": self.think_ms,
+                       "mode": "asgi" if self.target is None else self.target},
+            "events_sent": total,
+            "replies_delivered": delivered,
+            "dropped": max(total - delivered, 0),
+            "errored": len(self.errors),
+            "error_samples": self.errors[:5],
+            "messages_per_s": round(delivered / wall, 2) if wall else 0.0,
+            "wall_s": round(wall, 3),
+            "reply_latency": summarize({"reply": latencies}).get("reply", {}),
+            "ordering_violations": violations,
+            "typing_events": len(waha.typing_events),
+        }
+
+
+async def run_load_test(users: int, messages: int, think_ms: float, latency_ms: float,
+                        target: Optional[str], waha_port: int, drain_s: float) -> Dict[str, Any]:
+    waha = MockWahaServer(port=waha_port)
+    await waha.start()
+    test = WebhookLoadTest(users, messages, think_ms, target)
+
+    try:
+        if target is None:
+            from benchmarks.seed import seed_sqlite
+            import httpx
+
+            os.makedirs(os.path.dirname(DEFAULT_DB_PATH), exist_ok=True)
+            seed_sqlite(DEFAULT_DB_PATH, CONTEXT_PATH)
+            configure_offline_env(DEFAULT_DB_PATH, latency_ms)
+            os.environ["WAHA_BASE_URL"] = waha.base_url
+            os.environ["AGENT_API_KEY"] = WEBHOOK_SECRET
+
+            from sql_agent.llm.fake import FakeChatModel
+            for question, intent, sql in LOAD_MESSAGES:
+                FakeChatModel.script(question, sql, intent)
+            from api.webhook import app
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bridge", timeout=None) as client:
+                wall = await test.run(client)
+        else:
+            import aiohttp
+            async with aiohttp.ClientSession() as client:
+                wall = await test.run(client)
+
+        await waha.wait_for(users * messages, timeout=drain_s)
+        return test.report(waha, wall)
+    finally:
+        await waha.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test del webhook de WhatsApp con WAHA simulado")
+    parser.add_argument("--users", type=int, default=20, help="remote_jid simulados")
+    parser.add_argument("--messages", type=int, default=5, help="Mensajes por usuario")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Pausa media entre mensajes de un usuario")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia del LLM falso (modo offline)")
+    parser.add_argument("--target", default=None, help="URL de un bridge desplegado (omite el modo en proceso)")
+    parser.add_argument("--waha-port", type=int, default=0)
+    parser.add_argument("--drain-s", type=float, default=30.0, help="Espera máxima de respuestas pendientes")
+    parser.add_argument("--mock-waha-only", action="store_true", help="Solo levanta el WAHA simulado")
+    args = parser.parse_args()
+
+    if args.mock_waha_only:
+        asyncio.run(serve_forever(args.waha_port))
+        return 0
+
+    report = asyncio.run(run_load_test(args.users, args.messages, args.think_ms, args.latency_ms,
+                                       args.target, args.waha_port, args.drain_s))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["errored"] or report["dropped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Escalado del bridge multi-worker: throughput del webhook con 1..N workers.
+
+Cada corrida levanta `python -m api.cluster --workers N` (LLM falso + SQLite +
+checkpointer SQLite compartido) detrás de un WAHA simulado y reutiliza el load
+test de `benchmarks.webhook_load` contra el dispatcher.
+
+Uso:
+    python -m benchmarks.worker_scaling --workers 1,2,4 --users 40 --messages 5 --latency-ms 5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from typing import Any, Dict, List
+
+from benchmarks.harness import CONTEXT_PATH, DEFAULT_DB_PATH, ROOT_DIR
+from benchmarks.webhook_load import LOAD_MESSAGES, WEBHOOK_SECRET, run_load_test
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(url: str, timeout: float = 90.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"El bridge no respondió en {url} tras {timeout:.0f}s")
+
+
+def _cluster_env(workdir: str, waha_port: int, latency_ms: float, script_path: str) -> Dict[str, str]:
+    return dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join([os.path.join(ROOT_DIR, "src"), ROOT_DIR]),
+        LLM_PROVIDER="fake",
+        FAKE_LLM_LATENCY_MS=str(latency_ms),
+        FAKE_LLM_SCRIPT=script_path,
+        DATABASE_URL=f"sqlite+aiosqlite:///{DEFAULT_DB_PATH}",
+        WAHA_BASE_URL=f"http://127.0.0.1:{waha_port}",
+        AGENT_API_KEY=WEBHOOK_SECRET,
+        CHECKPOINTER="sqlite",
+        CHECKPOINTER_PATH=os.path.join(workdir, "checkpoints.db"),
+    )
+
+
+async def run_scaling(worker_counts: List[int], users: int, messages: int, think_ms: float,
+                      latency_ms: float, drain_s: float) -> Dict[str, Any]:
+    from benchmarks.seed import seed_sqlite
+
+    os.makedirs(os.path.dirname(DEFAULT_DB_PATH), exist_ok=True)
+    seed_sqlite(DEFAULT_DB_PATH, CONTEXT_PATH)
+
+    runs = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as workdir:
+            script_path = os.path.join(workdir, "fake_script.json")
+            with open(script_path, "w", encoding="utf-8") as f:
+                json.dump([{"question": q, "sql": sql, "intent": intent} for q, intent, sql in LOAD_MESSAGES], f)
+
+            port, waha_port = _free_port(), _free_port()
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "api.cluster", "--workers", str(workers),
+                 "--host", "127.0.0.1", "--port", str(port)],
+                env=_cluster_env(workdir, waha_port, latency_ms, script_path),
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                target = f"http://127.0.0.1:{port}"
+                _wait_healthy(target)
+                print(f"⚙️  {workers} worker(s) listos en {target}")
+                report = await run_load_test(users, messages, think_ms, latency_ms, target, waha_port, drain_s)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+        runs.append({
+            "workers": workers,
+            "messages_per_s": report["messages_per_s"],
+            "reply_p50_ms": report["reply_latency"].get("p50_ms"),
+            "reply_p95_ms": report["reply_latency"].get("p95_ms"),
+            "dropped": report["dropped"],
+            "errored": report["errored"],
+            "ordering_violations": report["ordering_violations"],
+        })
+
+    base = runs[0]["messages_per_s"] or 1.0
+    for run in runs:
+        run["speedup"] = round(run["messages_per_s"] / base, 2)
+    return {
+        "cpu_count": os.cpu_count(),
+        "config": {"users": users, "messages_per_user": messages, "think_ms": think_ms, "latency_ms": latency_ms},
+        "runs": runs,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Escalado del bridge multi-worker (throughput vs núcleos)")
+    parser.add_argument("--workers", default="1,2,4", help="Lista de cantidades de workers a probar")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--think-ms", type=float, default=50.0)
+    parser.add_argument("--latency-ms", type=float, default=5.0,
+                        help="Latencia del LLM falso (baja para que domine el trabajo de CPU)")
+    parser.add_argument("--drain-s", type=float, default=60.0)
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.workers.split(",") if n.strip()]
+    report = asyncio.run(run_scaling(counts, args.users, args.messages, args.think_ms,
+                                     args.latency_ms, args.drain_s))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print("\nworkers | msgs/s | speedup | p95 (ms) | orden")
+    for run in report["runs"]:
+        print(f"{run['workers']:>7} | {run['messages_per_s']:>6} | {run['speedup']:>7} | "
+              f"{run['reply_p95_ms']:>8} | {run['ordering_violations']}")
+    return 1 if any(r["dropped"] or r["errored"] for r in report["runs"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,17 @@
 import sys
 import os
 import yaml
-from typing import List, Optional, Literal, Union
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import ValidationError
 from sqlalchemy import create_engine, inspect, text
 from dotenv import load_dotenv
 
-# Cargar variables de entorno (.env)
-load_dotenv()
-
 # --- 1. MODELOS DE DATOS (PYDANTIC) ---
-# Representan la estructura exacta de tu YAML v2.5
-
-class EntityRef(BaseModel):
-    name: str
-    type: Literal['primary', 'foreign', 'unique']
-    col: str
-
-class Dimension(BaseModel):
-    name: str
-    type: str
-    col: Optional[str] = None
-    sql: Optional[str] = None # Para dimensiones calculadas
-    description: Optional[str] = None
+# Compartidos con la recarga en caliente del agente (src/sql_agent/config/schema.py)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from sql_agent.config.schema import BusinessContext
 
-class Measure(BaseModel):
-    name: str
-    type: str
-    col: Optional[str] = None
-    sql: Optional[str] = None
-    description: Optional[str] = None
-
-class DataModel(BaseModel):
-    name: str
-    source: str # Ej: bnplsite_credivibes.users
-    entities: List[EntityRef] = []
-    dimensions: List[Dimension] = []
-    measures: List[Measure] = []
-
-class BusinessContext(BaseModel):
-    version: str
-    project: str
-    models: List[DataModel]
+# Cargar variables de entorno (.env)
+load_dotenv()
 
 # --- 2. LÓGICA DE VALIDACIÓN ---
 
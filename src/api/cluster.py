@@ -0,0 +1,91 @@
+"""
+Arranque del bridge de WhatsApp en modo producción.
+
+    python -m api.cluster --workers 4 --port 8001     (PYTHONPATH=src)
+
+- --workers 1: un solo proceso uvicorn (webhook.py), como antes.
+- --workers N: N procesos uvicorn en puertos internos (port+1 .. port+N)
+  y el dispatcher en --port, que enruta cada remote_jid a su worker.
+  El estado de las conversaciones se comparte vía CHECKPOINTER (sqlite por
+  defecto; redis para varios hosts) y la caché vía CACHE_URL.
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+import urllib.request
+from typing import List
+
+import uvicorn
+
+
+def _wait_healthy(urls: List[str], timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    pending = list(urls)
+    while pending and time.monotonic() < deadline:
+        for url in list(pending):
+            try:
+                with urllib.request.urlopen(f"{url}/health", timeout=2) as resp:
+                    if resp.status == 200:
+                        pending.remove(url)
+            except OSError:
+                pass
+        time.sleep(0.25)
+    if pending:
+        raise RuntimeError(f"Workers sin responder tras {timeout:.0f}s: {pending}")
+
+
+def spawn_workers(workers: int, base_port: int, host: str = "127.0.0.1") -> List[subprocess.Popen]:
+    procs = []
+    for i in range(workers):
+        # Índice del worker en este host (etiqueta de /health y /metrics); el
+        # liderazgo entre hosts usa su propio token (utils/cache.LEADER_TOKEN)
+        env = dict(os.environ, BRIDGE_WORKER_ID=str(i))
+        procs.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "api.webhook:app",
+            "--host", host, "--port", str(base_port + i), "--log-level", "warning",
+        ], env=env))
+    return procs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bridge de WhatsApp (uno o varios workers)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BRIDGE_WORKERS", "1")))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        uvicorn.run("api.webhook:app", host=args.host, port=args.port)
+        return
+
+    if os.getenv("CHECKPOINTER", "memory") == "memory":
+        # La afinidad ya mantiene a cada usuario en su worker, pero la memoria
+        # debe sobrevivir a reinicios y reasignaciones: se comparte en SQLite.
+        os.environ["CHECKPOINTER"] = "sqlite"
+        print("ℹ️ Modo multi-worker: CHECKPOINTER=sqlite (define CHECKPOINTER=redis para varios hosts)")
+
+    base_port = args.port + 1
+    procs = spawn_workers(args.workers, base_port)
+
+    def shutdown(*_):
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+    signal.signal(signal.SIGTERM, lambda *a: (shutdown(), sys.exit(0)))
+    try:
+        urls = [f"http://127.0.0.1:{base_port + i}" for i in range(args.workers)]
+        _wait_healthy(urls)
+        os.environ["BRIDGE_WORKER_URLS"] = ",".join(urls)
+        print(f"🚀 Bridge multi-worker: {args.workers} workers detrás de :{args.port}")
+        uvicorn.run("api.dispatcher:app", host=args.host, port=args.port)
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Dispatcher del modo multi-worker del bridge de WhatsApp.
+
+Recibe los webhooks de WAHA y reenvía cada evento al worker dueño de su
+`remote_jid` (rendezvous hashing): un usuario siempre cae en el mismo
+proceso, que procesa sus mensajes en orden (ver `user_locks` en webhook.py).
+Agregar o quitar workers solo reasigna a los usuarios del worker afectado.
+/metrics une las métricas de todos los workers, etiquetadas por worker.
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+WORKER_URLS = [u.strip().rstrip("/") for u in os.getenv("BRIDGE_WORKER_URLS", "").split(",") if u.strip()]
+
+app = FastAPI(title="WhatsApp Bridge Dispatcher")
+logger = logging.getLogger("whatsapp_dispatcher")
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def pick_worker(key: str, workers: List[str] = None) -> str:
+    """Worker con mayor peso hash(worker, key) (rendezvous / HRW hashing)."""
+    workers = workers or WORKER_URLS
+    return max(workers, key=lambda w: hashlib.blake2b(f"{w}|{key}".encode(), digest_size=8).digest())
+
+
+def _label_sample(line: str, worker: str) -> str:
+    """Agrega worker="<id>" a una muestra Prometheus (`nombre{labels} valor` o `nombre valor`)."""
+    name_end = line.index(" ")
+    brace = line.find("{")
+    if 0 <= brace < name_end:
+        rest = line[brace + 1:]
+        sep = "" if rest.startswith("}") else ","
+        return f'{line[:brace]}{{worker="{worker}"{sep}{rest}'
+    return f'{line[:name_end]}{{worker="{worker}"}}{line[name_end:]}'
+
+
+def merge_metrics(outputs: Dict[str, str]) -> str:
+    """
+    Une la exposición de cada worker ({worker_id: texto}) en una sola:
+    HELP/TYPE una vez por familia y cada muestra etiquetada con su worker.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for worker, text in outputs.items():
+        family = ""
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    header = headers.setdefault(family, [])
+                    if len(header) < 2 and line not in header:
+                        header.append(line)
+                    samples.setdefault(family, [])
+                continue
+            samples.setdefault(family, []).append(_label_sample(line, worker))
+    lines: List[str] = []
+    for family, family_samples in samples.items():
+        lines.extend(headers.get(family, []))
+        lines.extend(family_samples)
+    return "\n".join(lines) + "\n"
+
+
+def _routing_key(body: bytes) -> str:
+    try:
+        payload = json.loads(body)
+        return (payload.get("payload") or {}).get("from") or payload.get("session") or ""
+    except ValueError:
+        return ""
+
+
+@app.on_event("startup")
+async def open_session():
+    global _session
+    # Sin timeout total: el worker responde cuando termina el turno del agente
+    _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, connect=5))
+    print(f"🔀 Dispatcher activo con {len(WORKER_URLS)} workers: {WORKER_URLS}")
+
+
+@app.on_event("shutdown")
+async def close_session():
+    if _session is not None:
+        await _session.close()
+
+
+@app.post("/webhook")
+async def dispatch(request: Request):
+    body = await request.body()
+    worker = pick_worker(_routing_key(body))
+    try:
+        async with _session.post(
+            f"{worker}/webhook",
+            params=dict(request.query_params),
+            data=body,
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            return JSONResponse(await resp.json(content_type=None), status_code=resp.status)
+    except aiohttp.ClientError as e:
+        logger.error(f"❌ Worker {worker} no disponible: {e}")
+        return JSONResponse({"status": "error", "reason": "worker unavailable"}, status_code=503)
+
+
+@app.get("/health")
+async def health():
+    async def probe(worker: str):
+        try:
+            async with _session.get(f"{worker}/health", timeout=aiohttp.ClientTimeout(total=3)) as resp:
+                return await resp.json()
+        except Exception as e:
+            return {"status": "down", "error": str(e)}
+
+    results = await asyncio.gather(*(probe(w) for w in WORKER_URLS))
+    workers = dict(zip(WORKER_URLS, results))
+    healthy = all(r.get("status") == "ok" for r in results)
+    return {"status": "ok" if healthy else "degraded", "workers": workers}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Métricas de todos los workers, cada muestra con worker="<índice>" (BRIDGE_WORKER_ID)."""
+    async def scrape(worker: str) -> Optional[str]:
+        try:
+            async with _session.get(f"{worker}/metrics", timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                return await resp.text() if resp.status == 200 else None
+        except Exception as e:
+            logger.warning(f"⚠️ Sin métricas del worker {worker}: {e}")
+            return None
+
+    results = await asyncio.gather(*(scrape(w) for w in WORKER_URLS))
+    outputs = {str(i): text for i, text in enumerate(results) if text is not None}
+    up = "\n".join(
+        ["# HELP sql_agent_worker_up Worker respondió al scrape del dispatcher (1) o no (0).",
+         "# TYPE sql_agent_worker_up gauge"]
+        + [f'sql_agent_worker_up{{worker="{i}"}} {1.0 if text is not None else 0.0}' for i, text in enumerate(results)]
+    )
+    return PlainTextResponse(merge_metrics(outputs) + up + "\n", media_type="text/plain; version=0.0.4")
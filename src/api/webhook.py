@@ -1,32 +1,88 @@
 import os
+import time
+import asyncio
 import logging
 import aiohttp
 from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 
 # Importar el Singleton del Agente y MemorySaver
 from sql_agent.graph import build_graph
-from langgraph.checkpoint.memory import MemorySaver
+from sql_agent.database.connection import DatabaseManager
+from sql_agent.semantic.snapshots import MetricSnapshots
+from sql_agent.config.reloader import ConfigReloader
 from langchain_core.messages import HumanMessage
+from sql_agent.utils import metrics
+from sql_agent.utils.tracing import span
+from sql_agent.utils.checkpointer import create_checkpointer
+from sql_agent.utils.locks import KeyedLocks
+from sql_agent.utils.executor import CpuExecutor, LoopLagMonitor
+from sql_agent.api.http import ApiHttpPool
 
 # Configuración
 WAHA_BASE_URL = os.getenv("WAHA_BASE_URL", "http://waha:3000")
 WAHA_API_KEY = os.getenv("WAHA_API_KEY", "")
 AGENT_API_KEY = os.getenv("AGENT_API_KEY", "secret_agent_key") # Para proteger nuestro webhook
 
-# Inicializar App y Grafo con Memoria
+# ID del worker (modo multi-worker: api/cluster.py lo asigna a cada proceso)
+WORKER_ID = os.getenv("BRIDGE_WORKER_ID", "0")
+
+# Inicializar App; el Grafo se construye al primer uso con el checkpointer
+# configurado (CHECKPOINTER=memory|sqlite|redis, compartido entre workers)
 app = FastAPI(title="WhatsApp Bridge for SQL Agent (WAHA)")
-memory = MemorySaver()
-agent_graph = build_graph(checkpointer=memory)
+agent_graph = None
+_graph_lock = asyncio.Lock()
+
+# Un turno a la vez por usuario: respeta el orden de llegada de sus mensajes
+user_locks = KeyedLocks()
+
+async def get_agent_graph():
+    global agent_graph
+    if agent_graph is None:
+        async with _graph_lock:
+            if agent_graph is None:
+                agent_graph = build_graph(checkpointer=await create_checkpointer())
+    return agent_graph
 
 # Logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("whatsapp_bridge")
 
+@app.on_event("startup")
+async def start_background_jobs():
+    await get_agent_graph()
+    # Scheduler de snapshots de métricas (settings.yaml -> snapshots)
+    MetricSnapshots.ensure_started()
+    # Recarga en caliente de config/diccionario/swagger (reemplaza a `uvicorn --reload`)
+    ConfigReloader.ensure_started()
+    # Aviso (con la pila) cuando algo bloquea el event loop y frena a los demás usuarios
+    LoopLagMonitor.ensure_started()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await MetricSnapshots.stop()
+    await ConfigReloader.stop()
+    await LoopLagMonitor.stop()
+    await ApiHttpPool.close()
+    CpuExecutor.shutdown()
+
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "agent": "connected", "platform": "waha"}
+    return {
+        "status": "ok",
+        "agent": "connected" if agent_graph is not None else "starting",
+        "platform": "waha",
+        "worker": WORKER_ID,
+        "active_users": len(user_locks),
+        "db_pools": DatabaseManager.pool_stats(),
+    }
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Métricas en formato Prometheus (nodos, LLM, DB, HTTP)."""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
 
 @app.post("/webhook")
 async def receive_message(request: Request, secret: Optional[str] = Query(None)):
@@ -82,36 +138,45 @@ async def receive_message(request: Request, secret: Optional[str] = Query(None))
         # 3. Invocar al Agente SQL
     try:
         session_name = payload.get("session", "default")
+        graph = await get_agent_graph()
+
+        # Los mensajes del mismo usuario se procesan en orden (uno a la vez)
+        async with user_locks.hold(remote_jid):
+            # Activar 'Escribiendo...' en WhatsApp
+            await set_typing_state(remote_jid, session_name, True)
         
-        # Activar 'Escribiendo...' en WhatsApp
-        await set_typing_state(remote_jid, session_name, True)
-        
-        # [CRITICAL UPDATE]
-        # Al usar checkpoints (Memoria), el estado persiste entre turnos.
-        # Debemos limpiar las variables de ejecución (intent, sql_result, etc.)
-        # para que no contaminen la nueva pregunta. Solo conservamos 'messages'.
-        inputs = {
-            "question": user_text,
-            "messages": [HumanMessage(content=user_text)],
+            # [CRITICAL UPDATE]
+            # Al usar checkpoints (Memoria), el estado persiste entre turnos.
+            # Debemos limpiar las variables de ejecución (intent, sql_result, etc.)
+            # para que no contaminen la nueva pregunta. Solo conservamos 'messages'.
+            inputs = {
+                "question": user_text,
+                "messages": [HumanMessage(content=user_text)],
             
-            # Reset de "Memoria de Trabajo" para evitar alucinaciones con datos viejos
-            "intent": "",       
-            "sql_query": "",
-            "sql_result": "",
-            "iterations": 0
-        }
+                # Reset de "Memoria de Trabajo" para evitar alucinaciones con datos viejos
+                "intent": "",       
+                "sql_query": "",
+                "sql_result": "",
+                "query_result": None,
+                "iterations": 0
+                # 'continuation' se conserva: "más" pide la página siguiente del último resultado
+            }
         
-        # Usar remote_jid como thread_id para mantener memoria por usuario
-        config = {"configurable": {"thread_id": remote_jid}}
+            # Usar remote_jid como thread_id para mantener memoria por usuario
+            config = {"configurable": {"thread_id": remote_jid}}
         
-        result = await agent_graph.ainvoke(inputs, config=config)
-        ai_response = result["messages"][-1].content
+            turn_start = time.perf_counter()
+            result = await graph.ainvoke(inputs, config=config)
+            ai_response = result["messages"][-1].content
+            metrics.TURN_LATENCY.observe(
+                time.perf_counter() - turn_start, channel="whatsapp", intent=result.get("intent") or "-"
+            )
         
-        # Desactivar 'Escribiendo...'
-        await set_typing_state(remote_jid, session_name, False)
+            # Desactivar 'Escribiendo...'
+            await set_typing_state(remote_jid, session_name, False)
         
-        # 4. Enviar respuesta a WhatsApp via WAHA
-        await send_whatsapp_message(remote_jid, ai_response, session_name)
+            # 4. Enviar respuesta a WhatsApp via WAHA
+            await send_whatsapp_message(remote_jid, ai_response, session_name)
         
     except Exception as e:
         logger.error(f"❌ Error procesando mensaje: {e}")
@@ -135,8 +200,9 @@ async def send_whatsapp_message(chat_id: str, text: str, session: str):
         "session": session
     }
     
-    async with aiohttp.ClientSession() as session_http:
+    async with span("http", "waha_send_text") as attrs, aiohttp.ClientSession() as session_http:
         async with session_http.post(url, json=body, headers=headers) as resp:
+            attrs["status"] = resp.status
             if resp.status != 201 and resp.status != 200:
                 error_text = await resp.text()
                 logger.error(f"⚠️ Fallo al enviar WhatsApp: {resp.status} - {error_text}")
@@ -163,8 +229,9 @@ async def set_typing_state(chat_id: str, session: str, state: bool = True):
     }
     
     try:
-        async with aiohttp.ClientSession() as session_http:
+        async with span("http", f"waha_{endpoint}") as attrs, aiohttp.ClientSession() as session_http:
             async with session_http.post(url, json=body, headers=headers) as resp:
+                attrs["status"] = resp.status
                 if resp.status not in [200, 201]:
                     logger.warning(f"⚠️ Fallo al cambiar estado typing ({endpoint}): {resp.status}")
     except Exception as e:
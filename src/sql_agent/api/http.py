@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+from typing import Optional
+
+import aiohttp
+
+from sql_agent.config.loader import ConfigLoader
+
+# Semáforo del turno en curso del agente API: limita cuántas tool calls
+# paralelas (emitidas en un mismo paso ReAct) golpean la API a la vez
+current_api_limit: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar(
+    "current_api_limit", default=None
+)
+
+
+def _config() -> dict:
+    return ConfigLoader.load_settings().get("api_agent", {}) or {}
+
+
+def turn_limit() -> asyncio.Semaphore:
+    """Semáforo nuevo para un turno del agente API (api_agent.max_parallel_calls)."""
+    return asyncio.Semaphore(int(_config().get("max_parallel_calls", 4)))
+
+
+class ApiHttpPool:
+    """
+    Sesión aiohttp compartida para requests_get: keep-alive y pool de conexiones
+    en lugar de una sesión (y un handshake TLS) por llamada.
+    """
+
+    _session: Optional[aiohttp.ClientSession] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def session(cls) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if cls._session is None or cls._session.closed or cls._loop is not loop:
+            config = _config()
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=int(config.get("pool_size", 20)), ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=float(config.get("timeout", 30))),
+            )
+            cls._loop = loop
+        return cls._session
+
+    @classmethod
+    async def close(cls):
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+        cls._session = None
+        cls._loop = None
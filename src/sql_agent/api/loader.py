@@ -1,11 +1,15 @@
 import os
 import json
+import contextlib
 from typing import List, Dict
 
 from langchain_community.agent_toolkits.openapi.toolkit import RequestsToolkit
 from langchain_community.utilities.requests import RequestsWrapper
 from langchain_community.tools.json.tool import JsonSpec
 from sql_agent.llm.factory import LLMFactory
+from sql_agent.api.http import ApiHttpPool, current_api_limit
+from sql_agent.api.projection import ResponseProjector
+from sql_agent.utils.tracing import span, sync_span
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -97,11 +101,19 @@ def load_api_tools() -> List:
 
             def get(self, url: str, **kwargs):
                 target_url = self._clean_url(url)
-                return super().get(target_url, **kwargs)
+                with sync_span("http", "api", url=target_url):
+                    response = super().get(target_url, **kwargs)
+                return ResponseProjector.project(target_url, response)
 
             async def aget(self, url: str, **kwargs):
                 target_url = self._clean_url(url)
-                return await super().aget(target_url, **kwargs)
+                # Sesión compartida (pool keep-alive) y tope de llamadas paralelas del turno
+                self.aiosession = ApiHttpPool.session()
+                async with current_api_limit.get() or contextlib.nullcontext():
+                    async with span("http", "api", url=target_url):
+                        response = await super().aget(target_url, **kwargs)
+                # Solo los campos útiles de la respuesta entran al historial del agente
+                return ResponseProjector.project(target_url, response)
 
         requests_wrapper = BaseUrlRequestsWrapper(headers=headers)
         
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.utils import metrics
+
+# tiktoken es opcional: sin él se estima ~4 caracteres por token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_BLOB = re.compile(r"^[A-Za-z0-9+/=_-]{200,}$")
+_ANY = "*"  # additionalProperties: se conservan todas las claves
+
+
+def _swagger_path() -> str:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(current_dir, "../../../docs/swagger.json"))
+
+
+class TokenCounter:
+    _encoding = None
+
+    @classmethod
+    def count(cls, text: str) -> int:
+        if tiktoken is None:
+            return len(text) // 4
+        if cls._encoding is None:
+            cls._encoding = tiktoken.get_encoding("cl100k_base")
+        return len(cls._encoding.encode(text))
+
+    @classmethod
+    def truncate(cls, text: str, budget: int) -> str:
+        if tiktoken is None:
+            return text[:budget * 4]
+        if cls._encoding is None:
+            cls._encoding = tiktoken.get_encoding("cl100k_base")
+        return cls._encoding.decode(cls._encoding.encode(text)[:budget])
+
+
+class ResponseProjector:
+    """
+    Proyección de respuestas de la API antes de entrar al historial del agente ReAct.
+    La forma de cada endpoint (GET 200) sale de docs/swagger.json (properties o,
+    si el schema solo trae un example, sus claves). Se descartan campos no
+    documentados, nulos y vacíos, se recortan arreglos y textos largos, se omiten
+    blobs y anidamientos profundos, y se respeta un presupuesto de tokens.
+    """
+
+    _routes: List[Tuple[re.Pattern, str, Any]] = []
+    _mtime: Optional[float] = None
+
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return (ConfigLoader.load_settings().get("api_agent", {}) or {}).get("projection", {}) or {}
+
+    # --- Formas desde el Swagger ---
+    @classmethod
+    def _shape(cls, schema: Any, spec: dict, depth: int = 0) -> Any:
+        """Árbol de claves permitidas: dict (objeto), [forma] (arreglo) o None (sin restricción)."""
+        if not isinstance(schema, dict) or depth > 12:
+            return None
+        if "$ref" in schema:
+            target = spec
+            for part in schema["$ref"].lstrip("#/").split("/"):
+                target = target.get(part, {}) if isinstance(target, dict) else {}
+            return cls._shape(target, spec, depth + 1)
+        if "allOf" in schema:
+            merged: Dict[str, Any] = {}
+            for sub in schema["allOf"]:
+                shape = cls._shape(sub, spec, depth + 1)
+                if isinstance(shape, dict):
+                    merged.update(shape)
+            return merged or None
+        if "properties" in schema:
+            shape = {name: cls._shape(sub, spec, depth + 1) for name, sub in schema["properties"].items()}
+            if schema.get("additionalProperties"):
+                shape[_ANY] = None
+            return shape
+        if "items" in schema:
+            return [cls._shape(schema["items"], spec, depth + 1)]
+        if "example" in schema:
+            return cls._shape_from_example(schema["example"])
+        return None
+
+    @classmethod
+    def _shape_from_example(cls, example: Any) -> Any:
+        if isinstance(example, dict):
+            return {key: cls._shape_from_example(value) for key, value in example.items()}
+        if isinstance(example, list) and example:
+            return [cls._shape_from_example(example[0])]
+        return None
+
+    @classmethod
+    def _load(cls):
+        path = _swagger_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            cls._routes, cls._mtime = [], None
+            return
+        if mtime == cls._mtime:
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        routes = []
+        for template, methods in (spec.get("paths") or {}).items():
+            get = (methods or {}).get("get")
+            if not get:
+                continue
+            content = ((get.get("responses") or {}).get("200") or {}).get("content") or {}
+            schema = (content.get("application/json") or {}).get("schema")
+            # Rutas con más segmentos literales primero (/users/me antes que /users/{id})
+            pattern = re.compile(r"(?:^|.*?)" + re.sub(r"\\\{[^/]+?\\\}", r"[^/]+", re.escape(template.rstrip("/"))) + r"/?$")
+            routes.append((pattern, template, cls._shape(schema, spec) if schema else None))
+        routes.sort(key=lambda r: (-r[1].count("/"), r[1].count("{")))
+        cls._routes, cls._mtime = routes, mtime
+
+    @classmethod
+    def route(cls, url: str) -> Tuple[str, Any]:
+        cls._load()
+        path = urlparse(url).path or url
+        for pattern, template, shape in cls._routes:
+            if pattern.match(path):
+                return template, shape
+        return "unknown", None
+
+    # --- Proyección ---
+    @classmethod
+    def _project(cls, value: Any, shape: Any, depth: int, limits: Dict[str, int]) -> Any:
+        if isinstance(value, dict):
+            if depth >= limits["max_depth"]:
+                return f"<objeto con {len(value)} campos omitido>"
+            out = {}
+            for key, item in value.items():
+                if item is None or item == "" or item == [] or item == {}:
+                    continue
+                if isinstance(shape, dict) and key not in shape and _ANY not in shape:
+                    continue
+                sub = shape.get(key) if isinstance(shape, dict) else None
+                projected = cls._project(item, sub, depth + 1, limits)
+                if projected not in (None, "", [], {}):
+                    out[key] = projected
+            return out
+        if isinstance(value, list):
+            if depth >= limits["max_depth"]:
+                return f"<lista con {len(value)} elementos omitida>"
+            sub = shape[0] if isinstance(shape, list) and shape else None
+            items = [cls._project(item, sub, depth + 1, limits) for item in value[:limits["max_array_items"]]]
+            if len(value) > limits["max_array_items"]:
+                items.append(f"... (+{len(value) - limits['max_array_items']} más)")
+            return items
+        if isinstance(value, str):
+            if _BLOB.match(value):
+                return "<blob omitido>"
+            if len(value) > limits["max_string_chars"]:
+                return value[:limits["max_string_chars"]] + "…"
+        return value
+
+    @classmethod
+    def project(cls, url: str, body: str) -> str:
+        """Texto compacto de la respuesta para el agente (o el original si la proyección está apagada)."""
+        config = cls._config()
+        if not config.get("enabled", True) or not isinstance(body, str):
+            return body
+        budget = int(config.get("token_budget", 1500))
+        template, shape = cls.route(url)
+        overrides = (config.get("endpoints") or {}).get(template)
+        if overrides:
+            shape = {field: None for field in overrides}
+
+        raw_tokens = TokenCounter.count(body)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+
+        if data is None:
+            text = body if raw_tokens <= budget else TokenCounter.truncate(body, budget) + "\n… (respuesta recortada)"
+        else:
+            limits = {
+                "max_array_items": int(config.get("max_array_items", 10)),
+                "max_string_chars": int(config.get("max_string_chars", 300)),
+                "max_depth": int(config.get("max_depth", 5)),
+            }
+            # Si no entra en el presupuesto se achican arreglos y textos; al final, recorte duro
+            for _ in range(4):
+                text = json.dumps(cls._project(data, shape, 0, limits), ensure_ascii=False, separators=(",", ":"),
+                                  default=str)
+                if TokenCounter.count(text) <= budget:
+                    break
+                limits["max_array_items"] = max(limits["max_array_items"] // 2, 1)
+                limits["max_string_chars"] = max(limits["max_string_chars"] // 2, 40)
+            else:
+                text = TokenCounter.truncate(text, budget) + "\n… (respuesta recortada)"
+
+        tokens = TokenCounter.count(text)
+        bytes_saved = max(len(body.encode("utf-8")) - len(text.encode("utf-8")), 0)
+        tokens_saved = max(raw_tokens - tokens, 0)
+        metrics.API_PROJECTION_BYTES_SAVED.inc(bytes_saved, endpoint=template)
+        metrics.API_PROJECTION_TOKENS_SAVED.inc(tokens_saved, endpoint=template)
+        if tokens_saved:
+            print(f"   ✂️ [API] {template}: {len(body) / 1024:.1f}KB -> {len(text) / 1024:.1f}KB, "
+                  f"{raw_tokens} -> {tokens} tokens")
+        return text
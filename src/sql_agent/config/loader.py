@@ -3,6 +3,8 @@ import yaml
 from pathlib import Path
 from dotenv import load_dotenv
 
+from sql_agent.config.reloader import ConfigReloader, parse_business_context, parse_settings
+
 # Definimos la raíz del proyecto basándonos en la ubicación de este archivo
 # src/sql_agent/config/loader.py -> ... -> root
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
@@ -12,9 +14,27 @@ load_dotenv(BASE_DIR / ".env")
 class ConfigLoader:
     """
     Singleton encargado de cargar la configuración una sola vez.
+    Los cambios en disco se aplican en caliente vía ConfigReloader.
     """
     _settings = None
     _business_context = None
+    _semantic_layer = None
+    _watching = set()
+
+    @classmethod
+    def _watch(cls, name: str, parse, callback):
+        if name not in cls._watching:
+            cls._watching.add(name)
+            ConfigReloader.watch(str(CONFIG_DIR / name), parse, callback)
+
+    @classmethod
+    def _apply_settings(cls, data: dict):
+        cls._settings = data
+
+    @classmethod
+    def _apply_semantic_layer(cls, data: dict):
+        cls._semantic_layer = data
+        cls._business_context = data.get("business_context", "")
 
     @classmethod
     def load_settings(cls):
@@ -28,6 +48,7 @@ class ConfigLoader:
                 # Fallback por si no existe
                 cls._settings = {"app": {"debug": True}}
                 print(f"⚠️ Alerta: No se encontró {path}, usando valores por defecto.")
+            cls._watch("settings.yaml", parse_settings, cls._apply_settings)
         return cls._settings
 
     @classmethod
@@ -42,4 +63,19 @@ class ConfigLoader:
             except FileNotFoundError:
                 cls._business_context = "Sin contexto definido."
                 print(f"⚠️ Alerta: No se encontró {path}")
-        return cls._business_context
\ No newline at end of file
+            cls._watch("business_context.yaml", parse_business_context, cls._apply_semantic_layer)
+        return cls._business_context
+
+    @classmethod
+    def load_semantic_layer(cls) -> dict:
+        """Carga config/business_context.yaml completo (meta, models, metrics...)."""
+        if cls._semantic_layer is None:
+            path = CONFIG_DIR / "business_context.yaml"
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    cls._semantic_layer = yaml.safe_load(f) or {}
+            except FileNotFoundError:
+                cls._semantic_layer = {}
+                print(f"⚠️ Alerta: No se encontró {path}")
+            cls._watch("business_context.yaml", parse_business_context, cls._apply_semantic_layer)
+        return cls._semantic_layer
@@ -0,0 +1,150 @@
+import os
+import json
+import asyncio
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+from pydantic import ValidationError
+
+from sql_agent.config.schema import BusinessContext, DataDictionary, Settings, SwaggerSpec
+
+
+# --- Parsers: leen y validan; lanzan excepción si el archivo no es válido ---
+
+def parse_settings(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    Settings(**data)
+    return data
+
+
+def parse_business_context(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    BusinessContext(**data)
+    return data
+
+
+def parse_dictionary(path: str) -> str:
+    """Devuelve el texto crudo (es lo que va al prompt), tras validar su estructura."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    DataDictionary(**(yaml.safe_load(raw) or {}))
+    return raw
+
+
+def parse_swagger(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    SwaggerSpec(**data)
+    return data
+
+
+@dataclass
+class _Watch:
+    path: str
+    parse: Callable[[str], Any]
+    signature: Optional[Tuple[float, int]] = None
+    callbacks: List[Any] = field(default_factory=list)  # weakref.WeakMethod o función
+
+
+class ConfigReloader:
+    """
+    Recarga en caliente de configuración (settings.yaml, business_context.yaml,
+    dictionary.yaml, swagger.json) sin reiniciar el proceso.
+
+    Sondea mtime/tamaño de cada archivo; al cambiar lo valida con los modelos
+    de `config/schema.py` y, solo si es válido, entrega el nuevo valor a los
+    suscriptores, que lo reemplazan con una sola asignación (swap atómico).
+    Las peticiones en curso terminan con la versión que ya habían leído.
+    Un archivo inválido se ignora y se sigue sirviendo la versión anterior.
+    """
+
+    _watches: Dict[str, _Watch] = {}
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    @classmethod
+    def watch(cls, path: str, parse: Callable[[str], Any], callback: Callable[[Any], None]):
+        """
+        Suscribe `callback(nuevo_valor)` a los cambios de `path`.
+        Los métodos ligados se guardan como referencia débil (un AgentNodes
+        descartado no queda vivo por estar suscrito).
+        """
+        path = os.path.abspath(path)
+        entry = cls._watches.get(path)
+        if entry is None:
+            entry = cls._watches[path] = _Watch(path, parse, cls._signature(path))
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else callback
+        entry.callbacks.append(ref)
+
+    @classmethod
+    async def check_now(cls) -> List[str]:
+        """Una pasada de sondeo. Devuelve las rutas recargadas."""
+        # import diferido: executor depende de config.loader, que depende de este módulo
+        from sql_agent.utils.executor import run_cpu
+
+        reloaded = []
+        for entry in list(cls._watches.values()):
+            signature = cls._signature(entry.path)
+            if signature is None or signature == entry.signature:
+                continue
+            entry.signature = signature
+            name = os.path.basename(entry.path)
+            try:
+                # Lectura + YAML/JSON + validación en el pool de CPU, fuera del event loop
+                value = await run_cpu("config_reload", entry.parse, entry.path)
+            except (ValidationError, ValueError, yaml.YAMLError, OSError) as e:
+                print(f"❌ [Reload] '{name}' inválido, se mantiene la versión anterior:\n{e}")
+                continue
+
+            alive = []
+            for ref in entry.callbacks:
+                callback = ref() if isinstance(ref, weakref.WeakMethod) else ref
+                if callback is None:
+                    continue
+                alive.append(ref)
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"⚠️ [Reload] Error aplicando '{name}': {e}")
+            entry.callbacks = alive
+            reloaded.append(entry.path)
+            print(f"🔄 [Reload] '{name}' recargado en caliente")
+        return reloaded
+
+    @classmethod
+    async def _poll_loop(cls, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await cls.check_now()
+
+    @classmethod
+    def ensure_started(cls):
+        """Lanza el sondeo en segundo plano (una vez) si está habilitado y hay un loop activo."""
+        from sql_agent.config.loader import ConfigLoader
+
+        config = ConfigLoader.load_settings().get("hot_reload", {}) or {}
+        if not config.get("enabled", True) or (cls._task is not None and not cls._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._task = loop.create_task(cls._poll_loop(float(config.get("interval", 2))))
+        print(f"👀 [Reload] Vigilando {len(cls._watches)} archivos de configuración")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+# --- Capa semántica (business_context.yaml v2.5) ---
+
+class EntityRef(BaseModel):
+    name: str
+    type: Literal['primary', 'foreign', 'unique']
+    col: str
+
+class Dimension(BaseModel):
+    name: str
+    type: str
+    col: Optional[str] = None
+    sql: Optional[str] = None # Para dimensiones calculadas
+    description: Optional[str] = None
+    searchable: bool = False # Indexar valores para resolución de entidades
+
+class Measure(BaseModel):
+    name: str
+    type: str
+    col: Optional[str] = None
+    sql: Optional[str] = None
+    description: Optional[str] = None
+
+class DataModel(BaseModel):
+    name: str
+    source: str # Ej: bnplsite_credivibes.users
+    entities: List[EntityRef] = []
+    dimensions: List[Dimension] = []
+    measures: List[Measure] = []
+
+class BusinessContext(BaseModel):
+    version: str
+    project: str
+    models: List[DataModel]
+
+# --- settings.yaml (solo las secciones que el agente necesita; el resto se acepta tal cual) ---
+
+class LLMSettings(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    provider: str
+    model: Optional[str] = None
+    temperature: float = 0.0
+
+class Settings(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    app: Dict[str, Any] = {}
+    llm: Optional[LLMSettings] = None
+    database: Dict[str, Any] = {}
+
+# --- data/dictionary.yaml (salida del Hidratador) ---
+
+class DictionaryTable(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    name: str
+    description: Optional[str] = None
+    columns: List[Dict[str, Any]] = []
+
+class DataDictionary(BaseModel):
+    tables: List[DictionaryTable]
+
+# --- docs/swagger.json ---
+
+class SwaggerSpec(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    paths: Dict[str, Any]
@@ -0,0 +1,192 @@
+import re
+import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.utils import metrics
+
+# Símbolos para `meta.currency_format` (business_context.yaml)
+CURRENCY_SYMBOLS = {"USD": "$", "VES": "Bs.", "EUR": "€"}
+
+# Heurísticas por palabra del nombre de columna ('total_orders' -> total, orders)
+MONEY_HINTS = {"total", "amount", "monto", "balance", "deuda", "debt", "limit", "sale", "sales",
+               "venta", "price", "precio", "fee", "usd", "ves", "billed", "paid", "payed"}
+COUNT_HINTS = {"count", "cantidad", "num", "numero", "número", "qty", "usuarios", "users"}
+PERCENT_HINTS = {"rate", "ratio", "porcentaje", "percent", "tasa", "pct"}
+ID_HINTS = {"id", "uuid"}
+
+# Preguntas que piden razonamiento y no solo el dato -> siempre al LLM
+REASONING_HINTS = ("por qué", "por que", "porqué", "explica", "analiza", "análisis", "compara",
+                   "tendencia", "recomienda", "conclusi", "interpreta", "opina")
+
+
+class FastAnswerer:
+    """
+    Respondedor por plantillas (Fast-Path de `generate_answer`).
+    Convierte resultados escalares y tablas pequeñas en un mensaje listo para
+    WhatsApp sin pasar por el LLM. Si el resultado es complejo devuelve None.
+    """
+
+    MAX_ROWS = 10
+    MAX_COLS = 4
+    MAX_TABLE_WIDTH = 45
+
+    # Rutas de respuesta contadas en metrics.ANSWER_PATH
+    PATHS = ("fast", "llm", "snapshot")
+
+    def __init__(self, meta: Optional[Dict[str, Any]] = None):
+        if meta is None:
+            meta = ConfigLoader.load_semantic_layer().get("meta", {}) or {}
+        self.currency = str(meta.get("currency_format", "USD")).upper()
+
+    @staticmethod
+    def record(path: str):
+        metrics.ANSWER_PATH.inc(path=path)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Respuestas por ruta desde el arranque del proceso (fast = plantilla, llm = resumen)."""
+        return {path: int(metrics.ANSWER_PATH.value(path=path)) for path in cls.PATHS}
+
+    # --- Formateo localizado (es: 1.234,56) ---
+    @staticmethod
+    def _group(number: float, decimals: int) -> str:
+        raw = f"{number:,.{decimals}f}"
+        return raw.replace(",", "_").replace(".", ",").replace("_", ".")
+
+    @staticmethod
+    def _tokens(column: str) -> Set[str]:
+        tokens = set(re.split(r"[^a-z0-9áéíóúñ]+", column.lower())) - {""}
+        # Plurales simples: 'ventas' -> 'venta', 'amounts' -> 'amount'
+        return tokens | {t[:-1] for t in tokens if len(t) > 3 and t.endswith("s")}
+
+    @staticmethod
+    def count_columns(sql: Optional[str]) -> Set[str]:
+        """Columnas de salida que son COUNT(...) en el SQL (alias o texto de la expresión)."""
+        if not sql:
+            return set()
+        try:
+            tree = sqlglot.parse_one(sql)
+        except SqlglotError:
+            return set()
+        names = set()
+        for select in tree.find_all(exp.Select):
+            for e in select.expressions:
+                inner = e.this if isinstance(e, exp.Alias) else e
+                if isinstance(inner, exp.Count):
+                    names.add((e.alias or e.sql()).lower())
+        return names
+
+    def _currency_for(self, column: str) -> str:
+        tokens = self._tokens(column)
+        if "ves" in tokens or "bs" in tokens:
+            return "VES"
+        if "usd" in tokens:
+            return "USD"
+        return self.currency
+
+    def format_value(self, column: str, value: Any, is_count: bool = False) -> str:
+        if value is None:
+            return "—"
+        if isinstance(value, bool):
+            return "Sí" if value else "No"
+        if isinstance(value, datetime.datetime):
+            return value.strftime("%d/%m/%Y %H:%M")
+        if isinstance(value, datetime.date):
+            return value.strftime("%d/%m/%Y")
+        if isinstance(value, (int, float, Decimal)):
+            col = column.lower()
+            tokens = self._tokens(column)
+            number = float(value)
+            # Identificadores tal cual: 12345, no 12.345
+            if tokens & ID_HINTS or re.search(r"(_id|[a-z]Id)$", column):
+                return str(value)
+            if is_count or tokens & COUNT_HINTS or col.startswith("count("):
+                return self._group(number, 0)
+            if tokens & PERCENT_HINTS:
+                # Ratios 0..1 se muestran como porcentaje
+                pct = number * 100 if abs(number) <= 1 else number
+                return f"{self._group(pct, 1)}%"
+            # Montos: nunca un entero (los conteos 'total', 'paid', 'limit' son int)
+            if tokens & MONEY_HINTS and not isinstance(value, int):
+                code = self._currency_for(column)
+                symbol = CURRENCY_SYMBOLS.get(code)
+                amount = self._group(number, 2)
+                return f"{symbol}{amount}" if symbol and len(symbol) == 1 else f"{amount} {symbol or code}"
+            if isinstance(value, int) or number.is_integer():
+                return self._group(number, 0)
+            return self._group(number, 2)
+        return str(value)
+
+    @staticmethod
+    def humanize(column: str) -> str:
+        """'COUNT(*)' -> 'Cantidad', 'total_users' -> 'Total users'."""
+        if re.match(r"^\s*count\s*\(", column, re.IGNORECASE):
+            return "Cantidad"
+        label = re.sub(r"[_\s]+", " ", column).strip()
+        return label[:1].upper() + label[1:] if label else column
+
+    # --- Decisión ---
+    def is_simple(self, question: str, rows: List[Dict[str, Any]], truncated: bool = False) -> bool:
+        if truncated or len(rows) > self.MAX_ROWS:
+            return False
+        if rows and len(rows[0]) > self.MAX_COLS:
+            return False
+        q = (question or "").lower()
+        return not any(h in q for h in REASONING_HINTS)
+
+    def try_answer(self, question: str, rows: List[Dict[str, Any]], truncated: bool = False,
+                   sql: Optional[str] = None) -> Optional[str]:
+        """Devuelve la respuesta formateada o None si debe ir al LLM (`sql` identifica los COUNT)."""
+        if rows is None or not self.is_simple(question, rows, truncated):
+            return None
+
+        if not rows:
+            return "No encontré resultados para tu consulta. 🔎"
+
+        columns = list(rows[0].keys())
+        counts = self.count_columns(sql)
+
+        def value(c: str, row: Dict[str, Any]) -> str:
+            return self.format_value(c, row[c], is_count=c.lower() in counts)
+
+        # 1. Escalar: [{'COUNT(*)': 1523}]
+        if len(rows) == 1 and len(columns) == 1:
+            col = columns[0]
+            return f"📊 *{self.humanize(col)}*: {value(col, rows[0])}"
+
+        # 2. Un registro con varias columnas -> ficha
+        if len(rows) == 1:
+            lines = [f"• *{self.humanize(c)}*: {value(c, rows[0])}" for c in columns]
+            return "📋 Resultado:\n" + "\n".join(lines)
+
+        # 3. Lista corta (1-2 columnas)
+        if len(columns) <= 2:
+            lines = []
+            for i, row in enumerate(rows, start=1):
+                parts = [value(c, row) for c in columns]
+                lines.append(f"{i}. *{parts[0]}*" + (f" — {parts[1]}" if len(parts) > 1 else ""))
+            header = " / ".join(self.humanize(c) for c in columns)
+            return f"📋 {header}:\n" + "\n".join(lines)
+
+        # 4. Tabla pequeña (3-4 columnas): monoespaciada si cabe, si no lista
+        cells = [[value(c, row) for c in columns] for row in rows]
+        headers = [self.humanize(c) for c in columns]
+        widths = [max(len(headers[j]), *(len(r[j]) for r in cells)) for j in range(len(columns))]
+        if sum(widths) + 3 * (len(columns) - 1) <= self.MAX_TABLE_WIDTH:
+            def line(values: List[str]) -> str:
+                return " | ".join(v.ljust(w) for v, w in zip(values, widths)).rstrip()
+
+            table = [line(headers), "-+-".join("-" * w for w in widths)] + [line(r) for r in cells]
+            return "📋 Resultado:\n```\n" + "\n".join(table) + "\n```"
+
+        lines = []
+        for i, r in enumerate(cells, start=1):
+            rest = " · ".join(f"{h}: {v}" for h, v in zip(headers[1:], r[1:]))
+            lines.append(f"{i}. *{r[0]}* · {rest}")
+        return "📋 Resultado:\n" + "\n".join(lines)
@@ -1,64 +1,194 @@
 import os
+import re
 import ast
-from langchain_core.prompts import ChatPromptTemplate
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from sqlalchemy import text
 from langgraph.prebuilt import create_react_agent  # MOVED TO TOP-LEVEL
 
 # Importaciones de Arquitectura
 from sql_agent.llm.factory import LLMFactory
 from sql_agent.core.state import AgentState
-from sql_agent.config.loader import ConfigLoader
+from sql_agent.config.loader import ConfigLoader, CONFIG_DIR
+from sql_agent.config.reloader import (
+    ConfigReloader, parse_business_context, parse_dictionary, parse_settings, parse_swagger,
+)
 from sql_agent.database.connection import DatabaseManager
+from sql_agent.database.timeouts import QueryTimeoutError, StatementTimeout
+from sql_agent.database.inspector import SchemaExtractor
+from sql_agent.database.pagination import DEFAULT_MAX_AGGREGATE_ROWS, Continuation, KeysetPaginator
+from sql_agent.semantic.entity_index import EntityIndex
+from sql_agent.semantic.snapshots import MetricSnapshots
+from sql_agent.core.formatter import FastAnswerer
+from sql_agent.api.http import current_api_limit, turn_limit
+from sql_agent.core.result import QueryResult
+from sql_agent.utils.tracing import span
+from sql_agent.utils.executor import LoopLagMonitor, run_cpu
+from sql_agent.utils.singleflight import SingleFlight, flight_key
+from sql_agent.utils import metrics
 
 # --- IMPORTACIÓN DE LA API (NUEVA UBICACIÓN) ---
 try:
-    from sql_agent.api.loader import load_api_tools, load_swagger_summary
+    from sql_agent.api.loader import load_api_tools, load_swagger_summary, _get_swagger_path
     API_AVAILABLE = True
 except ImportError as e:
     API_AVAILABLE = False
     print(f"⚠️ [Warning] No se pudo cargar el módulo API: {e}")
 
+# Señales de pregunta compuesta ("¿cuántos usuarios hay y cuánto se vendió?"): solo
+# entonces se pide al LLM que la descomponga
+COMPOUND_HINTS = re.compile(
+    r"\?.*\?"
+    r"|;"
+    r"|\b(y|además|tambien|también)\s+(cu[aá]nt[oa]s?|qu[eé]|cu[aá]l(es)?|c[oó]mo|d[oó]nde|qui[eé]n(es)?)\b"
+)
+
+# Pedido de la página siguiente de un resultado truncado ("más", "ver más", "los siguientes")
+MORE_HINTS = re.compile(
+    r"^(y\s+)?(ver|dame|mu[eé]strame|muestra|quiero|trae(me)?)?\s*(los\s+|las\s+)?"
+    r"(m[aá]s|siguientes?|siguiente\s+p[aá]gina|contin[uú]a|next|more)"
+    r"(\s+(resultados|filas|registros|datos|por\s+favor))*\s*[.!]*$"
+)
+
 # Rutas
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 DICTIONARY_PATH = os.path.join(BASE_DIR, 'data', 'dictionary.yaml')
 
 class AgentNodes:
+
+    # Llamadas idénticas simultáneas (ej: muchos usuarios preguntando lo mismo
+    # tras una alerta) comparten una sola llamada al LLM / una sola consulta SQL
+    llm_flight = SingleFlight("llm")
+    sql_flight = SingleFlight("sql")
     
     def __init__(self):
         self.settings = ConfigLoader.load_settings()
         self.llm = LLMFactory.create(temperature=0)
+        self.fast_answerer = FastAnswerer()
+        # Límite por consulta SQL (segundos); 0 lo desactiva
+        self.query_timeout = self._query_timeout(self.settings)
         
         # Carga Diccionario SQL
         try:
             with open(DICTIONARY_PATH, 'r', encoding='utf-8') as f:
-                self.data_dictionary = f.read()
+                self._apply_dictionary(f.read())
         except FileNotFoundError:
-            self.data_dictionary = "No data dictionary found."
+            self._apply_dictionary("No data dictionary found.")
 
         # Carga Herramientas API
         self.api_tools = load_api_tools() if API_AVAILABLE else []
 
         # --- OPTIMIZACIÓN SINGLETON (Fase 1) ---
         # Inicializamos el Agente API una sola vez al arranque para evitar overhead
-        if self.api_tools:
-            print("🚀 [Init] Compilando Agente API (Singleton)...")
-            api_instructions = """
-            Eres un operador de APIs preciso.
-            REGLAS:
-            1. Usa las herramientas para obtener datos REALES.
-            2. Si falla, reporta el error exacto.
-            3. NO inventes datos.
-            4. USA EL CONTEXTO: Si el usuario dice "ese endpoint", refiérete al último mencionado en la charla.
-            """
-            # Pre-construimos el agente. Al usar state_modifier, inyectamos las instrucciones sistema
-            # [FIX] state_modifier no disponible en esta versión, inyectamos SystemMessage manualmente en runtime
-            self.api_agent_executor = create_react_agent(self.llm, self.api_tools)
-        else:
-            self.api_agent_executor = None
+        self.api_agent_executor = self._build_api_agent(self.api_tools)
+
+        # --- RECARGA EN CALIENTE ---
+        # Cada callback reemplaza su atributo con una sola asignación: las peticiones
+        # en curso terminan con el valor que ya leyeron y las nuevas ven el actualizado.
+        ConfigReloader.watch(DICTIONARY_PATH, parse_dictionary, self._apply_dictionary)
+        ConfigReloader.watch(str(CONFIG_DIR / "settings.yaml"), parse_settings, self._apply_settings)
+        ConfigReloader.watch(str(CONFIG_DIR / "business_context.yaml"), parse_business_context,
+                             self._apply_business_context)
+        if API_AVAILABLE:
+            ConfigReloader.watch(_get_swagger_path(), parse_swagger, self._apply_swagger)
+
+    @staticmethod
+    def _query_timeout(settings: dict) -> float:
+        return float(os.getenv("DB_QUERY_TIMEOUT", (settings.get("database", {}) or {}).get("timeout", 30)))
+
+    def _build_api_agent(self, api_tools):
+        if not api_tools:
+            return None
+        print("🚀 [Init] Compilando Agente API (Singleton)...")
+        # Las instrucciones de sistema (API_INSTRUCTIONS) se inyectan como SystemMessage en runtime
+        return create_react_agent(self.llm, api_tools)
+
+    def _apply_dictionary(self, raw: str):
+        self.data_dictionary = raw
+        # Prefijo del generador SQL: se arma una vez por versión del diccionario
+        self.sql_prefix = SystemMessage(content=self.SQL_RULES + raw)
+
+    def _apply_settings(self, settings: dict):
+        llm_changed = settings.get("llm") != self.settings.get("llm")
+        self.query_timeout = self._query_timeout(settings)
+        self.settings = settings
+        if llm_changed:
+            print("🔄 [Reload] Configuración LLM modificada: recreando modelo")
+            self.llm = LLMFactory.create(temperature=0)
+            self.api_agent_executor = self._build_api_agent(self.api_tools)
+
+    def _apply_business_context(self, data: dict):
+        # meta.currency_format se lee al construir el FastAnswerer: se reemplaza entero
+        self.fast_answerer = FastAnswerer(data.get("meta", {}) or {})
+
+    def _apply_swagger(self, _spec: dict):
+        api_tools = load_api_tools()
+        executor = self._build_api_agent(api_tools)
+        self.API_INSTRUCTIONS = self.API_RULES + load_swagger_summary()
+        self.api_tools = api_tools
+        self.api_agent_executor = executor
+
+    # --- PROMPTS ---
+    # Cada prompt es un prefijo estático (SystemMessage, byte a byte idéntico entre
+    # llamadas) seguido de un sufijo dinámico (HumanMessage). DeepSeek y Gemini
+    # cachean el prefijo repetido: menos costo y latencia. Nada variable (pregunta,
+    # historial, errores, entidades) debe entrar en el prefijo.
+    ROUTER_SYSTEM = """
+            Eres el Router Inteligente de Credivibes AI.
+            Clasifica la pregunta del usuario en una categoría.
+
+            CATEGORÍAS:
+            1. DATABASE: Para análisis, reportes históricos, conteos, estadísticas de usuarios/ventas. (Lo que está en SQL).
+            2. API: Para consultas de estado en tiempo real, validar un ID específico, o información técnica de endpoints.
+            3. HYBRID: Necesita datos de SQL Y de la API (ej: "estado en la API del usuario con más deuda").
+            4. GENERAL: Saludos o preguntas fuera de contexto.
+
+            Responde SOLO una palabra: DATABASE, API, HYBRID, o GENERAL.
+    """
+
+    SQL_RULES = """
+            Eres un arquitecto de bases de datos MySQL experto.
+            Tu tarea es generar UNA sola consulta SQL ejecutable para responder a la pregunta del usuario.
+
+            REGLAS CRÍTICAS:
+            1. Usa SOLO sintaxis MySQL estándar.
+            2. NO uses Markdown (```sql ... ```). Devuelve solo el código.
+            3. Si la pregunta busca 'últimos' o rankings, usa LIMIT.
+            4. Si hay nombres de columnas ambiguos, usa alias de tabla (t1.columna).
+            5. Si se indican ENTIDADES RESUELTAS, usa esos valores exactos con '=' en lugar de LIKE.
+
+            ESTRUCTURA DE TABLAS (Schema):
+    """
+
+    DECOMPOSE_SYSTEM = """
+            Eres un analista que debe descomponer preguntas compuestas.
+            Divide la pregunta del usuario en sub-preguntas INDEPENDIENTES, cada una respondible con UNA consulta SQL.
+            - Si la pregunta es simple, devuelve una lista con un solo elemento (la pregunta original).
+            - Cada sub-pregunta debe entenderse sola (repite el sujeto o el periodo si hace falta).
+            Responde SOLO un arreglo JSON de strings, ej: ["¿...?", "¿...?"]
+    """
+
+    HYBRID_PLANNER_SYSTEM = """
+            Eres el planificador de tareas de Credivibes AI.
+            La pregunta del usuario necesita datos de la base SQL y de la API en tiempo real.
+            Divídela en pasos: "sql" (consulta analítica) o "api" (consulta a un endpoint).
+            - Pasos independientes no llevan dependencias (se ejecutan en paralelo).
+            - Si un paso necesita el resultado de otro (ej: el ID que devuelve el SQL), indícalo en depends_on.
+            Responde SOLO un arreglo JSON, ej:
+            [{"id": "s1", "kind": "sql", "question": "...", "depends_on": []},
+             {"id": "a1", "kind": "api", "question": "...", "depends_on": ["s1"]}]
+    """
+
+    ANSWER_SYSTEM = """
+            Responde al usuario basándote en los datos obtenidos.
+            Si los datos vienen en varias sub-preguntas, responde cada una en el mismo mensaje;
+            si alguna falló, indícalo sin inventar datos.
+    """
 
     # Guardamos las instrucciones como miembro de clase para usar luego
-    API_INSTRUCTIONS = """
+    API_RULES = """
             Eres un operador de APIs preciso.
             
             REGLAS OPERATIVAS:
@@ -70,8 +200,14 @@ class AgentNodes:
                - USA la herramienta 'requests_get' para obtener la respuesta de la API.
                - Si falla la conexión, reporta el error.
 
+            3. VARIOS RECURSOS (ej: un usuario, sus compras y sus pagos):
+               - Pide TODAS las llamadas 'requests_get' que no dependan entre sí en el MISMO paso
+                 (varias tool calls a la vez); se ejecutan en paralelo.
+               - Solo encadena pasos cuando una llamada necesita un dato de otra (ej: un ID).
+
             Documentación Dinámica (Swagger Summary):
-    """ + (load_swagger_summary() if API_AVAILABLE else "")
+    """
+    API_INSTRUCTIONS = API_RULES + (load_swagger_summary() if API_AVAILABLE else "")
 
     def _clean_content(self, content) -> str:
         """Helper para limpiar respuestas."""
@@ -87,65 +223,98 @@ class AgentNodes:
                 pass 
         return content_str
 
+    async def _clean_content_async(self, content) -> str:
+        """_clean_content fuera del event loop cuando la respuesta es grande (ast.literal_eval)."""
+        return await run_cpu("clean_content", self._clean_content, content, size=len(str(content)))
+
+    async def _invoke(self, messages: list):
+        """Llamada al LLM coalescida por prompt normalizado (temperatura 0: misma respuesta)."""
+        llm = self.llm
+        key = flight_key(id(llm), *(f"{m.type}:{m.content}" for m in messages))
+        response = await self.llm_flight.do(key, lambda: llm.ainvoke(messages))
+        # Copia por llamador: cada hilo guarda su propio mensaje en el checkpoint
+        return response.model_copy()
+
     # --- NODO 0: ROUTER (CLASIFICADOR) ---
     async def classify_intent(self, state: AgentState):
         print("🚦 [Node: Router] Analizando intención del usuario...")
-        
-        prompt = ChatPromptTemplate.from_template(
-            """
-            Eres el Router Inteligente de Credivibes AI.
-            Clasifica la siguiente pregunta en una categoría.
+        ConfigReloader.ensure_started()
+        LoopLagMonitor.ensure_started()
 
-            CATEGORÍAS:
-            1. DATABASE: Para análisis, reportes históricos, conteos, estadísticas de usuarios/ventas. (Lo que está en SQL).
-            2. API: Para consultas de estado en tiempo real, validar un ID específico, o información técnica de endpoints.
-            3. GENERAL: Saludos o preguntas fuera de contexto.
-
-            Pregunta: "{question}"
+        # "más" tras un resultado truncado: página siguiente por keyset, sin LLM
+        if state.get("continuation") and MORE_HINTS.match(state["question"].strip().lower()):
+            print("   👉 Decisión: NEXT_PAGE (continuación guardada)")
+            return {"intent": "NEXT_PAGE", "subquestions": [], "subqueries": None}
 
-            Responde SOLO una palabra: DATABASE, API, o GENERAL.
-            """
-        )
-        chain = prompt | self.llm
-        response = await chain.ainvoke({"question": state["question"]})
-        intent = self._clean_content(response.content).strip().upper()
+        response = await self._invoke([
+            SystemMessage(content=self.ROUTER_SYSTEM),
+            HumanMessage(content=f'Pregunta: "{state["question"]}"'),
+        ])
+        intent = (await self._clean_content_async(response.content)).strip().upper()
         
         # Limpieza extra por si el LLM dice "Es DATABASE"
-        if "DATABASE" in intent: intent = "DATABASE"
+        if "HYBRID" in intent: intent = "HYBRID"
+        elif "DATABASE" in intent: intent = "DATABASE"
         elif "API" in intent: intent = "API"
         else: intent = "GENERAL"
             
         print(f"   👉 Decisión: {intent}")
-        return {"intent": intent}
+        # Reset de los datos por turno (Chainlit no los reinicia en la entrada); la
+        # continuación de la consulta anterior deja de valer con una pregunta nueva
+        return {"intent": intent, "subquestions": [], "subqueries": None, "continuation": None}
 
-    # --- NODO 1: SQL GENERATOR (AUTO-CORRECCIÓN) ---
-    async def write_query(self, state: AgentState):
-        current_iter = state.get("iterations") or 0
-        previous_error = state.get("sql_result", "")
-        
-        # Lógica de Retry / Self-Healing
-        is_retry = False
-        if previous_error and "Error" in str(previous_error) and current_iter > 0:
-            print(f"   🩹 [Self-Healing] Detectado error SQL. Intento de corrección #{current_iter}...")
-            print(f"      contexto: {str(previous_error)[:100]}...")
-            is_retry = True
+    # --- NODO 0.5: SNAPSHOTS DE MÉTRICAS ---
+    async def check_snapshot(self, state: AgentState):
+        """KPIs precalculados: responde sin LLM ni SQL si el snapshot está fresco."""
+        answer = await MetricSnapshots.answer(state["question"], self.fast_answerer)
+        if answer is None:
+            return {"snapshot_hit": False}
+        print("   📸 Respondiendo desde snapshot de métricas")
+        FastAnswerer.record("snapshot")
+        return {"snapshot_hit": True, "messages": [AIMessage(content=answer)]}
 
-        prompt_template = """
-            Eres un arquitecto de bases de datos MySQL experto.
-            Tu tarea es generar UNA sola consulta SQL ejecutable para responder a la pregunta del usuario.
+    # --- NODO 0.75: DESCOMPOSICIÓN DE PREGUNTAS COMPUESTAS ---
+    async def decompose(self, state: AgentState):
+        """Divide preguntas compuestas en sub-preguntas independientes (una consulta SQL cada una)."""
+        config = self.settings.get("decomposition", {}) or {}
+        question = state["question"]
+        # Solo se consulta al LLM si la pregunta parece compuesta (sin costo en el caso común)
+        if not config.get("enabled", True) or not COMPOUND_HINTS.search(question.lower()):
+            return {"subquestions": []}
 
-            ESTRUCTURA DE TABLAS (Schema):
-            {dictionary}
+        print("🧩 [Node: Decompose] Pregunta compuesta: dividiendo en sub-preguntas...")
+        response = await self._invoke([
+            SystemMessage(content=self.DECOMPOSE_SYSTEM),
+            HumanMessage(content=f'Pregunta: "{question}"'),
+        ])
+        parts = self._parse_subquestions(await self._clean_content_async(response.content))
+        parts = parts[:int(config.get("max_subqueries", 4))]
+        if len(parts) < 2:
+            return {"subquestions": []}
+        print(f"   👉 {len(parts)} sub-preguntas: {parts}")
+        return {"subquestions": parts}
 
-            REGLAS CRÍTICAS:
-            1. Usa SOLO sintaxis MySQL estándar.
-            2. NO uses Markdown (```sql ... ```). Devuelve solo el código.
-            3. Si la pregunta busca 'últimos' o rankings, usa LIMIT.
-            4. Si hay nombres de columnas ambiguos, usa alias de tabla (t1.columna).
-        """
+    @staticmethod
+    def _parse_subquestions(content: str) -> List[str]:
+        start, end = content.find("["), content.rfind("]")
+        if start < 0 or end <= start:
+            return []
+        try:
+            items = json.loads(content[start:end + 1])
+        except ValueError:
+            return []
+        return [str(item).strip() for item in items if isinstance(item, str) and item.strip()]
+
+    # --- NODO 1: SQL GENERATOR (AUTO-CORRECCIÓN) ---
+    async def _generate_sql(self, question: str, messages: list, previous: Optional[QueryResult] = None) -> str:
+        """Genera el SQL de una pregunta; `previous` (resultado fallido) activa el modo corrección."""
+        previous_error = f"[{previous.error_code}] {previous.error}" if previous and previous.error else ""
 
-        if is_retry:
-            prompt_template += f"""
+        # Sufijo dinámico: corrección, historial, entidades y la pregunta (siempre al final)
+        suffix = ""
+
+        if previous_error:
+            suffix += f"""
             
             🚨 MODO DE CORRECCIÓN ACTIVADO 🚨
             La consulta anterior FALLÓ con este error:
@@ -156,10 +325,16 @@ class AgentNodes:
             - Si es "syntax error": Revisa comas, paréntesis y palabras clave.
             - Si es "ambiguous column": Añade prefijos de tabla.
             """
+            if previous.error_code == "TIMEOUT":
+                suffix += """
+            ⏱️ LA CONSULTA FUE CANCELADA POR TIEMPO. Escribe una versión MÁS BARATA:
+            - Filtra por rangos de fecha (created_at) y usa columnas indexadas en el WHERE.
+            - Evita SELECT *, subconsultas correlacionadas y funciones sobre columnas filtradas.
+            - Agrega (COUNT/SUM) en lugar de traer detalle y usa LIMIT.
+            """
 
         # [FIX] Inyectar contexto de mensajes anteriores para resolver referencias ("y los activos?")
         history_text = ""
-        messages = state.get("messages", [])
         if messages:
              # Tomamos los últimos 4 mensajes omitiendo el actual (que ya está en question)
              relevant_msgs = messages[:-1][-4:] 
@@ -168,57 +343,179 @@ class AgentNodes:
                      [f"- {m.type.upper()}: {m.content}" for m in relevant_msgs]
                  )
 
-        prompt_template += f"""
+        # Resolución de entidades: menciones ("Farmatodo", nombres mal escritos) -> valores exactos
+        EntityIndex.ensure_started()
+        entity_matches = EntityIndex.resolve(question)
+        entities_text = ""
+        if entity_matches:
+            print(f"   🔎 Entidades resueltas: {[m.value for m in entity_matches]}")
+            entities_text = (
+                "\nENTIDADES RESUELTAS (usa estos valores exactos con '=' en lugar de LIKE):\n"
+                + "\n".join(m.to_prompt() for m in entity_matches)
+            )
+
+        suffix += f"""
             {history_text}
+            {entities_text}
             
-            PREGUNTA ACTUAL: "{{question}}"
+            PREGUNTA ACTUAL: "{question}"
             
             SQL Resultante:
         """
 
-        prompt = ChatPromptTemplate.from_template(prompt_template)
-        
-        chain = prompt | self.llm
-        response = await chain.ainvoke({
-            "dictionary": self.data_dictionary,
-            "question": state["question"]
-        })
+        # El prefijo (reglas + diccionario) ya está armado: no se reformatea por llamada
+        response = await self._invoke([self.sql_prefix, HumanMessage(content=suffix)])
+        return (await self._clean_content_async(response.content)).replace("```sql", "").replace("```", "").strip()
+
+    async def write_query(self, state: AgentState):
+        current_iter = state.get("iterations") or 0
+        previous = QueryResult.from_payload(state.get("query_result"))
         
-        sql = self._clean_content(response.content).replace("```sql", "").replace("```", "").strip()
+        # Lógica de Retry / Self-Healing
+        if previous and previous.error and current_iter > 0:
+            print(f"   🩹 [Self-Healing] Detectado error SQL. Intento de corrección #{current_iter}...")
+            print(f"      contexto: {str(previous.error)[:100]}...")
+            metrics.SQL_RETRIES.inc(error_code=previous.error_code or "SQL_ERROR")
+        else:
+            previous = None
+
+        sql = await self._generate_sql(state["question"], state.get("messages", []), previous)
         print(f"   📝 Generado SQL: {sql[:60]}...")
         
         return {"sql_query": sql, "iterations": current_iter + 1}
 
     # --- NODO 2: SQL EXECUTOR ---
-    async def execute_query(self, state: AgentState):
-        print("⚡ [Node: Exec] Ejecutando SQL...")
+    MAX_RESULT_ROWS = 15
+
+    async def _fetch(self, sql: str):
+        # Lecturas analíticas -> réplica balanceada (o primario si no hay réplicas)
+        async with DatabaseManager.read_connection() as conn:
+            # Límite en servidor (MAX_EXECUTION_TIME) + deadline en cliente con KILL QUERY
+            return await StatementTimeout.fetch(conn, sql, self.query_timeout, self.MAX_RESULT_ROWS)
+
+    async def _execute_sql(self, sql: str, operation: str = "execute_query") -> QueryResult:
+        """Ejecuta un SQL generado y devuelve su QueryResult (los errores quedan en el resultado)."""
+        start = time.perf_counter()
         try:
-            from sql_agent.database.connection import DatabaseManager # Importacion local para evitar ciclos si es necesario, pero mejor usar la global
-            engine = DatabaseManager.get_engine()
-            async with engine.connect() as conn:
-                result = await conn.execute(text(state["sql_query"]))
-                rows = [dict(row._mapping) for row in result.fetchall()] # Mapeo seguro
-                # Truncar si es muy largo
-                if len(rows) > 15: rows = rows[:15] + [{"note": "...más resultados..."}]
-                return {"sql_result": str(rows)}
+            async with span("db", operation) as attrs:
+                # Clave = SQL exacto (sin normalizar espacios: podrían estar dentro de un literal)
+                columns, rows = await self.sql_flight.do(sql.strip().rstrip(";"), lambda: self._fetch(sql))
+                truncated = len(rows) > self.MAX_RESULT_ROWS
+                attrs["rows"] = min(len(rows), self.MAX_RESULT_ROWS)
+                attrs["truncated"] = truncated
+                return QueryResult.from_rows(
+                    columns,
+                    [tuple(row) for row in rows[:self.MAX_RESULT_ROWS]],
+                    truncated=truncated,
+                    elapsed_ms=(time.perf_counter() - start) * 1000,
+                )
+        except QueryTimeoutError as e:
+            print(f"   ⏱️ {e}")
+            return QueryResult.from_error(
+                e, elapsed_ms=(time.perf_counter() - start) * 1000, error_code="TIMEOUT"
+            )
         except Exception as e:
             print(f"   ❌ Error SQL: {e}")
-            return {"sql_result": f"Error SQL: {e}"}
+            return QueryResult.from_error(e, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+    async def execute_query(self, state: AgentState):
+        print("⚡ [Node: Exec] Ejecutando SQL...")
+        sql = state["sql_query"]
+        # Orden total (ORDER BY + desempates) para poder continuar el resultado por keyset
+        prepared = None
+        pagination = self.settings.get("pagination", {}) or {}
+        if pagination.get("enabled", True):
+            dialect = DatabaseManager.get_engine().dialect.name
+            # Claves únicas y filas estimadas: del snapshot cacheado (sin consultar la versión en cada turno)
+            schema = SchemaExtractor.cached_snapshot()
+            if schema is None:
+                try:
+                    schema = await SchemaExtractor.get_schema_snapshot()
+                except Exception:
+                    schema = None
+            prepared = await run_cpu(
+                "keyset_prepare", KeysetPaginator.prepare, sql, dialect, state["question"], self.MAX_RESULT_ROWS,
+                schema, int(pagination.get("max_aggregate_rows", DEFAULT_MAX_AGGREGATE_ROWS)), size=len(sql),
+            )
+        query_result = await self._execute_sql(prepared[0] if prepared else sql)
+        if prepared and not query_result.ok and KeysetPaginator.order_error(query_result.error):
+            # La reescritura no debe romper un SQL válido: si el motor rechaza el ORDER BY
+            # agregado se reintenta el original tal cual (otros errores no se repiten)
+            prepared = None
+            query_result = await self._execute_sql(sql)
+        continuation = KeysetPaginator.advance(prepared[1], query_result) if prepared else None
+        return {
+            "query_result": query_result.to_payload(),
+            "sql_result": "",
+            "continuation": continuation.to_payload() if continuation else None,
+        }
+
+    # --- NODO 2.25: PÁGINA SIGUIENTE ("ver más") ---
+    async def fetch_next_page(self, state: AgentState):
+        """Siguiente página del último resultado truncado: SQL por keyset, sin LLM."""
+        continuation = Continuation.from_payload(state.get("continuation"))
+        sql = KeysetPaginator.next_page_sql(continuation, self.MAX_RESULT_ROWS)
+        print(f"📄 [Node: NextPage] Filas desde la {continuation.shown + 1} (keyset, sin LLM)...")
+        query_result = await self._execute_sql(sql, operation="fetch_next_page")
+        following = KeysetPaginator.advance(continuation, query_result)
+        metrics.NEXT_PAGES.inc(outcome="error" if not query_result.ok else "more" if following else "last")
+        return {
+            # La respuesta se redacta sobre la pregunta original, no sobre "más"
+            "question": f"{continuation.question} (continuación: desde la fila {continuation.shown + 1})",
+            "sql_query": sql,
+            "query_result": query_result.to_payload(),
+            "sql_result": "",
+            "continuation": following.to_payload() if following else None,
+        }
+
+    # --- NODO 2.5: SUB-CONSULTAS EN PARALELO ---
+    SUBQUERY_ATTEMPTS = 2
+
+    async def _run_subquery(self, index: int, question: str, messages: list) -> Dict[str, Any]:
+        """Genera y ejecuta una sub-consulta con un reintento; nunca lanza (aislamiento de fallos)."""
+        start = time.perf_counter()
+        sql, result, previous = "", None, None
+        async with span("subquery", f"subquery_{index}", question=question) as attrs:
+            for attempt in range(1, self.SUBQUERY_ATTEMPTS + 1):
+                try:
+                    sql = await self._generate_sql(question, messages, previous)
+                except Exception as e:
+                    print(f"   ❌ Sub-consulta {index + 1}: no se pudo generar el SQL: {e}")
+                    result = QueryResult.from_error(e, error_code="LLM_ERROR")
+                    break
+                result = await self._execute_sql(sql, operation="subquery")
+                if result.ok:
+                    break
+                metrics.SQL_RETRIES.inc(error_code=result.error_code or "SQL_ERROR")
+                previous = result
+            attrs["attempts"] = attempt
+            attrs["ok"] = result.ok
+        return {
+            "question": question,
+            "sql": sql,
+            "query_result": result.to_payload(),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    async def run_subqueries(self, state: AgentState):
+        subquestions = state.get("subquestions") or []
+        print(f"🧩 [Node: Subqueries] Ejecutando {len(subquestions)} sub-consultas en paralelo...")
+        # Cada sub-consulta toma su propia conexión del pool; un fallo no afecta a las demás
+        results = await asyncio.gather(*(
+            self._run_subquery(i, q, state.get("messages", [])) for i, q in enumerate(subquestions)
+        ))
+        ok = sum(1 for r in results if r["query_result"]["error"] is None)
+        timings = ", ".join(f"{r['elapsed_ms']:.0f}ms" for r in results)
+        print(f"   ✅ {ok}/{len(results)} sub-consultas exitosas | {timings}")
+        return {"subqueries": results, "sql_query": ";\n".join(r["sql"] for r in results if r["sql"])}
 
     # --- NODO 3: API EXECUTOR (OPTIMIZADO) ---
-    async def run_api_tool(self, state: AgentState):
-        """
-        Ejecuta API utilizando el Agente Singleton (Fast-Path).
-        """
-        print("🌐 [Node: API] Ejecutando llamada a herramienta...")
-        
+    async def _run_api(self, question: str, history: list) -> str:
+        """Ejecuta el Agente API Singleton y devuelve su respuesta (o el error) como texto."""
         if not self.api_agent_executor:
-            return {"sql_result": "Error: Las herramientas de API no están configuradas."}
+            return "Error: Las herramientas de API no están configuradas."
 
         # 2. PREPARAR MEMORIA (CRÍTICO) 🧠
-        # Obtenemos el historial previo del estado global
-        history = state.get("messages", [])
-        
         # Truco: Tomamos los últimos 5 mensajes para dar contexto sin saturar
         recent_history = history[-5:] if history else []
 
@@ -226,12 +523,22 @@ class AgentNodes:
         # [FIX] Inyectamos SystemMessage manualmente aquí
         input_messages = [SystemMessage(content=self.API_INSTRUCTIONS)] + list(recent_history)
         
-        if not recent_history or recent_history[-1].content != state["question"]:
-            input_messages.append(HumanMessage(content=state["question"]))
+        if not recent_history or recent_history[-1].content != question:
+            input_messages.append(HumanMessage(content=question))
 
+        # Tope de peticiones simultáneas para las tool calls paralelas de este turno
+        limit_token = current_api_limit.set(turn_limit())
         try:
-            # Ejecutamos el grafo pre-compilado
+            # Ejecutamos el grafo pre-compilado (ToolNode ejecuta en paralelo las tool calls de un paso)
             result = await self.api_agent_executor.ainvoke({"messages": input_messages})
+
+            # Pasos de razonamiento y tool calls por paso (menos pasos = menos idas y vueltas al LLM)
+            ai_steps = [m for m in result["messages"][len(input_messages):] if isinstance(m, AIMessage)]
+            calls_per_step = [len(m.tool_calls) for m in ai_steps if getattr(m, "tool_calls", None)]
+            metrics.API_REACT_STEPS.observe(len(ai_steps))
+            for calls in calls_per_step:
+                metrics.API_TOOL_CALLS_PER_STEP.observe(calls)
+            print(f"   🔁 [API] {len(ai_steps)} pasos ReAct | tool calls por paso: {calls_per_step}")
             
             # Recuperamos el último mensaje
             last_message_obj = result["messages"][-1]
@@ -243,28 +550,152 @@ class AgentNodes:
             # Confiamos en el LLM y el SystemPrompt para no inventar datos.
             
             print(f"   🔙 [DEBUG API]: {str(last_message_content)[:300]}...") 
-            return {"sql_result": f"[Origen API] {last_message_content}"}
+            return f"[Origen API] {last_message_content}"
             
         except Exception as e:
             print(f"   ❌ Error API: {e}")
-            return {"sql_result": f"Error ejecutando API: {str(e)}"}
+            return f"Error ejecutando API: {str(e)}"
+        finally:
+            current_api_limit.reset(limit_token)
+
+    async def run_api_tool(self, state: AgentState):
+        """
+        Ejecuta API utilizando el Agente Singleton (Fast-Path).
+        """
+        print("🌐 [Node: API] Ejecutando llamada a herramienta...")
+        # Obtenemos el historial previo del estado global
+        return {"sql_result": await self._run_api(state["question"], state.get("messages", []))}
+
+    # --- NODO 3.5: HÍBRIDO (SQL + API) ---
+    async def _plan_hybrid(self, question: str) -> List[Dict[str, Any]]:
+        """Plan de pasos {id, kind, question, depends_on}; si el LLM no da uno válido, SQL -> API."""
+        max_steps = int((self.settings.get("hybrid", {}) or {}).get("max_steps", 4))
+        response = await self._invoke([
+            SystemMessage(content=self.HYBRID_PLANNER_SYSTEM),
+            HumanMessage(content=f'Pregunta: "{question}"'),
+        ])
+        content = await self._clean_content_async(response.content)
+        steps = []
+        try:
+            raw = json.loads(content[content.find("["):content.rfind("]") + 1])
+            for item in raw[:max_steps]:
+                if item.get("kind") in ("sql", "api") and item.get("id") and item.get("question"):
+                    steps.append({"id": str(item["id"]), "kind": item["kind"], "question": str(item["question"]),
+                                  "depends_on": [str(d) for d in item.get("depends_on") or []]})
+        except (ValueError, AttributeError, TypeError):
+            steps = []
+        ids = {s["id"] for s in steps}
+        if not steps or len(ids) != len(steps) or not any(s["kind"] == "api" for s in steps):
+            return [
+                {"id": "sql", "kind": "sql", "question": question, "depends_on": []},
+                {"id": "api", "kind": "api", "question": question, "depends_on": ["sql"]},
+            ]
+        for step in steps:
+            step["depends_on"] = [d for d in step["depends_on"] if d in ids and d != step["id"]]
+        return steps
+
+    async def _run_hybrid_step(self, index: int, step: Dict[str, Any], context: str, messages: list) -> Dict[str, Any]:
+        question = step["question"]
+        if context:
+            question += f"\n\nDATOS PREVIOS (resultado de pasos anteriores):\n{context}"
+        start = time.perf_counter()
+        # Latencia por rama en la traza: span branch/sql o branch/api
+        async with span("branch", step["kind"], step=step["id"]):
+            if step["kind"] == "sql":
+                result = await self._run_subquery(index, question, messages)
+            else:
+                result = {"api_result": await self._run_api(question, messages)}
+        result.update(question=step["question"], step=step["id"], kind=step["kind"],
+                      elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+        return result
+
+    @staticmethod
+    def _step_text(result: Dict[str, Any]) -> str:
+        if "api_result" in result:
+            return result["api_result"]
+        return QueryResult.from_payload(result["query_result"]).to_text()
+
+    async def run_hybrid(self, state: AgentState):
+        """Ejecuta el plan por oleadas: los pasos sin dependencias pendientes corren en paralelo."""
+        print("🔀 [Node: Hybrid] Planificando ramas SQL + API...")
+        steps = await self._plan_hybrid(state["question"])
+        print(f"   👉 Plan: {[(s['id'], s['kind'], s['depends_on']) for s in steps]}")
+        messages = state.get("messages", [])
+        done: Dict[str, Dict[str, Any]] = {}
+        pending = list(steps)
+        wave = 0
+        while pending:
+            ready = [s for s in pending if all(d in done for d in s["depends_on"])]
+            if not ready:
+                # Dependencia circular: los pasos restantes se reportan como fallidos
+                for step in pending:
+                    done[step["id"]] = {"question": step["question"], "step": step["id"], "kind": step["kind"],
+                                        "api_result": "Error: dependencia circular en el plan", "elapsed_ms": 0.0}
+                break
+            wave += 1
+            async with span("branch", f"wave_{wave}", steps=len(ready)):
+                results = await asyncio.gather(*(
+                    self._run_hybrid_step(
+                        steps.index(step), step,
+                        "\n".join(self._step_text(done[d]) for d in step["depends_on"]), messages,
+                    )
+                    for step in ready
+                ))
+            for step, result in zip(ready, results):
+                done[step["id"]] = result
+            pending = [s for s in pending if s["id"] not in done]
+
+        results = [done[s["id"]] for s in steps]
+        timings = ", ".join(f"{r['step']}={r['elapsed_ms']:.0f}ms" for r in results)
+        print(f"   ✅ Híbrido completado en {wave} oleada(s) | {timings}")
+        return {"subqueries": results, "sql_query": ";\n".join(r.get("sql", "") for r in results if r.get("sql"))}
+
+    @staticmethod
+    def _subqueries_text(subqueries: List[Dict[str, Any]]) -> str:
+        return "\n\n".join(
+            f"[{i}] {sub['question']}\n{AgentNodes._step_text(sub)}"
+            for i, sub in enumerate(subqueries, 1)
+        )
 
     # --- NODO 4: RESPUESTA FINAL ---
     async def generate_answer(self, state: AgentState):
         print("🗣️ [Node: Answer] Resumiendo...")
-        
-        prompt = ChatPromptTemplate.from_template(
-            """
-            Responde al usuario basándote en los datos obtenidos.
-            Fuente de datos: {intent}
-            Datos: {result}
-            Pregunta: {question}
-            """
-        )
-        chain = prompt | self.llm
-        res = await chain.ainvoke({
-            "intent": state.get("intent", "GENERAL"),
-            "result": state.get("sql_result", "Sin datos"),
-            "question": state["question"]
-        })
-        return {"messages": [res]}
\ No newline at end of file
+
+        # [FAST-PATH] Resultados escalares o tablas pequeñas se formatean sin LLM
+        query_result = QueryResult.from_payload(state.get("query_result"))
+        if state.get("intent") in ("DATABASE", "NEXT_PAGE") and query_result and query_result.ok:
+            fast_answer = self.fast_answerer.try_answer(
+                state["question"], query_result.rows(), query_result.truncated, state.get("sql_query")
+            )
+            if fast_answer is not None:
+                FastAnswerer.record("fast")
+                print(f"   ⚡ Respuesta por plantilla (sin LLM) | Stats: {FastAnswerer.stats()}")
+                return {"messages": [AIMessage(content=fast_answer + self._more_hint(state))]}
+
+        FastAnswerer.record("llm")
+        # Único punto donde el resultado estructurado se convierte a texto (render en el pool de CPU)
+        subqueries = state.get("subqueries") or []
+        if subqueries:
+            result_text = await run_cpu("result_render", self._subqueries_text, subqueries)
+        elif query_result:
+            result_text = await run_cpu("result_render", query_result.to_text,
+                                        size=sum(len(col) for col in query_result.data) * 16)
+        else:
+            result_text = state.get("sql_result") or "Sin datos"
+        res = await self._invoke([
+            SystemMessage(content=self.ANSWER_SYSTEM),
+            HumanMessage(content=(
+                f"Fuente de datos: {state.get('intent', 'GENERAL')}\n"
+                f"Datos: {result_text}\n"
+                f"Pregunta: {state['question']}"
+            )),
+        ])
+        hint = self._more_hint(state)
+        if hint and isinstance(res.content, str):
+            res.content += hint
+        return {"messages": [res]}
+
+    @staticmethod
+    def _more_hint(state: AgentState) -> str:
+        """Aviso de que hay más filas disponibles con "más" (continuación guardada)."""
+        return "\n\n_Escribe *más* para ver los siguientes resultados._" if state.get("continuation") else ""
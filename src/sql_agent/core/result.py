@@ -0,0 +1,154 @@
+import uuid
+import datetime
+from dataclasses import dataclass, field, asdict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+# Códigos de error MySQL más comunes en SQL generado por LLM
+MYSQL_ERROR_CODES = {
+    1054: "UNKNOWN_COLUMN",
+    1052: "AMBIGUOUS_COLUMN",
+    1064: "SYNTAX_ERROR",
+    1146: "UNKNOWN_TABLE",
+    1055: "GROUP_BY",
+    1111: "INVALID_GROUP_FUNCTION",
+    1242: "SUBQUERY_ROWS",
+    2013: "CONNECTION_LOST",
+    1317: "TIMEOUT",   # Query execution was interrupted (KILL QUERY)
+    3024: "TIMEOUT",   # Maximum statement execution time exceeded
+}
+
+
+# Orden de chequeo: bool antes que int (bool es subclase de int) y datetime antes que date
+_TYPE_TAGS = (
+    (bool, "bool"),
+    (int, "int"),
+    (float, "float"),
+    (Decimal, "decimal"),
+    (datetime.datetime, "datetime"),
+    (datetime.date, "date"),
+    (datetime.timedelta, "timedelta"),
+    (uuid.UUID, "uuid"),
+    ((bytes, bytearray), "bytes"),
+)
+
+_DECODERS = {
+    "decimal": Decimal,
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "timedelta": lambda seconds: datetime.timedelta(seconds=seconds),
+    "uuid": uuid.UUID,
+}
+
+
+def _type_tag(value: Any) -> str:
+    """Etiqueta de tipo de una celda."""
+    if value is None:
+        return "null"
+    for types, tag in _TYPE_TAGS:
+        if isinstance(value, types):
+            return tag
+    return "str"
+
+
+def _encode(value: Any, tag: str) -> Any:
+    """Convierte una celda a un primitivo serializable (msgpack/JSON) según su tipo."""
+    if value is None:
+        return None
+    if tag in ("decimal", "uuid"):
+        return str(value)
+    if tag in ("datetime", "date") and isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if tag == "timedelta" and isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if tag == "bytes":
+        return bytes(value)
+    if tag in ("int", "float", "bool"):
+        return value
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+
+def _decode(value: Any, tag: str) -> Any:
+    decoder = _DECODERS.get(tag)
+    if value is None or decoder is None:
+        return value
+    try:
+        return decoder(value)
+    except (TypeError, ValueError, ArithmeticError):
+        return value
+
+
+@dataclass
+class QueryResult:
+    """
+    Resultado estructurado de una consulta SQL.
+    Las filas se guardan en un buffer columnar tipado (una lista por columna)
+    con primitivos serializables, para que el checkpoint (msgpack) sea compacto
+    y los tipos (Decimal, fechas, UUID) se puedan reconstruir.
+    """
+    columns: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    data: List[List[Any]] = field(default_factory=list)
+    row_count: int = 0
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+    error_code: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    # --- Construcción ---
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+                  truncated: bool = False, elapsed_ms: float = 0.0) -> "QueryResult":
+        columns = [str(c) for c in columns]
+        types, data = [], []
+        for j in range(len(columns)):
+            values = [row[j] for row in rows]
+            tag = next((_type_tag(v) for v in values if v is not None), "null")
+            types.append(tag)
+            data.append([_encode(v, tag) for v in values])
+        return cls(columns=columns, types=types, data=data, row_count=len(rows),
+                   truncated=truncated, elapsed_ms=round(elapsed_ms, 2))
+
+    @classmethod
+    def from_error(cls, exc: Exception, elapsed_ms: float = 0.0, error_code: Optional[str] = None) -> "QueryResult":
+        if error_code is None:
+            orig = getattr(exc, "orig", None)
+            errno = orig.args[0] if orig is not None and getattr(orig, "args", None) else None
+            error_code = MYSQL_ERROR_CODES.get(errno, "SQL_ERROR") if isinstance(errno, int) else "SQL_ERROR"
+        return cls(error=str(exc), error_code=error_code, elapsed_ms=round(elapsed_ms, 2))
+
+    # --- Serialización (checkpoint) ---
+    def to_payload(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]]) -> Optional["QueryResult"]:
+        if not payload:
+            return None
+        return cls(**payload)
+
+    # --- Lectura ---
+    @staticmethod
+    def decode(value: Any, tag: str) -> Any:
+        """Valor original de una celda codificada (Decimal, fechas, UUID...)."""
+        return _decode(value, tag)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Reconstruye las filas como diccionarios con sus tipos originales."""
+        decoded = [[_decode(v, tag) for v in col] for col, tag in zip(self.data, self.types)]
+        return [dict(zip(self.columns, values)) for values in zip(*decoded)] if decoded else []
+
+    def to_text(self, max_rows: int = 15) -> str:
+        """Representación textual para el prompt de respuesta."""
+        if self.error:
+            return f"Error SQL [{self.error_code}]: {self.error}"
+        # Usamos los primitivos codificados: evita reprs como Decimal('1.50') en el prompt
+        rows = [dict(zip(self.columns, values)) for values in zip(*self.data)][:max_rows]
+        text = str(rows)
+        if self.truncated:
+            text += f"\n(Nota: se muestran {len(rows)} filas; la consulta devolvió más resultados.)"
+        return text
@@ -1,4 +1,4 @@
-from typing import TypedDict, Annotated, List, Dict, Any
+from typing import TypedDict, Annotated, List, Dict, Any, Optional
 import operator
 from langchain_core.messages import BaseMessage
 
@@ -18,11 +18,29 @@ class AgentState(TypedDict):
     # El SQL generado por el agente (si ya generó alguno)
     sql_query: str
 
-    # Resultado de la ejecución SQL (o mensaje de error)
+    # Resultado textual de la rama API (o mensaje de error de la API)
     sql_result: str
+
+    # Resultado estructurado de la consulta SQL (QueryResult.to_payload()):
+    # columnas, buffer columnar tipado, truncado, filas, tiempo y código de error
+    query_result: Optional[Dict[str, Any]]
     
-    # Intención clasificada (DATABASE / API / GENERAL)
+    # Intención clasificada (DATABASE / API / HYBRID / GENERAL / NEXT_PAGE)
     intent: str
+
+    # True si la pregunta se respondió desde un snapshot de métricas precalculado
+    snapshot_hit: bool
+
+    # Sub-preguntas independientes de una pregunta compuesta (vacío = pregunta simple)
+    subquestions: List[str]
+
+    # Resultado de cada sub-pregunta o paso híbrido:
+    # {question, sql, query_result, elapsed_ms} o {question, api_result, elapsed_ms} (+ step, kind)
+    subqueries: Optional[List[Dict[str, Any]]]
+
+    # Continuación por keyset del último resultado truncado (Continuation.to_payload()):
+    # SQL validado, claves de orden y cursor; "más" pide la página siguiente sin LLM
+    continuation: Optional[Dict[str, Any]]
     
     # Contador de iteraciones para reintentos (Self-Healing)
     iterations: int
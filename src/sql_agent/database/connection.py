@@ -1,12 +1,19 @@
 import os
+import time
 import asyncio
 import atexit
 import warnings
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.database.pool_monitor import PoolMonitor
 
 # Cargar configuración del entorno
 load_dotenv()
@@ -14,19 +21,28 @@ load_dotenv()
 # Suprimir warnings específicos
 warnings.filterwarnings("ignore", message="Event loop is closed")
 
-def get_database_url(show_password: bool = False) -> str:
+def get_database_url(show_password: bool = False, overrides: Optional[Dict[str, Any]] = None) -> str:
     """
     Construye la URL de conexión para SQLAlchemy.
     
     Args:
         show_password: Si es True, incluye la contraseña en la URL
+        overrides: Valores por motor (host, port, user, password, name, url) para réplicas
     """
+    overrides = overrides or {}
+
+    # URL completa explícita (réplica con 'url' o DATABASE_URL para el primario)
+    # ej: sqlite+aiosqlite:///bench.db en benchmarks
+    explicit_url = overrides.get("url") if overrides else os.getenv("DATABASE_URL")
+    if explicit_url:
+        return explicit_url if show_password else make_url(explicit_url).render_as_string(hide_password=True)
+
     driver = os.getenv("DB_DRIVER", "aiomysql")
-    user = os.getenv("DB_USER", "")
-    password = os.getenv("DB_PASSWORD", "")
-    host = os.getenv("DB_HOST", "localhost")
-    port = os.getenv("DB_PORT", "3306")
-    db_name = os.getenv("DB_NAME", "")
+    user = str(overrides.get("user") or os.getenv("DB_USER", ""))
+    password = str(overrides.get("password") or os.getenv("DB_PASSWORD", ""))
+    host = str(overrides.get("host") or os.getenv("DB_HOST", "localhost"))
+    port = str(overrides.get("port") or os.getenv("DB_PORT", "3306"))
+    db_name = str(overrides.get("name") or os.getenv("DB_NAME", ""))
     
     # Codificar caracteres especiales
     safe_password = quote_plus(password) if password else ""
@@ -56,42 +72,246 @@ def get_safe_database_url() -> str:
     """Devuelve la URL segura (sin password visible)"""
     return get_database_url(show_password=False)
 
+def _expand(value: Any) -> Any:
+    """Expande ${VAR} de settings.yaml con variables de entorno."""
+    return os.path.expandvars(value) if isinstance(value, str) else value
+
+@dataclass
+class EngineState:
+    """Estado de salud y latencia de un motor (primario o réplica)."""
+    name: str
+    role: str
+    healthy: bool = True
+    ejected_until: float = 0.0
+    latency_ewma_ms: Optional[float] = None
+    failures: int = 0
+
+    def record_latency(self, ms: float, alpha: float = 0.3):
+        self.latency_ewma_ms = ms if self.latency_ewma_ms is None else alpha * ms + (1 - alpha) * self.latency_ewma_ms
+
 class DatabaseManager:
     """
-    Gestor de conexiones - Versión corregida
+    Gestor de conexiones multi-motor.
+    Administra un motor primario y N réplicas de lectura (settings.yaml -> database.replicas),
+    con balanceo (least_connections / latency), health-checks y expulsión temporal.
     """
-    _engine: Optional[AsyncEngine] = None
+    PRIMARY = "primary"
+
+    _engine: Optional[AsyncEngine] = None  # Alias del primario (compatibilidad)
+    _engines: Dict[str, AsyncEngine] = {}
+    _states: Dict[str, EngineState] = {}
+    _replicas_loaded: bool = False
+    _health_task: Optional[asyncio.Task] = None
     _cleanup_registered: bool = False
+
+    # --- Configuración ---
+    @staticmethod
+    def _db_settings() -> Dict[str, Any]:
+        return (ConfigLoader.load_settings() or {}).get("database", {}) or {}
+
+    @classmethod
+    def _adaptive_settings(cls) -> Dict[str, Any]:
+        return (cls._db_settings().get("pool", {}) or {}).get("adaptive", {}) or {}
+
+    @classmethod
+    def _pool_kwargs(cls, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Parámetros del pool: .env > settings.yaml (database.pool) > defaults; la réplica puede sobreescribir."""
+        pool = {**(cls._db_settings().get("pool", {}) or {}), **((overrides or {}).get("pool", {}) or {})}
+        return {
+            # En modo adaptativo el pre-ping por checkout se reemplaza por pings periódicos
+            "pool_pre_ping": not cls._adaptive_settings().get("enabled", False),
+            "pool_size": int(os.getenv("DB_POOL_SIZE") or pool.get("size", 5)),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or pool.get("max_overflow", 10)),
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE") or pool.get("recycle", 3600)),
+            "pool_timeout": int(pool.get("timeout", 30)),
+            "pool_use_lifo": True,
+            "pool_reset_on_return": True,
+        }
+
+    @classmethod
+    def _create_engine(cls, name: str, role: str, overrides: Optional[Dict[str, Any]] = None) -> AsyncEngine:
+        # Usar URL CON password para la conexión real
+        url_with_password = get_database_url(show_password=True, overrides=overrides)
+        engine = create_async_engine(
+            url_with_password,
+            echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+            **cls._pool_kwargs(overrides),
+        )
+        cls._engines[name] = engine
+        cls._states[name] = EngineState(name=name, role=role)
+
+        # Telemetría del pool (espera de checkout, pre-ping, uso, overflow)
+        PoolMonitor.instrument(name, engine)
+        PoolMonitor.ensure_adaptive(cls._adaptive_settings())
+
+        # Registrar cleanup
+        cls._register_cleanup()
+
+        # Mostrar URL SEGURA (sin password)
+        safe_url = get_database_url(show_password=False, overrides=overrides)
+        print(f"✅ Motor de base de datos inicializado [{name}]")
+        print(f"   📍 {safe_url}")
+        return engine
+
+    @classmethod
+    def _load_replicas(cls):
+        """Crea los motores de réplicas definidos en settings.yaml (una sola vez)."""
+        if cls._replicas_loaded:
+            return
+        cls._replicas_loaded = True
+        replicas = cls._db_settings().get("replicas", {}) or {}
+        for i, raw in enumerate(replicas.get("hosts", []) or []):
+            overrides = {k: _expand(v) for k, v in (raw or {}).items()}
+            if not (overrides.get("host") or overrides.get("url")):
+                print(f"⚠️ Réplica #{i + 1} sin host/url, se omite.")
+                continue
+            name = str(overrides.pop("name", None) or f"replica_{i + 1}")
+            cls._create_engine(name, "replica", overrides)
     
     @classmethod
-    def get_engine(cls) -> AsyncEngine:
-        """Obtiene o crea el motor de base de datos singleton."""
-        if cls._engine is None:
-            # Usar URL CON password para la conexión real
-            url_with_password = get_database_url(show_password=True)
-            
-            # Configuración del engine
-            cls._engine = create_async_engine(
-                url_with_password,
-                echo=os.getenv("SQL_ECHO", "false").lower() == "true",
-                pool_pre_ping=True,
-                pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
-                max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
-                pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "3600")),
-                pool_timeout=30,
-                pool_use_lifo=True,
-                pool_reset_on_return=True,
-            )
-            
-            # Registrar cleanup
-            cls._register_cleanup()
-            
-            # Mostrar URL SEGURA (sin password)
-            safe_url = get_safe_database_url()
-            print(f"✅ Motor de base de datos inicializado")
-            print(f"   📍 {safe_url}")
-        
-        return cls._engine
+    def get_engine(cls, name: str = PRIMARY) -> AsyncEngine:
+        """Obtiene o crea el motor indicado (por defecto el primario singleton)."""
+        if name == cls.PRIMARY:
+            if cls._engine is None:
+                cls._engine = cls._create_engine(cls.PRIMARY, "primary")
+            return cls._engine
+
+        cls._load_replicas()
+        if name not in cls._engines:
+            raise KeyError(f"Motor de base de datos desconocido: {name}")
+        return cls._engines[name]
+
+    # --- Ruteo de lecturas ---
+    @classmethod
+    def _available_replicas(cls) -> List[str]:
+        now = time.monotonic()
+        available = []
+        for name, state in cls._states.items():
+            if state.role != "replica":
+                continue
+            if not state.healthy and now >= state.ejected_until:
+                # Fin de la expulsión: se re-admite a prueba (el health-check decide)
+                state.healthy = True
+            if state.healthy:
+                available.append(name)
+        return available
+
+    @classmethod
+    def choose_read_engine(cls) -> str:
+        """Nombre del motor para una lectura analítica (réplica sana o primario)."""
+        cls._load_replicas()
+        cls._ensure_health_checks()
+        PoolMonitor.ensure_adaptive(cls._adaptive_settings())
+        candidates = cls._available_replicas()
+        if not candidates:
+            return cls.PRIMARY
+
+        policy = str((cls._db_settings().get("replicas", {}) or {}).get("balancing", "least_connections"))
+        if policy == "latency":
+            # Sin medición aún -> 0 para que reciba tráfico y se mida
+            return min(candidates, key=lambda n: cls._states[n].latency_ewma_ms or 0.0)
+        return min(candidates, key=lambda n: cls._engines[n].pool.checkedout())
+
+    @classmethod
+    def get_read_engine(cls) -> AsyncEngine:
+        return cls.get_engine(cls.choose_read_engine())
+
+    @classmethod
+    @asynccontextmanager
+    async def read_connection(cls):
+        """
+        Conexión para consultas SELECT del agente, balanceada entre réplicas.
+        Expulsa la réplica si falla la conexión. La latencia (EWMA) no se mide aquí:
+        la duración de una consulta depende del SQL, no de la salud de la réplica;
+        solo los pings de check_health alimentan el balanceo por latencia.
+        """
+        name = cls.choose_read_engine()
+        engine = cls.get_engine(name)
+        connected = False
+        try:
+            async with engine.connect() as conn:
+                connected = True
+                yield conn
+        except Exception:
+            # Solo un fallo de conexión expulsa la réplica (no un error de SQL del LLM)
+            if not connected:
+                cls._mark_failure(name)
+            raise
+
+    @classmethod
+    def _mark_failure(cls, name: str):
+        state = cls._states.get(name)
+        if state is None or state.role != "replica":
+            return
+        state.failures += 1
+        eject_s = float((cls._db_settings().get("replicas", {}) or {}).get("eject_seconds", 30))
+        state.healthy = False
+        state.ejected_until = time.monotonic() + eject_s
+        print(f"⚠️ Réplica '{name}' expulsada por {eject_s:.0f}s (fallos: {state.failures})")
+
+    # --- Health-checks ---
+    @classmethod
+    async def check_health(cls, timeout: float = 3.0) -> Dict[str, bool]:
+        """Ping a cada réplica; expulsa las caídas y re-admite las recuperadas."""
+        results = {}
+        for name, state in list(cls._states.items()):
+            if state.role != "replica":
+                continue
+            start = time.perf_counter()
+            try:
+                async def _ping():
+                    async with cls._engines[name].connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+                await asyncio.wait_for(_ping(), timeout=timeout)
+                state.record_latency((time.perf_counter() - start) * 1000)
+                if not state.healthy:
+                    print(f"✅ Réplica '{name}' re-admitida")
+                state.healthy, state.failures, state.ejected_until = True, 0, 0.0
+                results[name] = True
+            except Exception as e:
+                print(f"❌ Health-check fallido en '{name}': {e}")
+                cls._mark_failure(name)
+                results[name] = False
+        return results
+
+    @classmethod
+    def _ensure_health_checks(cls):
+        """Lanza el loop de health-checks en segundo plano si hay réplicas y loop activo."""
+        if cls._health_task is not None and not cls._health_task.done():
+            return
+        if not any(s.role == "replica" for s in cls._states.values()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        interval = float((cls._db_settings().get("replicas", {}) or {}).get("health_check_interval", 15))
+
+        async def _loop():
+            # Primer ping inmediato: el balanceo por latencia necesita una medición
+            while True:
+                await cls.check_health()
+                await asyncio.sleep(interval)
+
+        cls._health_task = loop.create_task(_loop())
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Estadísticas por motor: pool, salud y latencia."""
+        stats = {}
+        for name, engine in cls._engines.items():
+            pool = engine.pool
+            state = cls._states[name]
+            stats[name] = {
+                "role": state.role,
+                "healthy": state.healthy,
+                "latency_ewma_ms": round(state.latency_ewma_ms, 2) if state.latency_ewma_ms is not None else None,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            }
+        return stats
     
     @classmethod
     def _register_cleanup(cls):
@@ -103,14 +323,15 @@ class DatabaseManager:
     @classmethod
     def _cleanup_sync(cls):
         """Cleanup seguro al cerrar la aplicación."""
-        if cls._engine is not None:
+        if cls._engines:
             try:
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
                 
                 async def dispose():
-                    await cls._engine.dispose()
-                    cls._engine = None
+                    for engine in list(cls._engines.values()):
+                        await engine.dispose()
+                    cls._reset()
                 
                 loop.run_until_complete(dispose())
                 loop.close()
@@ -118,13 +339,27 @@ class DatabaseManager:
             except Exception as e:
                 # Ignorar errores en cleanup
                 pass
+
+    @classmethod
+    def _reset(cls):
+        for name in list(cls._engines):
+            PoolMonitor.forget(name)
+        cls._engine = None
+        cls._engines = {}
+        cls._states = {}
+        cls._replicas_loaded = False
     
     @classmethod
     async def close(cls):
-        """Cierra el motor de manera explícita y segura."""
-        if cls._engine is not None:
-            await cls._engine.dispose()
-            cls._engine = None
+        """Cierra todos los motores de manera explícita y segura."""
+        if cls._health_task is not None:
+            cls._health_task.cancel()
+            cls._health_task = None
+        await PoolMonitor.stop()
+        if cls._engines:
+            for engine in list(cls._engines.values()):
+                await engine.dispose()
+            cls._reset()
             print("✅ Motor de base de datos cerrado manualmente")
     
     @classmethod
@@ -146,35 +381,37 @@ class DatabaseManager:
             return [row[0] for row in result.fetchall()]
     
     @classmethod
-    async def get_table_info(cls, table_name: str) -> Dict[str, Any]:
-        """Obtiene información de una tabla."""
-        async with cls.get_engine().connect() as conn:
-            # Columnas
-            query = text("""
-                SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_SCHEMA = DATABASE() 
-                AND TABLE_NAME = :table_name
-                ORDER BY ORDINAL_POSITION
-            """)
-            result = await conn.execute(query, {"table_name": table_name})
-            columns = result.fetchall()
-            
-            # Contar filas
-            count_query = text(f"SELECT COUNT(*) FROM `{table_name}`")
-            result = await conn.execute(count_query)
-            row_count = result.scalar()
-            
-            return {
-                "table_name": table_name,
-                "row_count": row_count,
-                "columns": [
-                    {
-                        "name": col[0],
-                        "type": col[1],
-                        "nullable": col[2] == "YES",
-                        "key": col[3] or ""
-                    }
-                    for col in columns
-                ]
-            }
\ No newline at end of file
+    async def get_table_info(cls, table_name: str, exact_count: bool = False) -> Dict[str, Any]:
+        """
+        Obtiene información de una tabla desde el snapshot cacheado del esquema.
+        `row_count` es la estimación de INFORMATION_SCHEMA.TABLES.TABLE_ROWS;
+        con exact_count=True se hace COUNT(*) (recorre toda la tabla).
+        """
+        from .inspector import SchemaExtractor  # import diferido: inspector depende de este módulo
+
+        snapshot = await SchemaExtractor.get_schema_snapshot()
+        info = snapshot.get(table_name)
+        if info is None:
+            raise ValueError(f"La tabla '{table_name}' no existe en el esquema")
+
+        row_count = info["row_estimate"]
+        if exact_count or row_count is None:
+            async with cls.get_engine().connect() as conn:
+                result = await conn.execute(text(f"SELECT COUNT(*) FROM `{table_name}`"))
+                row_count = result.scalar()
+
+        return {
+            "table_name": table_name,
+            "row_count": row_count,
+            "row_count_estimated": not exact_count and info["row_estimate"] is not None,
+            "columns": [
+                {
+                    "name": col["name"],
+                    "type": col["type"],
+                    "column_type": col.get("column_type", col["type"]),
+                    "nullable": col["nullable"],
+                    "key": col["key"],
+                }
+                for col in info["columns"]
+            ],
+        }
@@ -0,0 +1,191 @@
+import os
+import time
+import uuid
+import asyncio
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import sqlglot
+from sqlglot import exp
+from sqlalchemy import text
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.database.connection import DatabaseManager
+from sql_agent.database.timeouts import StatementTimeout
+from sql_agent.utils import metrics
+from sql_agent.utils.executor import run_cpu
+
+# pandas / pyarrow son opcionales: sin pyarrow solo se exporta CSV
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+@dataclass
+class ExportSummary:
+    path: str
+    format: str
+    rows: int
+    bytes: int
+    elapsed_ms: float
+    truncated: bool = False
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+
+class _CsvSink:
+    def __init__(self, path: str):
+        # utf-8-sig: Excel reconoce acentos y ñ al abrir el archivo
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._header = True
+
+    def write(self, columns: List[str], rows: Sequence[Sequence[Any]]):
+        pd.DataFrame.from_records(rows, columns=columns).to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str):
+        self._path = path
+        self._writer = None
+        self._schema = None
+        self._as_text: List[str] = []
+
+    def write(self, columns: List[str], rows: Sequence[Sequence[Any]]):
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        for column in self._as_text:
+            frame[column] = frame[column].map(lambda v: None if v is None else str(v))
+        if self._writer is None:
+            # Esquema del primer bloque; las columnas todo-NULL quedan como texto
+            schema = pa.Table.from_pandas(frame, preserve_index=False).schema
+            self._as_text = [f.name for f in schema if pa.types.is_null(f.type)]
+            for column in self._as_text:
+                schema = schema.set(schema.get_field_index(column), pa.field(column, pa.string()))
+            self._schema = schema
+            self._writer = pq.ParquetWriter(self._path, schema, compression="snappy")
+        table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False, safe=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ResultExporter:
+    """
+    Exportación del resultado completo de una consulta validada a CSV o Parquet.
+    Las filas se leen con un cursor de servidor (`stream`) en bloques de
+    export.chunk_size y cada bloque se escribe en el pool de CPU mientras se
+    lee el siguiente: la memoria queda acotada a dos bloques aunque la tabla
+    tenga millones de filas.
+    """
+
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return ConfigLoader.load_settings().get("export", {}) or {}
+
+    @staticmethod
+    def formats() -> List[str]:
+        if pd is None:
+            return []
+        return ["csv", "parquet"] if pa is not None else ["csv"]
+
+    @staticmethod
+    def _ensure_select(sql: str, dialect: str) -> str:
+        """Solo una sentencia de lectura (SELECT / UNION) llega a la exportación."""
+        statements = [s for s in sqlglot.parse(sql, read=dialect) if s is not None]
+        if len(statements) != 1 or not isinstance(statements[0], (exp.Select, exp.Union)):
+            raise ValueError("Solo se pueden exportar consultas SELECT")
+        return sql.strip().rstrip(";")
+
+    @classmethod
+    async def export(cls, sql: str, fmt: str = "csv", directory: Optional[str] = None) -> ExportSummary:
+        fmt = fmt.lower()
+        if fmt not in cls.formats():
+            raise ValueError(f"Formato no disponible: {fmt} (instala pandas/pyarrow)")
+        config = cls._config()
+        chunk_size = int(config.get("chunk_size", 50000))
+        max_rows = int(config.get("max_rows", 5000000))
+        timeout_s = float(config.get("timeout", 600))
+
+        engine = DatabaseManager.get_read_engine()
+        sql = cls._ensure_select(sql, engine.dialect.name)
+        if engine.dialect.name == "mysql" and timeout_s > 0:
+            sql = StatementTimeout.with_hint(sql, int(timeout_s * 1000)) or sql
+
+        directory = directory or tempfile.mkdtemp(prefix="sql_agent_export_")
+        path = os.path.join(directory, f"resultado_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}.{fmt}")
+        sink = _CsvSink(path) if fmt == "csv" else _ParquetSink(path)
+        start = time.perf_counter()
+        print(f"📤 [Export] {fmt.upper()} en bloques de {chunk_size} filas -> {path}")
+
+        rows = 0
+        truncated = False
+        try:
+            # Conexión directa del motor elegido (réplica o primario): se invalida
+            # explícitamente si la exportación se corta con el cursor a medio leer
+            async with engine.connect() as conn:
+                async def _stream():
+                    nonlocal rows, truncated
+                    result = await conn.stream(text(sql))
+                    columns = list(result.keys())
+                    pending = None
+                    try:
+                        async for chunk in result.partitions(chunk_size):
+                            if max_rows and rows + len(chunk) > max_rows:
+                                chunk = chunk[:max_rows - rows]
+                                truncated = True
+                            if pending is not None:
+                                await pending
+                            # Se escribe este bloque en un hilo mientras se lee el siguiente
+                            pending = asyncio.ensure_future(run_cpu("export_write", sink.write, columns, chunk))
+                            rows += len(chunk)
+                            if truncated:
+                                break
+                        if pending is not None:
+                            await pending
+                            pending = None
+                        if rows == 0:
+                            await run_cpu("export_write", sink.write, columns, [])  # Solo encabezados
+                    finally:
+                        if pending is not None:
+                            # El hilo no se puede interrumpir: se espera antes de cerrar el archivo
+                            await asyncio.gather(pending, return_exceptions=True)
+                        await result.close()
+
+                try:
+                    await asyncio.wait_for(_stream(), timeout=timeout_s if timeout_s > 0 else None)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # Cursor de servidor a medio leer: la conexión no vuelve al pool
+                    await conn.invalidate()
+                    raise
+        except BaseException:
+            await run_cpu("export_write", sink.close)
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        await run_cpu("export_write", sink.close)
+
+        summary = ExportSummary(
+            path=path, format=fmt, rows=rows, bytes=os.path.getsize(path),
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 2), truncated=truncated,
+        )
+        metrics.EXPORT_ROWS.inc(rows, format=fmt)
+        metrics.EXPORT_DURATION.observe(summary.elapsed_ms / 1000, format=fmt)
+        print(f"   ✅ [Export] {rows} filas, {summary.bytes / 1_048_576:.1f} MB en {summary.elapsed_ms / 1000:.1f}s"
+              + (" (recortado a export.max_rows)" if truncated else ""))
+        return summary
@@ -1,45 +1,200 @@
-from sqlalchemy import inspect
-# Eliminamos 'text' ya que no se usa en este archivo específico
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
 from .connection import DatabaseManager
+from sql_agent.utils import metrics
+
+# --- Introspección masiva (MySQL): una consulta por vista de INFORMATION_SCHEMA ---
+TABLES_SQL = """
+    SELECT TABLE_NAME, TABLE_ROWS
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+"""
+COLUMNS_SQL = """
+    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+STATISTICS_SQL = """
+    SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+"""
+FOREIGN_KEYS_SQL = """
+    SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+    FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+"""
+# Huella barata de todo lo que guarda el snapshot: columnas, índices, claves
+# foráneas y filas estimadas / última modificación de cada tabla. Cambia con
+# cualquier ALTER/CREATE/DROP y también cuando InnoDB refresca TABLE_ROWS.
+SCHEMA_VERSION_SQL = """
+    SELECT 'columns', COUNT(*),
+           COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE,
+                                        IS_NULLABLE, COLUMN_KEY, ORDINAL_POSITION))), 0)
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+    UNION ALL
+    SELECT 'indexes', COUNT(*),
+           COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, INDEX_NAME, NON_UNIQUE,
+                                        SEQ_IN_INDEX, COLUMN_NAME))), 0)
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    UNION ALL
+    SELECT 'foreign_keys', COUNT(*),
+           COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME,
+                                        REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME))), 0)
+    FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+    WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+    UNION ALL
+    SELECT 'tables', COUNT(*),
+           COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, TABLE_ROWS, UPDATE_TIME))), 0)
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+"""
+
 
 class SchemaExtractor:
     """
     Responsable de leer la estructura física de la base de datos.
     Ubicación: src/sql_agent/database/inspector.py
+
+    En MySQL lee todo el esquema con un número fijo de consultas a
+    INFORMATION_SCHEMA (en paralelo) y lo cachea por versión de esquema.
+    Otros dialectos usan el Inspector de SQLAlchemy (una consulta por tabla).
     """
-    
+
+    # engine -> (versión del esquema, snapshot)
+    _cache: Dict[str, Tuple[str, Dict[str, Dict[str, Any]]]] = {}
+
+    @staticmethod
+    async def _fetch(engine, sql: str) -> List[Any]:
+        async with engine.connect() as conn:
+            result = await conn.execute(text(sql))
+            return result.fetchall()
+
+    @classmethod
+    async def schema_version(cls, engine) -> Optional[str]:
+        """Hash de la versión del esquema (None si el dialecto no lo soporta: sin caché)."""
+        dialect = engine.dialect.name
+        if dialect == "mysql":
+            rows = await cls._fetch(engine, SCHEMA_VERSION_SQL)
+        elif dialect == "sqlite":
+            rows = await cls._fetch(engine, "PRAGMA schema_version")
+        else:
+            return None
+        return hashlib.sha1(repr([tuple(r) for r in rows]).encode()).hexdigest()[:16]
+
+    @classmethod
+    async def _bulk_mysql(cls, engine) -> Dict[str, Dict[str, Any]]:
+        tables, columns, statistics, foreign_keys = await asyncio.gather(
+            cls._fetch(engine, TABLES_SQL),
+            cls._fetch(engine, COLUMNS_SQL),
+            cls._fetch(engine, STATISTICS_SQL),
+            cls._fetch(engine, FOREIGN_KEYS_SQL),
+        )
+
+        snapshot = {
+            name: {"row_estimate": int(rows or 0), "columns": [], "indexes": {}, "foreign_keys": []}
+            for name, rows in tables
+        }
+        for table, column, data_type, column_type, nullable, key in columns:
+            if table in snapshot:
+                # "type" conserva DATA_TYPE (varchar); "column_type" trae el tipo completo (varchar(255))
+                snapshot[table]["columns"].append({
+                    "name": column, "type": data_type, "column_type": column_type,
+                    "nullable": nullable == "YES", "key": key or "",
+                })
+        for table, index, non_unique, column in statistics:
+            if table in snapshot:
+                entry = snapshot[table]["indexes"].setdefault(index, {"unique": not int(non_unique), "columns": []})
+                entry["columns"].append(column)
+        for table, column, ref_table, ref_column in foreign_keys:
+            if table in snapshot:
+                snapshot[table]["foreign_keys"].append({"column": column, "references": f"{ref_table}.{ref_column}"})
+        return snapshot
+
     @staticmethod
-    async def get_schema_info():
+    async def _inspector_fallback(engine) -> Dict[str, Dict[str, Any]]:
+        # SQLAlchemy Async requiere 'run_sync' para operaciones de inspección (Inspector es síncrono)
+        def sync_inspect(connection):
+            inspector = inspect(connection)
+            data = {}
+            for table in inspector.get_table_names():
+                pk = set(inspector.get_pk_constraint(table).get("constrained_columns") or [])
+                data[table] = {
+                    "row_estimate": None,
+                    "columns": [
+                        {"name": col["name"], "type": str(col["type"]), "nullable": col["nullable"],
+                         "key": "PRI" if col["name"] in pk else ""}
+                        for col in inspector.get_columns(table)
+                    ],
+                    "indexes": {
+                        idx["name"]: {"unique": bool(idx.get("unique")), "columns": list(idx["column_names"])}
+                        for idx in inspector.get_indexes(table)
+                    },
+                    "foreign_keys": [
+                        {"column": col, "references": f"{fk['referred_table']}.{ref}"}
+                        for fk in inspector.get_foreign_keys(table)
+                        for col, ref in zip(fk["constrained_columns"], fk["referred_columns"])
+                    ],
+                }
+            return data
+
+        async with engine.connect() as conn:
+            return await conn.run_sync(sync_inspect)
+
+    @classmethod
+    async def get_schema_snapshot(cls, engine_name: str = "primary") -> Dict[str, Dict[str, Any]]:
+        """
+        Esquema completo: columnas, índices, claves foráneas y filas estimadas por tabla.
+        Se reutiliza mientras la versión del esquema no cambie.
+        """
+        engine = DatabaseManager.get_engine(engine_name)
+        version = await cls.schema_version(engine)
+        cached = cls._cache.get(engine_name)
+        if version is not None and cached is not None and cached[0] == version:
+            metrics.CACHE_EVENTS.inc(cache="schema", result="hit")
+            return cached[1]
+
+        metrics.CACHE_EVENTS.inc(cache="schema", result="miss")
+        if engine.dialect.name == "mysql":
+            snapshot = await cls._bulk_mysql(engine)
+        else:
+            snapshot = await cls._inspector_fallback(engine)
+        if version is not None:
+            cls._cache[engine_name] = (version, snapshot)
+        return snapshot
+
+    @classmethod
+    def cached_snapshot(cls, engine_name: str = "primary") -> Optional[Dict[str, Dict[str, Any]]]:
+        """Último snapshot cacheado sin verificar la versión (None si aún no se leyó)."""
+        cached = cls._cache.get(engine_name)
+        return cached[1] if cached is not None else None
+
+    @classmethod
+    def invalidate(cls, engine_name: Optional[str] = None):
+        if engine_name is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(engine_name, None)
+
+    @classmethod
+    async def get_schema_info(cls):
         """
-        Extrae la lista de tablas y sus columnas usando SQLAlchemy Inspector.
+        Extrae la lista de tablas y sus columnas.
         Retorna un diccionario estructurado.
         """
-        engine = DatabaseManager.get_engine()
-        
-        # Inicializamos el diccionario vacío
-        schema_info = {}
-        
-        # SQLAlchemy Async requiere 'run_sync' para operaciones de inspección (Inspector es síncrono)
-        async with engine.connect() as conn:
-            def sync_inspect(connection):
-                inspector = inspect(connection)
-                tables = inspector.get_table_names()
-                
-                data = {}
-                for table in tables:
-                    columns = inspector.get_columns(table)
-                    # Simplificamos la salida para no saturar al LLM con metadatos innecesarios
-                    data[table] = [
-                        {
-                            "name": col["name"],
-                            "type": str(col["type"]),
-                            "nullable": col["nullable"]
-                        }
-                        for col in columns
-                    ]
-                return data
-
-            # Ejecutamos la función síncrona dentro del contexto asíncrono
-            schema_info = await conn.run_sync(sync_inspect)
-            
-        return schema_info
\ No newline at end of file
+        snapshot = await cls.get_schema_snapshot()
+        # Simplificamos la salida para no saturar al LLM con metadatos innecesarios
+        return {
+            table: [
+                {"name": col["name"], "type": col.get("column_type", col["type"]), "nullable": col["nullable"]}
+                for col in info["columns"]
+            ]
+            for table, info in snapshot.items()
+        }
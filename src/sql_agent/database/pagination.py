@@ -0,0 +1,310 @@
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError, TokenError
+from sqlglot.tokens import TokenType
+
+from sql_agent.core.result import QueryResult
+
+# Alias de la tabla derivada que envuelve el SQL validado en las páginas siguientes
+KEYSET_ALIAS = "_keyset"
+
+# Tipos cuyo valor codificado (QueryResult) no sirve como literal de comparación
+_UNSUPPORTED_TYPES = ("bytes", "timedelta")
+
+# Errores del motor atribuibles al ORDER BY agregado por prepare() (MySQL 1054/1055/3065/1038, SQLite)
+_ORDER_ERROR = re.compile(r"order clause|order by|\bsort\b", re.IGNORECASE)
+
+# Filas estimadas (suma de las tablas fuente) hasta las que se pagina una consulta agregada:
+# cada "más" vuelve a agregar la consulta completa dentro de la tabla derivada
+DEFAULT_MAX_AGGREGATE_ROWS = 50000
+
+
+@dataclass
+class Continuation:
+    """
+    Continuación de un resultado truncado (se guarda en el estado del hilo).
+    `keys` son posiciones de columna con su sentido (orden total del resultado),
+    `cursor` los valores codificados de esas columnas en la última fila mostrada
+    (`types` sus tipos de QueryResult) y `ties` cuántas filas idénticas a ella ya
+    se mostraron (duplicados exactos).
+    """
+    sql: str
+    dialect: str
+    keys: List[Tuple[int, bool]]
+    columns: List[str] = field(default_factory=list)
+    cursor: List[Any] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    shown: int = 0
+    ties: int = 0
+    limit: Optional[int] = None
+    question: str = ""
+
+    def to_payload(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]]) -> Optional["Continuation"]:
+        if not payload:
+            return None
+        data = dict(payload)
+        data["keys"] = [(int(index), bool(desc)) for index, desc in data.get("keys") or []]
+        return cls(**data)
+
+
+def _literal(value: Any, tag: str) -> exp.Expression:
+    """Literal SQL del valor del cursor con su tipo real (un DECIMAL no se compara como texto)."""
+    value = QueryResult.decode(value, tag)
+    if hasattr(value, "isoformat") and not isinstance(value, str):
+        # Fechas como texto 'YYYY-MM-DD HH:MM:SS': MySQL lo convierte al tipo de la columna
+        # y SQLite las guarda así; un CAST(... AS DATETIME) no existe en SQLite
+        return exp.Literal.string(value.isoformat(sep=" ") if hasattr(value, "hour") else value.isoformat())
+    if tag == "uuid":
+        return exp.Literal.string(str(value))
+    return exp.convert(value)
+
+
+class KeysetPaginator:
+    """
+    Paginación por keyset de resultados truncados ("ver más") sin volver a pasar por el LLM.
+    - prepare(): antes de ejecutar, agrega al texto del SQL validado (sin regenerarlo)
+      un ORDER BY total: sus claves + una clave única de la salida (PK o GROUP BY) o,
+      si no se conoce, el resto de columnas; y un LIMIT de una página.
+    - next_page_sql(): envuelve el SQL en una tabla derivada y filtra por las claves de la
+      última fila mostrada (WHERE (k1, k2, ...) > cursor), sin OFFSET que recorra lo ya visto
+      (solo se saltan las filas duplicadas de la última fila que ya se mostraron).
+    Los NULL se ordenan como el menor valor (semántica de MySQL y SQLite).
+    """
+
+    @staticmethod
+    def _limit(tree: exp.Select) -> Optional[int]:
+        limit = tree.args.get("limit")
+        if limit is None:
+            return None
+        value = limit.args.get("expression") or limit.this
+        if isinstance(value, exp.Literal) and value.is_int:
+            return int(value.name)
+        raise ValueError("LIMIT no literal")
+
+    @staticmethod
+    def _aggregated(tree: exp.Select) -> bool:
+        """¿Hay GROUP BY, DISTINCT o funciones de agregado (fuera de ventanas) en la salida?"""
+        if tree.args.get("group") or tree.args.get("distinct"):
+            return True
+        return any(agg.find_ancestor(exp.Window) is None
+                   for e in tree.expressions for agg in e.find_all(exp.AggFunc))
+
+    @staticmethod
+    def _aggregate_only(tree: exp.Select) -> bool:
+        """SELECT de solo agregados sin GROUP BY: devuelve una fila, no hay nada que paginar."""
+        if tree.args.get("group"):
+            return False
+        return all(
+            any(agg.find_ancestor(exp.Window) is None for agg in e.find_all(exp.AggFunc))
+            for e in tree.expressions
+        )
+
+    @staticmethod
+    def _small_sources(tree: exp.Select, schema: Optional[Dict[str, Any]], max_rows: int) -> bool:
+        """Las tablas fuente son conocidas y suman pocas filas estimadas."""
+        tables = {table.name for table in tree.find_all(exp.Table)}
+        estimates = [((schema or {}).get(name) or {}).get("row_estimate") for name in tables]
+        return bool(tables) and all(e is not None for e in estimates) and sum(estimates) <= max_rows
+
+    @staticmethod
+    def _position(selects: List[exp.Expression], target: exp.Expression) -> Optional[int]:
+        """Posición en la salida de una expresión del ORDER BY / GROUP BY (ordinal, alias o expresión)."""
+        if isinstance(target, exp.Literal) and target.is_int:
+            index = int(target.name) - 1
+            return index if 0 <= index < len(selects) else None
+        for i, e in enumerate(selects):
+            inner = e.this if isinstance(e, exp.Alias) else e
+            if inner == target or (isinstance(target, exp.Column) and not target.table
+                                   and isinstance(e, exp.Alias) and e.alias == target.name):
+                return i
+        return None
+
+    @classmethod
+    def _unique_positions(cls, tree: exp.Select, schema: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+        """Columnas de salida que identifican cada fila: el GROUP BY o la PK / índice único NOT NULL."""
+        selects = tree.expressions
+        group = tree.args.get("group")
+        if group:
+            positions = [cls._position(selects, e) for e in group.expressions]
+            return positions if positions and None not in positions else None
+
+        source = tree.args.get("from") or tree.args.get("from_")
+        if tree.args.get("joins") or source is None or not isinstance(source.this, exp.Table):
+            return None
+        info = (schema or {}).get(source.this.name)
+        if not info:
+            return None
+        qualifiers = {"", source.this.name, source.this.alias_or_name}
+        nullable = {c["name"] for c in info.get("columns", []) if c.get("nullable")}
+        candidates = [[c["name"] for c in info.get("columns", []) if c.get("key") == "PRI"]]
+        candidates += [index["columns"] for index in (info.get("indexes") or {}).values()
+                       if index.get("unique") and not set(index["columns"]) & nullable]
+
+        for columns in candidates:
+            positions = []
+            for name in columns:
+                position = next((i for i, e in enumerate(selects)
+                                 if isinstance(e.unalias(), exp.Column) and e.unalias().name == name
+                                 and e.unalias().table in qualifiers), None)
+                if position is None:
+                    break
+                positions.append(position)
+            else:
+                if positions:
+                    return positions
+        return None
+
+    @staticmethod
+    def _tail_start(sql: str, dialect: str) -> int:
+        """Posición del ORDER BY / LIMIT de la consulta principal (fuera de paréntesis) o el final."""
+        depth = 0
+        for token in sqlglot.Dialect.get_or_raise(dialect).tokenize(sql):
+            if token.token_type == TokenType.L_PAREN:
+                depth += 1
+            elif token.token_type == TokenType.R_PAREN:
+                depth -= 1
+            elif depth == 0 and token.token_type in (TokenType.ORDER_BY, TokenType.LIMIT):
+                return token.start
+        return len(sql)
+
+    @staticmethod
+    def order_error(error: Optional[str]) -> bool:
+        """¿El error del motor cita el ORDER BY que agregó prepare()?"""
+        return bool(error and _ORDER_ERROR.search(error))
+
+    @classmethod
+    def prepare(cls, sql: str, dialect: str, question: str = "", page_size: Optional[int] = None,
+                schema: Optional[Dict[str, Any]] = None,
+                max_aggregate_rows: int = DEFAULT_MAX_AGGREGATE_ROWS) -> Optional[Tuple[str, Continuation]]:
+        """
+        (SQL de la primera página, continuación sin cursor) o None si la consulta no es
+        paginable o su resultado no puede superar `page_size` filas (no se reescribe).
+        `schema` (snapshot de SchemaExtractor) aporta las claves únicas y las filas estimadas.
+        """
+        sql = sql.strip().rstrip(";").rstrip()
+        try:
+            tree = sqlglot.parse_one(sql, read=dialect)
+            if not isinstance(tree, exp.Select) or tree.args.get("offset") or tree.args.get("locks"):
+                return None
+            selects = tree.expressions
+            if not selects or any(e.is_star for e in selects) or cls._aggregate_only(tree):
+                return None
+            limit = cls._limit(tree)
+            if page_size is not None and limit is not None and limit <= page_size:
+                return None
+            if cls._aggregated(tree) and not cls._small_sources(tree, schema, max_aggregate_rows):
+                return None  # Cada página volvería a agregar una tabla grande completa
+
+            # Claves del ORDER BY original, resueltas a posiciones de la salida
+            keys: List[Tuple[int, bool]] = []
+            order = tree.args.get("order")
+            for ordered in (order.expressions if order else []):
+                index = cls._position(selects, ordered.this)
+                if index is None:
+                    return None  # Orden por una expresión que no está en la salida
+                if index not in (k for k, _ in keys):
+                    keys.append((index, bool(ordered.args.get("desc"))))
+            # Desempate: una clave única de la salida; si no se conoce, el resto de columnas
+            unique = cls._unique_positions(tree, schema)
+            tie_break = unique if unique is not None else range(len(selects))
+            keys += [(i, False) for i in tie_break if i not in (k for k, _ in keys)]
+
+            # El texto validado se conserva tal cual: solo se reemplaza su ORDER BY / LIMIT final
+            body = sql[:cls._tail_start(sql, dialect)].rstrip()
+        except (ParseError, TokenError, ValueError):
+            return None  # SQL que sqlglot no entiende o LIMIT no literal: se ejecuta sin reescribir
+
+        first_limit = limit
+        if page_size is not None:
+            first_limit = page_size + 1 if limit is None else min(limit, page_size + 1)
+        # Salto de línea: el SQL puede terminar en un comentario "-- ..."
+        first = body + "\nORDER BY " + ", ".join(f"{i + 1}{' DESC' if desc else ''}" for i, desc in keys)
+        if first_limit is not None:
+            first += f" LIMIT {first_limit}"
+        return first, Continuation(sql=body, dialect=dialect, keys=keys, limit=limit, question=question)
+
+    @staticmethod
+    def advance(continuation: Optional[Continuation], result: QueryResult) -> Optional[Continuation]:
+        """Continuación tras mostrar `result` (None si no quedan filas o no se puede continuar)."""
+        if continuation is None or not result.ok or not result.truncated or not result.row_count:
+            return None
+        if len(set(result.columns)) != len(result.columns):
+            return None  # La tabla derivada no admite nombres de columna repetidos
+        if continuation.columns and continuation.columns != result.columns:
+            return None
+        shown = continuation.shown + result.row_count
+        if continuation.limit is not None and shown >= continuation.limit:
+            return None
+        cursor, types = [], []
+        for index, _ in continuation.keys:
+            if result.types[index] in _UNSUPPORTED_TYPES:
+                return None
+            cursor.append(result.data[index][-1])
+            types.append(result.types[index])
+        # Filas finales idénticas a la última (todas las columnas son claves)
+        ties = 1
+        while ties < result.row_count and all(col[-1 - ties] == col[-1] for col in result.data):
+            ties += 1
+        if ties == result.row_count and cursor == continuation.cursor:
+            ties += continuation.ties
+        return Continuation(
+            sql=continuation.sql, dialect=continuation.dialect, keys=continuation.keys,
+            columns=list(result.columns), cursor=cursor, types=types, shown=shown, ties=ties,
+            limit=continuation.limit, question=continuation.question,
+        )
+
+    @staticmethod
+    def next_page_sql(continuation: Continuation, page_size: int) -> str:
+        """SQL de la página siguiente: page_size + 1 filas para detectar si hay más."""
+        dialect = continuation.dialect
+        types = continuation.types or ["str"] * len(continuation.cursor)
+        # WHERE (k1, k2, ...) > cursor expandido por columna (cada una con su sentido y NULLs)
+        columns = [exp.column(continuation.columns[index], table=KEYSET_ALIAS, quoted=True)
+                   for index, _ in continuation.keys]
+        literals = [None if value is None else _literal(value, tag)
+                    for value, tag in zip(continuation.cursor, types)]
+        terms = []
+        for i, ((_, desc), value) in enumerate(zip(continuation.keys, literals)):
+            column = columns[i]
+            if value is None:
+                # NULL es el menor valor: en ASC lo siguiente es cualquier no-NULL; en DESC no hay nada después
+                after = None if desc else exp.Not(this=exp.Is(this=column.copy(), expression=exp.Null()))
+            elif desc:
+                after = exp.or_(exp.LT(this=column.copy(), expression=value.copy()),
+                                exp.Is(this=column.copy(), expression=exp.Null()))
+            else:
+                after = exp.GT(this=column.copy(), expression=value.copy())
+            if after is None:
+                continue
+            same = [
+                exp.Is(this=columns[j].copy(), expression=exp.Null()) if prev is None
+                else exp.EQ(this=columns[j].copy(), expression=prev.copy())
+                for j, prev in enumerate(literals[:i])
+            ]
+            terms.append(exp.and_(*same, after) if same else after)
+        # La página empieza en la última fila mostrada (puede tener duplicados exactos
+        # aún sin mostrar) y OFFSET salta solo las copias que ya se vieron
+        terms.append(exp.and_(*[
+            exp.Is(this=column.copy(), expression=exp.Null()) if value is None
+            else exp.EQ(this=column.copy(), expression=value.copy())
+            for column, value in zip(columns, literals)
+        ]))
+
+        limit = page_size + 1
+        if continuation.limit is not None:
+            limit = min(limit, continuation.limit - continuation.shown)
+        where = exp.or_(*terms).sql(dialect=dialect)
+        order = ", ".join(exp.Ordered(this=column.copy(), desc=desc, nulls_first=not desc).sql(dialect=dialect)
+                          for column, (_, desc) in zip(columns, continuation.keys))
+        alias = exp.to_identifier(KEYSET_ALIAS, quoted=True).sql(dialect=dialect)
+        # El SQL validado va como texto dentro de la tabla derivada (sin pasar por sqlglot)
+        return (f"SELECT * FROM (\n{continuation.sql}\n) AS {alias} WHERE {where} "
+                f"ORDER BY {order} LIMIT {limit} OFFSET {continuation.ties}")
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import functools
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from sql_agent.utils import metrics
+
+
+class PoolMonitor:
+    """
+    Telemetría del pool de SQLAlchemy (eventos + medición de checkout/pre-ping)
+    y modo adaptativo opcional (settings.yaml -> database.pool.adaptive):
+      - Sustituye el pre-ping por checkout por un ping de vida periódico en
+        segundo plano (un error de desconexión invalida la generación del pool).
+      - Ajusta max_overflow dentro de [min_overflow, max_overflow] según la
+        espera media observada al obtener conexiones.
+    """
+
+    _engines: Dict[str, AsyncEngine] = {}
+    _wait_marks: Dict[str, Dict[str, float]] = {}
+    _adaptive_task: Optional[asyncio.Task] = None
+    _adaptive_config: Dict[str, Any] = {}
+
+    @classmethod
+    def instrument(cls, name: str, engine: AsyncEngine):
+        """Registra eventos y cronómetros sobre el pool y el dialecto del motor."""
+        sync_engine = engine.sync_engine
+        pool = sync_engine.pool
+        cls._engines[name] = engine
+
+        # 1. Espera de checkout: se mide alrededor de Pool._do_get (bloquea si no hay conexiones libres)
+        original_do_get = pool._do_get
+
+        @functools.wraps(original_do_get)
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return original_do_get()
+            finally:
+                metrics.POOL_WAIT.observe(time.perf_counter() - start, engine=name)
+
+        pool._do_get = timed_do_get
+
+        # 2. Costo del pre-ping (solo se invoca si pool_pre_ping=True)
+        dialect = sync_engine.dialect
+        original_do_ping = dialect.do_ping
+
+        @functools.wraps(original_do_ping)
+        def timed_do_ping(dbapi_connection):
+            start = time.perf_counter()
+            try:
+                return original_do_ping(dbapi_connection)
+            finally:
+                metrics.POOL_PRE_PING.observe(time.perf_counter() - start, engine=name)
+
+        dialect.do_ping = timed_do_ping
+
+        # 3. Eventos del ciclo de vida de conexiones
+        @event.listens_for(pool, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            metrics.POOL_CONNECTS.inc(engine=name)
+
+        @event.listens_for(pool, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            metrics.POOL_INVALIDATIONS.inc(engine=name)
+
+        metrics.REGISTRY.add_collector(cls.collect)
+
+    @classmethod
+    def collect(cls):
+        """Actualiza gauges de uso del pool (se llama antes de exponer /metrics)."""
+        for name, engine in list(cls._engines.items()):
+            pool = engine.sync_engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            metrics.POOL_IN_USE.set(pool.checkedout(), engine=name)
+            metrics.POOL_OVERFLOW.set(max(pool.overflow(), 0), engine=name)
+            metrics.POOL_SIZE.set(pool.size(), engine=name)
+            metrics.POOL_MAX_OVERFLOW.set(getattr(pool, "_max_overflow", 0), engine=name)
+
+    @classmethod
+    def forget(cls, name: str):
+        cls._engines.pop(name, None)
+        cls._wait_marks.pop(name, None)
+
+    # --- Modo adaptativo ---
+    @classmethod
+    def ensure_adaptive(cls, config: Dict[str, Any]):
+        """Lanza el loop adaptativo (una vez) si está habilitado y hay un loop activo."""
+        if not config.get("enabled") or (cls._adaptive_task is not None and not cls._adaptive_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._adaptive_config = config
+        cls._adaptive_task = loop.create_task(cls._adaptive_loop())
+        print("🧭 [Pool] Modo adaptativo activo (ping de vida en segundo plano + ajuste de overflow)")
+
+    @classmethod
+    async def stop(cls):
+        if cls._adaptive_task is not None:
+            cls._adaptive_task.cancel()
+            cls._adaptive_task = None
+
+    @classmethod
+    async def _liveness_check(cls, name: str, engine: AsyncEngine):
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            # SQLAlchemy invalida la generación del pool ante errores de desconexión:
+            # las conexiones viejas se reabrirán en su próximo checkout.
+            print(f"⚠️ [Pool] Ping de vida fallido en '{name}': {e}")
+
+    @classmethod
+    def _adjust(cls, name: str, engine: AsyncEngine):
+        pool = engine.sync_engine.pool
+        if not hasattr(pool, "_max_overflow"):
+            return
+        cfg = cls._adaptive_config
+        target_ms = float(cfg.get("target_wait_ms", 50))
+        min_overflow = int(cfg.get("min_overflow", 0))
+        max_overflow = int(cfg.get("max_overflow", 30))
+        step = int(cfg.get("step", 2))
+
+        # Espera media de la ventana (diferencia de sum/count del histograma)
+        snap = metrics.POOL_WAIT.snapshot(engine=name)
+        last = cls._wait_marks.get(name, {"sum": 0.0, "count": 0})
+        cls._wait_marks[name] = snap
+        window_count = snap["count"] - last["count"]
+        if window_count <= 0:
+            return
+        mean_ms = (snap["sum"] - last["sum"]) / window_count * 1000
+
+        current = pool._max_overflow
+        if mean_ms > target_ms and current < max_overflow:
+            pool._max_overflow = min(current + step, max_overflow)
+        elif mean_ms < target_ms / 4 and current > min_overflow and pool.overflow() < current - step:
+            pool._max_overflow = max(current - step, min_overflow)
+        if pool._max_overflow != current:
+            print(f"🧭 [Pool] '{name}': espera media {mean_ms:.1f}ms -> max_overflow {current} → {pool._max_overflow}")
+
+    @classmethod
+    async def _adaptive_loop(cls):
+        liveness_interval = float(cls._adaptive_config.get("liveness_interval", 30))
+        adjust_interval = float(cls._adaptive_config.get("adjust_interval", 15))
+        next_liveness = time.monotonic() + liveness_interval
+        while True:
+            await asyncio.sleep(adjust_interval)
+            for name, engine in list(cls._engines.items()):
+                cls._adjust(name, engine)
+            if time.monotonic() >= next_liveness:
+                next_liveness = time.monotonic() + liveness_interval
+                await asyncio.gather(*(cls._liveness_check(n, e) for n, e in list(cls._engines.items())))
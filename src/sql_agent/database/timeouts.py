@@ -0,0 +1,114 @@
+import re
+import asyncio
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from sql_agent.utils import metrics
+
+# Margen del deadline del cliente sobre el límite del servidor:
+# normalmente MySQL corta primero y devuelve un error limpio (3024)
+CLIENT_GRACE_S = 1.0
+
+_LEADING_SELECT = re.compile(r"^(\s*(?:/\*.*?\*/\s*)*)(select)\b", re.IGNORECASE | re.DOTALL)
+
+
+class QueryTimeoutError(Exception):
+    """La consulta superó el tiempo límite y fue cancelada."""
+
+    def __init__(self, timeout_s: float, killed: bool):
+        self.timeout_s = timeout_s
+        self.killed = killed
+        detail = "cancelada en el servidor (KILL QUERY)" if killed else "cancelada en el cliente"
+        super().__init__(f"La consulta superó el tiempo límite de {timeout_s:g}s y fue {detail}.")
+
+
+class StatementTimeout:
+    """
+    Límite de tiempo por consulta para SQL generado por el LLM.
+    - Servidor: hint `MAX_EXECUTION_TIME(ms)` en el SELECT (MySQL 5.7.8+),
+      o variable de sesión `max_execution_time` si no empieza por SELECT.
+    - Cliente: deadline con asyncio; al vencer se ejecuta `KILL QUERY <id>`
+      desde otra conexión y la conexión original se invalida.
+    """
+
+    @staticmethod
+    def with_hint(sql: str, timeout_ms: int) -> Optional[str]:
+        """Inserta el hint tras el primer SELECT; None si la sentencia no empieza por SELECT."""
+        if "MAX_EXECUTION_TIME" in sql.upper():
+            return sql
+        match = _LEADING_SELECT.match(sql)
+        if not match:
+            return None
+        return f"{sql[:match.end(2)]} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */{sql[match.end(2):]}"
+
+    @staticmethod
+    async def server_thread_id(conn: AsyncConnection) -> Optional[int]:
+        """ID del hilo MySQL de la conexión (sin round-trip si el driver lo expone)."""
+        try:
+            raw = await conn.get_raw_connection()
+            driver_conn = getattr(raw, "driver_connection", None)
+            if driver_conn is not None and hasattr(driver_conn, "thread_id"):
+                return int(driver_conn.thread_id())
+        except Exception:
+            pass
+        result = await conn.execute(text("SELECT CONNECTION_ID()"))
+        return int(result.scalar())
+
+    @staticmethod
+    async def kill_query(engine: AsyncEngine, thread_id: int, timeout: float = 5.0) -> bool:
+        """Mata la consulta en curso del hilo indicado (la conexión sigue viva)."""
+        try:
+            async def _kill():
+                async with engine.connect() as killer:
+                    await killer.execute(text(f"KILL QUERY {int(thread_id)}"))
+            await asyncio.wait_for(_kill(), timeout=timeout)
+            print(f"   🔪 KILL QUERY {thread_id} ejecutado")
+            return True
+        except Exception as e:
+            print(f"   ⚠️ No se pudo ejecutar KILL QUERY {thread_id}: {e}")
+            return False
+
+    @classmethod
+    async def fetch(cls, conn: AsyncConnection, sql: str, timeout_s: float,
+                    max_rows: int) -> Tuple[List[str], Sequence[Any]]:
+        """
+        Ejecuta `sql` con límite de tiempo y devuelve (columnas, hasta max_rows + 1 filas).
+        Lanza QueryTimeoutError si vence el deadline.
+        """
+        is_mysql = conn.dialect.name == "mysql"
+        timeout_ms = int(timeout_s * 1000)
+        statement = sql
+        use_session_var = False
+        thread_id = None
+
+        if is_mysql and timeout_s > 0:
+            thread_id = await cls.server_thread_id(conn)
+            hinted = cls.with_hint(sql, timeout_ms)
+            if hinted is not None:
+                statement = hinted
+            else:
+                use_session_var = True
+                await conn.execute(text(f"SET SESSION max_execution_time = {timeout_ms}"))
+
+        async def _run():
+            result = await conn.execute(text(statement))
+            return list(result.keys()), result.fetchmany(max_rows + 1)
+
+        try:
+            if timeout_s <= 0:
+                return await _run()
+            return await asyncio.wait_for(_run(), timeout=timeout_s + CLIENT_GRACE_S)
+        except asyncio.TimeoutError:
+            killed = await cls.kill_query(conn.engine, thread_id) if thread_id is not None else False
+            metrics.SQL_TIMEOUTS.inc(killed=str(killed).lower())
+            # La conexión quedó a mitad de protocolo: se descarta del pool
+            await conn.invalidate()
+            raise QueryTimeoutError(timeout_s, killed)
+        finally:
+            if use_session_var and not conn.invalidated:
+                try:
+                    await conn.execute(text("SET SESSION max_execution_time = DEFAULT"))
+                except Exception:
+                    pass
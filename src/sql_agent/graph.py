@@ -1,20 +1,36 @@
 from langgraph.graph import StateGraph, END
 from sql_agent.core.state import AgentState
 from sql_agent.core.nodes import AgentNodes
+from sql_agent.core.result import QueryResult
+from sql_agent.utils.tracing import traced_node
 
 # --- Lógica Condicional ---
+# Intención -> primer nodo de su rama (el resto va directo a la respuesta)
+INTENT_ROUTES = {
+    "DATABASE": "check_snapshot",
+    "API": "call_api",
+    "HYBRID": "run_hybrid",
+    "NEXT_PAGE": "fetch_next_page",
+}
+
 def route_intent(state: AgentState):
     """Router Principal"""
     intent = state.get("intent", "GENERAL")
-    if intent == "DATABASE": return "write_query"
-    if intent == "API": return "call_api"
-    return "generate_answer"
+    return INTENT_ROUTES.get(intent, "generate_answer")
+
+def route_snapshot(state: AgentState):
+    """Snapshot fresco -> fin; si no, SQL en vivo"""
+    return "hit" if state.get("snapshot_hit") else "miss"
+
+def route_decomposition(state: AgentState):
+    """Pregunta compuesta -> sub-consultas en paralelo; simple -> flujo SQL normal"""
+    return "split" if len(state.get("subquestions") or []) > 1 else "single"
 
 def check_sql_retry(state: AgentState):
     """Router de Reintento SQL"""
-    result = state.get("sql_result", "")
+    result = QueryResult.from_payload(state.get("query_result"))
     iters = state.get("iterations", 0)
-    if "Error" in str(result) and iters < 3:
+    if result is not None and not result.ok and iters < 3:
         return "retry"
     return "done"
 
@@ -23,12 +39,17 @@ def build_graph(checkpointer=None):
     nodes = AgentNodes()
     workflow = StateGraph(AgentState)
     
-    # 1. Añadir Nodos
-    workflow.add_node("router", nodes.classify_intent)
-    workflow.add_node("write_query", nodes.write_query)
-    workflow.add_node("execute_query", nodes.execute_query)
-    workflow.add_node("call_api", nodes.run_api_tool)
-    workflow.add_node("generate_answer", nodes.generate_answer)
+    # 1. Añadir Nodos (instrumentados: latencia por nodo e intención)
+    workflow.add_node("router", traced_node("router", nodes.classify_intent))
+    workflow.add_node("check_snapshot", traced_node("check_snapshot", nodes.check_snapshot))
+    workflow.add_node("decompose", traced_node("decompose", nodes.decompose))
+    workflow.add_node("run_subqueries", traced_node("run_subqueries", nodes.run_subqueries))
+    workflow.add_node("write_query", traced_node("write_query", nodes.write_query))
+    workflow.add_node("execute_query", traced_node("execute_query", nodes.execute_query))
+    workflow.add_node("fetch_next_page", traced_node("fetch_next_page", nodes.fetch_next_page))
+    workflow.add_node("call_api", traced_node("call_api", nodes.run_api_tool))
+    workflow.add_node("run_hybrid", traced_node("run_hybrid", nodes.run_hybrid))
+    workflow.add_node("generate_answer", traced_node("generate_answer", nodes.generate_answer))
     
     # 2. Punto de Entrada
     workflow.set_entry_point("router")
@@ -38,13 +59,32 @@ def build_graph(checkpointer=None):
         "router",
         route_intent,
         {
-            "write_query": "write_query",
+            "check_snapshot": "check_snapshot",
             "call_api": "call_api",
+            "run_hybrid": "run_hybrid",
+            "fetch_next_page": "fetch_next_page",
             "generate_answer": "generate_answer"
         }
     )
     
-    # 4. Rama SQL
+    # 4. Rama SQL (primero snapshots de métricas precalculadas)
+    workflow.add_conditional_edges(
+        "check_snapshot",
+        route_snapshot,
+        {
+            "hit": END,
+            "miss": "decompose"
+        }
+    )
+    workflow.add_conditional_edges(
+        "decompose",
+        route_decomposition,
+        {
+            "split": "run_subqueries",
+            "single": "write_query"
+        }
+    )
+    workflow.add_edge("run_subqueries", "generate_answer")
     workflow.add_edge("write_query", "execute_query")
     workflow.add_conditional_edges(
         "execute_query",
@@ -55,8 +95,14 @@ def build_graph(checkpointer=None):
         }
     )
     
+    # 4b. Página siguiente de un resultado truncado (keyset, sin LLM para el SQL)
+    workflow.add_edge("fetch_next_page", "generate_answer")
+
     # 5. Rama API
     workflow.add_edge("call_api", "generate_answer")
+
+    # 5b. Rama Híbrida (SQL + API por oleadas de dependencias)
+    workflow.add_edge("run_hybrid", "generate_answer")
     
     # 6. Salida
     workflow.add_edge("generate_answer", END)
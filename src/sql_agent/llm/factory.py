@@ -1,51 +1,102 @@
 import os
+from typing import Optional
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 
 from sql_agent.config.loader import ConfigLoader
+from sql_agent.llm.resilient import ResilientChatModel
+from sql_agent.utils.tracing import LLMUsageCallback
+
+# Variable de entorno con la API key de cada proveedor (para decidir si hay secundario)
+PROVIDER_KEYS = {"google": "GOOGLE_API_KEY", "deepseek": "DEEPSEEK_API_KEY"}
 
 class LLMFactory:
     """
     Fábrica actualizada con soporte nativo para DeepSeek V3/R1
     según la documentación oficial.
     """
-    
+
     @staticmethod
     def create(temperature: float = None) -> BaseChatModel:
         settings = ConfigLoader.load_settings()
-        
-        provider = settings.get('llm', {}).get('provider', 'google').lower()
-        model_name = settings.get('llm', {}).get('model', 'gemini-2.0-flash')
-        
+        llm_settings = settings.get('llm', {}) or {}
+        resilience = llm_settings.get('resilience', {}) or {}
+
+        # LLM_PROVIDER (.env) permite forzar el proveedor (ej: 'fake' en benchmarks)
+        provider = (os.getenv("LLM_PROVIDER") or llm_settings.get('provider', 'google')).lower()
+        model_name = llm_settings.get('model', 'gemini-2.0-flash')
+
         # Si no pasan temperatura, usamos la del settings, o 0 por defecto
         if temperature is None:
-            temperature = settings.get('llm', {}).get('temperature', 0)
+            temperature = llm_settings.get('temperature', 0)
 
         print(f"🏭 LLM Factory: Conectando con {provider.upper()} ({model_name}) | Temp: {temperature}...")
 
+        primary = LLMFactory._build(provider, model_name, temperature, llm_settings)
+        secondary = None
+        secondary_cfg = resilience.get('secondary') or {}
+        secondary_provider = (secondary_cfg.get('provider') or '').lower() or None
+        if secondary_provider and secondary_provider != provider and provider != "fake":
+            if os.environ.get(PROVIDER_KEYS.get(secondary_provider, "")):
+                print(f"   🔀 Proveedor secundario (hedge): {secondary_provider.upper()} ({secondary_cfg.get('model')})")
+                secondary = LLMFactory._build(secondary_provider, secondary_cfg.get('model'), temperature, llm_settings)
+            else:
+                print(f"   ⚠️ Sin credenciales para el secundario {secondary_provider}: sin hedge")
+                secondary_provider = None
+        else:
+            secondary_provider = None
+
+        # Deadline por nodo + hedge al secundario (ver llm/resilient.py)
+        return ResilientChatModel(
+            primary=primary,
+            primary_provider=provider,
+            secondary=secondary,
+            secondary_provider=secondary_provider,
+            resilience=resilience,
+        )
+
+    @staticmethod
+    def _build(provider: str, model_name: Optional[str], temperature: float, llm_settings: dict) -> BaseChatModel:
+        # Instrumentación: latencia, tokens y costo por llamada (ver utils/tracing.py)
+        pricing = llm_settings.get('pricing', {}) or {}
+        callbacks = [LLMUsageCallback(provider, model_name, pricing)]
+        # Timeout por petición: sin él una llamada lenta colgaba el turno antes del reintento
+        resilience = llm_settings.get('resilience', {}) or {}
+        request_timeout = float(resilience.get('request_timeout', 30))
+        max_retries = int(resilience.get('max_retries', 1))
+
         if provider == "google":
             return ChatGoogleGenerativeAI(
-                model=model_name,
+                model=model_name or 'gemini-2.0-flash',
                 temperature=temperature,
-                max_retries=2
+                max_retries=max_retries,
+                timeout=request_timeout,
+                callbacks=callbacks
             )
-        
+
         elif provider == "deepseek":
             api_key = os.environ.get("DEEPSEEK_API_KEY")
             if not api_key:
                 raise ValueError("Falta DEEPSEEK_API_KEY en el archivo .env")
-            
+
             # Configuración específica según Docs de DeepSeek
             return ChatOpenAI(
-                model=model_name,
+                model=model_name or 'deepseek-chat',
                 temperature=temperature,
                 api_key=api_key,
                 base_url="https://api.deepseek.com", # 👈 URL Oficial
-                max_retries=2,
-                # DeepSeek soporta hasta 64k tokens de salida en algunos casos, 
+                max_retries=max_retries,
+                timeout=request_timeout,
+                callbacks=callbacks,
+                # DeepSeek soporta hasta 64k tokens de salida en algunos casos,
                 # pero por seguridad para SQL dejamos default o ajustamos si cortara.
             )
-            
+
+        elif provider == "fake":
+            # Modelo determinista offline (benchmarks / load tests)
+            from sql_agent.llm.fake import FakeChatModel
+            return FakeChatModel(callbacks=callbacks)
+
         else:
-            raise ValueError(f"Proveedor no soportado: {provider}")
\ No newline at end of file
+            raise ValueError(f"Proveedor no soportado: {provider}")
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import asyncio
+import time
+import zlib
+from typing import Any, ClassVar, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# Marcadores de los prompts de AgentNodes (ver core/nodes.py)
+ROUTER_MARKER = "Router Inteligente"
+SQL_MARKER = "arquitecto de bases de datos"
+DECOMPOSE_MARKER = "descomponer preguntas compuestas"
+PLANNER_MARKER = "planificador de tareas"
+
+# Separadores de sub-preguntas para la descomposición simulada
+SUBQUESTION_SPLIT = re.compile(r"\?\s*¿|;|\s+(?:y|además)\s+(?=cu[aá]n|qu[eé]|cu[aá]l|c[oó]mo)")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Modelo de chat determinista para benchmarks y pruebas offline.
+    Reconoce el prompt (router, generador SQL o respuesta) y devuelve una
+    respuesta fija con una latencia simulada configurable (FAKE_LLM_LATENCY_MS).
+    Las respuestas por pregunta se registran a nivel de clase con `script()`.
+    """
+
+    latency_ms: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "50"))
+    jitter: float = 0.2
+
+    # Guion compartido por todas las instancias que crea LLMFactory
+    sql_responses: ClassVar[Dict[str, str]] = {}
+    intent_responses: ClassVar[Dict[str, str]] = {}
+    default_sql: ClassVar[str] = "SELECT COUNT(*) FROM users"
+    # Prefijos (SystemMessage) ya vistos: simula la caché de prefijos del proveedor
+    seen_prefixes: ClassVar[set] = set()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @classmethod
+    def script(cls, question: str, sql: Optional[str] = None, intent: str = "DATABASE"):
+        """Registra la respuesta esperada para una pregunta del corpus."""
+        key = question.strip().lower()
+        cls.intent_responses[key] = intent
+        if sql:
+            cls.sql_responses[key] = sql
+
+    @classmethod
+    def load_script(cls, path: str):
+        """Carga un guion JSON [{question, sql, intent}] (workers en subprocesos: FAKE_LLM_SCRIPT)."""
+        with open(path, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                cls.script(item["question"], item.get("sql"), item.get("intent", "DATABASE"))
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        # El modelo falso nunca emite tool_calls: el agente ReAct responde directo
+        return self
+
+    # --- Lógica determinista ---
+    @staticmethod
+    def _current_question(prompt: str) -> str:
+        """Texto tras el último 'Pregunta' del prompt (ignora el historial previo)."""
+        lowered = prompt.lower()
+        idx = lowered.rfind("pregunta")
+        return lowered[idx:] if idx >= 0 else lowered
+
+    def _match(self, prompt: str, table: Dict[str, str]) -> Optional[str]:
+        lowered = self._current_question(prompt)
+        for question in sorted(table, key=len, reverse=True):
+            if question in lowered:
+                return table[question]
+        return None
+
+    def _classify(self, prompt: str) -> str:
+        scripted = self._match(prompt, self.intent_responses)
+        if scripted:
+            return scripted
+        question = self._current_question(prompt)
+        if any(w in question for w in ("hola", "gracias", "buenos días", "buenas")):
+            return "GENERAL"
+        if any(w in question for w in ("api", "endpoint", "tiempo real")):
+            if any(w in question for w in ("con más", "con mayor", "top", "último", "ultimo")):
+                return "HYBRID"
+            return "API"
+        return "DATABASE"
+
+    def _decompose(self, prompt: str) -> str:
+        quoted = re.search(r'"(.*)"', self._current_question(prompt), re.DOTALL)
+        question = quoted.group(1) if quoted else self._current_question(prompt)
+        parts = [p.strip(" ¿?") for p in SUBQUESTION_SPLIT.split(question) if p and p.strip(" ¿?")]
+        return json.dumps([f"¿{p}?" for p in parts], ensure_ascii=False)
+
+    def _respond(self, prompt: str) -> str:
+        if ROUTER_MARKER in prompt:
+            return self._classify(prompt)
+        if DECOMPOSE_MARKER in prompt:
+            return self._decompose(prompt)
+        if PLANNER_MARKER in prompt:
+            # Plan típico: SQL primero y la consulta API encadenada a su resultado
+            quoted = re.search(r'"(.*)"', self._current_question(prompt), re.DOTALL)
+            question = quoted.group(1) if quoted else ""
+            return json.dumps([
+                {"id": "s1", "kind": "sql", "question": question, "depends_on": []},
+                {"id": "a1", "kind": "api", "question": question, "depends_on": ["s1"]},
+            ], ensure_ascii=False)
+        if SQL_MARKER in prompt:
+            return self._match(prompt, self.sql_responses) or self.default_sql
+        # Respuesta final: eco de la etiqueta "#N" de la pregunta (correlación en load tests)
+        tags = re.findall(r"#\d+", prompt)
+        suffix = f" {tags[-1]}" if tags else ""
+        return f"Respuesta simulada basada en los datos obtenidos.{suffix}"
+
+    def _delay(self, prompt: str) -> float:
+        # Jitter determinista por prompt (mismo prompt -> misma latencia)
+        spread = (zlib.crc32(prompt.encode("utf-8")) % 1000) / 1000.0
+        factor = 1 + self.jitter * (2 * spread - 1)
+        return max(self.latency_ms * factor, 0) / 1000.0
+
+    def _build_result(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = self._respond(prompt)
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        if messages and isinstance(messages[0], SystemMessage):
+            prefix = str(messages[0].content)
+            key = zlib.crc32(prefix.encode("utf-8"))
+            if key in self.seen_prefixes:
+                usage["input_token_details"] = {"cache_read": len(prefix) // 4}
+            self.seen_prefixes.add(key)
+        message = AIMessage(content=content, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        time.sleep(self._delay(prompt))
+        return self._build_result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        await asyncio.sleep(self._delay(prompt))
+        return self._build_result(messages)
+
+
+if os.getenv("FAKE_LLM_SCRIPT"):
+    FakeChatModel.load_script(os.environ["FAKE_LLM_SCRIPT"])
@@ -0,0 +1,178 @@
+import time
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, ClassVar, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from sql_agent.llm.scheduler import LLMScheduler
+from sql_agent.utils import metrics
+from sql_agent.utils.tracing import current_node
+
+# Latencias recientes por (proveedor, rol) para estimar el p95 del primario
+WINDOW_SIZE = 200
+# Deadline si settings.yaml no define llm.resilience.deadlines.default (mismo valor que trae)
+DEFAULT_DEADLINE = 60.0
+
+
+class LLMDeadlineError(TimeoutError):
+    """Ningún proveedor respondió antes del deadline del rol (nodo)."""
+
+    def __init__(self, role: str, deadline: float):
+        super().__init__(f"El LLM no respondió en {deadline:.1f}s (rol: {role})")
+        self.role = role
+        self.deadline = deadline
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(quantile * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class ResilientChatModel(BaseChatModel):
+    """
+    Envoltorio de LLMFactory: deadline por rol (nodo del grafo) y hedge al
+    proveedor secundario cuando el primario no respondió al llegar a su p95
+    (o falló). Se usa la primera respuesta válida y se cancela la otra.
+    Los clientes internos llevan los callbacks de uso (latencia/tokens por proveedor)
+    y cada intento pasa por LLMScheduler.
+    """
+
+    primary: Any
+    primary_provider: str
+    secondary: Any = None
+    secondary_provider: Optional[str] = None
+    resilience: Dict[str, Any] = {}
+
+    _latencies: ClassVar[Dict[Tuple[str, str], Deque[float]]] = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+
+    @property
+    def _llm_type(self) -> str:
+        return "resilient-chat"
+
+    # --- Configuración por rol ---
+    def _deadline(self, role: str) -> float:
+        deadlines = self.resilience.get("deadlines", {}) or {}
+        return float(deadlines.get(role, deadlines.get("default", DEFAULT_DEADLINE)))
+
+    def _hedge_delay(self, role: str) -> Optional[float]:
+        """Segundos a esperar al primario antes de lanzar el secundario (None = sin hedge)."""
+        hedge = self.resilience.get("hedge", {}) or {}
+        if self.secondary is None or not hedge.get("enabled", True):
+            return None
+        samples = list(self._latencies[(self.primary_provider, role)])
+        if len(samples) < int(hedge.get("min_samples", 20)):
+            return float(hedge.get("default_delay", 6))
+        return max(_percentile(samples, float(hedge.get("quantile", 0.95))), float(hedge.get("min_delay", 1.5)))
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ResilientChatModel":
+        # El agente ReAct enlaza herramientas: se enlazan en ambos proveedores
+        return self.model_copy(update={
+            "primary": self.primary.bind_tools(tools, **kwargs),
+            "secondary": self.secondary.bind_tools(tools, **kwargs) if self.secondary is not None else None,
+        })
+
+    # --- Ejecución ---
+    async def _call(self, model: Any, provider: str, role: str, messages: List[BaseMessage],
+                    stop: Optional[List[str]], kwargs: Dict[str, Any],
+                    slot_acquired: Optional[asyncio.Future] = None):
+        start = None
+        try:
+            # Turno del planificador (límites por proveedor, prioridad, equidad por usuario);
+            # la latencia para el p95 se mide sin la espera en cola
+            async with LLMScheduler.slot(provider, weight=LLMScheduler.weight(role)):
+                start = time.perf_counter()
+                if slot_acquired is not None and not slot_acquired.done():
+                    slot_acquired.set_result(asyncio.get_running_loop().time())
+                message = await model.ainvoke(messages, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            if start is not None:
+                # Muestra censurada: tardó al menos esto (ganó el otro proveedor o venció el deadline).
+                # Sin ella el p95 solo vería las respuestas rápidas y el hedge se dispararía cada vez antes
+                self._latencies[(provider, role)].append(time.perf_counter() - start)
+            metrics.LLM_ATTEMPTS.inc(provider=provider, role=role, outcome="cancelled")
+            raise
+        except Exception:
+            metrics.LLM_ATTEMPTS.inc(provider=provider, role=role, outcome="error")
+            raise
+        self._latencies[(provider, role)].append(time.perf_counter() - start)
+        metrics.LLM_ATTEMPTS.inc(provider=provider, role=role, outcome="ok")
+        return message
+
+    async def _race(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]):
+        role = current_node.get()
+        deadline = self._deadline(role)
+        hedge_delay = self._hedge_delay(role)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        def launch(model: Any, provider: str, slot_acquired: Optional[asyncio.Future] = None) -> asyncio.Future:
+            task = asyncio.ensure_future(self._call(model, provider, role, messages, stop, kwargs, slot_acquired))
+            providers[task] = provider
+            return task
+
+        providers: Dict[asyncio.Future, str] = {}
+        # El p95 se mide desde que el primario obtiene turno en LLMScheduler: el reloj
+        # del hedge arranca ahí, no mientras la llamada sigue en cola (con backlog
+        # todas las llamadas "superarían" su p95 y se duplicaría la carga)
+        slot_acquired = loop.create_future()
+        pending = {launch(self.primary, self.primary_provider, slot_acquired)}
+        hedge_at: Optional[float] = None
+        hedged = False
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = loop.time()
+                if now - start >= deadline:
+                    break
+                timeout = deadline - (now - start)
+                waiting = set(pending)
+                if hedge_delay is not None and not hedged:
+                    if hedge_at is None:
+                        waiting.add(slot_acquired)
+                    else:
+                        timeout = min(timeout, max(hedge_at - now, 0))
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is slot_acquired:
+                        hedge_at = slot_acquired.result() + hedge_delay
+                        continue
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    print(f"⚠️ [LLM] {providers[task]} falló (rol {role}): {error}")
+
+                # Hedge: el primario superó su p95 (desde su turno) o falló -> se lanza el secundario en paralelo
+                if hedge_delay is not None and not hedged and (
+                        error is not None or (hedge_at is not None and loop.time() >= hedge_at)):
+                    hedged = True
+                    reason = "error" if error is not None else "slow"
+                    metrics.LLM_FALLBACKS.inc(primary=self.primary_provider, secondary=self.secondary_provider,
+                                              role=role, reason=reason)
+                    print(f"🔀 [LLM] Hedge a {self.secondary_provider} ({reason}, {loop.time() - start:.1f}s, rol {role})")
+                    pending.add(launch(self.secondary, self.secondary_provider))
+        finally:
+            for task in pending:
+                task.cancel()
+            slot_acquired.cancel()
+
+        if not pending and error is not None:
+            raise error
+        metrics.LLM_FALLBACKS.inc(primary=self.primary_provider, secondary=self.secondary_provider or "-",
+                                  role=role, reason="deadline")
+        raise LLMDeadlineError(role, deadline)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = await self._race(messages, stop, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        # Ruta síncrona (scripts): solo el primario, con el timeout de su cliente
+        message = self.primary.invoke(messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
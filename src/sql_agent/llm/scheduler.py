@@ -0,0 +1,160 @@
+import time
+import heapq
+import asyncio
+import itertools
+import contextvars
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.utils import metrics
+from sql_agent.utils.tracing import current_thread
+
+# Clase de prioridad de las llamadas del contexto actual (el hidratador usa "background")
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar("current_priority", default="interactive")
+
+DEFAULT_PRIORITIES = ("interactive", "background")
+
+
+@contextmanager
+def priority(name: str):
+    """Marca las llamadas al LLM del bloque con una clase de prioridad."""
+    token = current_priority.set(name)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+@dataclass(order=True)
+class _Ticket:
+    rank: int
+    start_tag: float
+    seq: int
+    provider: str = field(compare=False)
+    flow: str = field(compare=False)
+    priority: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.perf_counter)
+    cost: float = field(compare=False, default=1.0)  # Avance del finish tag de su flujo (1/peso)
+
+
+class LLMScheduler:
+    """
+    Planificador central de llamadas al LLM (todas pasan por ResilientChatModel).
+    - Límite global y por proveedor de llamadas simultáneas (evita los 429).
+    - Clases de prioridad: interactive (WhatsApp/Chainlit) antes que background.
+    - Dentro de cada clase, encolado justo ponderado por thread_id (Start-time
+      Fair Queuing): un usuario con muchas llamadas no acapara a los demás.
+      Cada llamada avanza el turno de su usuario en 1/peso (llm.scheduler.weights
+      por rol): los roles con más peso consumen menos de su cuota.
+    """
+
+    _waiting: List[_Ticket] = []
+    _active: Dict[str, int] = defaultdict(int)
+    _active_total = 0
+    _virtual_time = 0.0
+    _finish_tags: Dict[str, float] = {}
+    _seq = itertools.count()
+
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return (ConfigLoader.load_settings().get("llm", {}) or {}).get("scheduler", {}) or {}
+
+    @classmethod
+    def weight(cls, role: str) -> float:
+        """Peso de una llamada del rol (nodo) en la cola justa (llm.scheduler.weights)."""
+        weights = cls._config().get("weights", {}) or {}
+        return float(weights.get(role, weights.get("default", 1.0)))
+
+    @classmethod
+    def _rank(cls, config: Dict[str, Any], name: str) -> int:
+        classes = list(config.get("priorities") or DEFAULT_PRIORITIES)
+        return classes.index(name) if name in classes else len(classes)
+
+    @classmethod
+    def _dispatch(cls):
+        """Concede turnos en orden (prioridad, start tag) respetando los límites."""
+        config = cls._config()
+        max_total = int(config.get("max_concurrency", 16))
+        limits = config.get("providers", {}) or {}
+        default_limit = int(config.get("default_provider_limit", 8))
+
+        blocked = []
+        while cls._waiting and cls._active_total < max_total:
+            ticket = heapq.heappop(cls._waiting)
+            if ticket.future.done():  # Cancelado mientras esperaba
+                continue
+            if cls._active[ticket.provider] >= int(limits.get(ticket.provider, default_limit)):
+                blocked.append(ticket)  # Su proveedor está lleno: pasa el siguiente
+                continue
+            cls._active[ticket.provider] += 1
+            cls._active_total += 1
+            cls._virtual_time = max(cls._virtual_time, ticket.start_tag)
+            ticket.future.set_result(None)
+        for ticket in blocked:
+            heapq.heappush(cls._waiting, ticket)
+        metrics.LLM_QUEUE_DEPTH.set(len(cls._waiting))
+
+    @classmethod
+    def _release(cls, provider: str):
+        cls._active[provider] -= 1
+        cls._active_total -= 1
+        metrics.LLM_IN_FLIGHT.set(cls._active[provider], provider=provider)
+        cls._dispatch()
+
+    @classmethod
+    def _abandon(cls, ticket: _Ticket):
+        """Saca de la cola un ticket cancelado sin turno (no cuenta en la profundidad ni en la cuota)."""
+        try:
+            cls._waiting.remove(ticket)
+        except ValueError:
+            return
+        # Devuelve su costo al flujo: las llamadas posteriores del mismo usuario adelantan su turno
+        for other in cls._waiting:
+            if other.flow == ticket.flow and other.start_tag > ticket.start_tag:
+                other.start_tag -= ticket.cost
+        if ticket.flow in cls._finish_tags:
+            cls._finish_tags[ticket.flow] -= ticket.cost
+        heapq.heapify(cls._waiting)
+        metrics.LLM_QUEUE_DEPTH.set(len(cls._waiting))
+
+    @classmethod
+    @asynccontextmanager
+    async def slot(cls, provider: str, weight: float = 1.0):
+        config = cls._config()
+        if not config.get("enabled", True):
+            yield
+            return
+
+        # thread_id del turno (lo publica traced_node desde el config de LangGraph: remote_jid
+        # en WhatsApp, id de sesión en Chainlit); fuera del grafo todas las llamadas comparten "-"
+        flow = current_thread.get()
+        prio = current_priority.get()
+        start_tag = max(cls._virtual_time, cls._finish_tags.get(flow, 0.0))
+        cost = 1.0 / max(weight, 1e-6)
+        cls._finish_tags[flow] = start_tag + cost
+        if len(cls._finish_tags) > 4096:
+            # Flujos inactivos: su finish tag ya quedó detrás del tiempo virtual
+            cls._finish_tags = {f: t for f, t in cls._finish_tags.items() if t > cls._virtual_time}
+
+        ticket = _Ticket(cls._rank(config, prio), start_tag, next(cls._seq), provider, flow, prio,
+                         asyncio.get_running_loop().create_future(), cost=cost)
+        heapq.heappush(cls._waiting, ticket)
+        cls._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                cls._release(provider)  # Se le concedió el turno justo al cancelarse
+            else:
+                cls._abandon(ticket)
+            raise
+        metrics.LLM_QUEUE_WAIT.observe(time.perf_counter() - ticket.enqueued_at, provider=provider, priority=prio)
+        metrics.LLM_IN_FLIGHT.set(cls._active[provider], provider=provider)
+        try:
+            yield
+        finally:
+            cls._release(provider)
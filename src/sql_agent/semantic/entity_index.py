@@ -0,0 +1,324 @@
+import re
+import json
+import time
+import asyncio
+import unicodedata
+from difflib import SequenceMatcher
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.database.connection import DatabaseManager
+from sql_agent.utils import metrics
+
+# thefuzz es opcional: sin él se usa difflib (más lento, mismo criterio)
+try:
+    from thefuzz import fuzz
+except ImportError:
+    fuzz = None
+
+# Columnas candidatas para refresco incremental (en orden de preferencia)
+WATERMARK_COLUMNS = ("updated_at", "created_at")
+
+# Palabras que nunca forman parte de una mención de entidad
+STOPWORDS = {
+    "de", "del", "la", "las", "el", "los", "en", "y", "o", "a", "al", "un", "una", "por", "para", "con",
+    "que", "cual", "cuales", "cuanto", "cuantos", "cuantas", "como", "me", "mi", "mis", "su", "sus",
+    "ventas", "venta", "compras", "compra", "pagos", "pago", "total", "cliente", "clientes", "comercio",
+    "comercios", "tienda", "usuario", "usuarios", "muestrame", "dame", "lista", "hoy", "ayer", "mes",
+    "semana", "ano", "este", "esta", "ultimos", "ultimas", "todos", "todas", "hay", "tiene", "tienen",
+}
+
+
+def normalize(value: str) -> str:
+    """Minúsculas, sin acentos ni signos y con espacios colapsados."""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(c for c in value if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", value).strip()
+
+
+def trigrams(value: str) -> Set[str]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class EntityMatch:
+    mention: str
+    value: str
+    table: str
+    column: str
+    key_column: str
+    key: Any  # None si varios registros comparten el valor: se filtra por valor, no por clave
+    score: float
+
+    def to_prompt(self) -> str:
+        # JSON: comillas o barras invertidas en los valores no rompen el literal del prompt
+        entry = {"mencion": self.mention, "columna": f"{self.table}.{self.column}", "valor": self.value}
+        if self.key is not None:
+            entry["clave"] = {self.key_column: self.key}
+        entry["similitud"] = round(self.score)
+        return "- " + json.dumps(entry, ensure_ascii=False, default=str)
+
+
+@dataclass
+class _Entry:
+    value: str
+    normalized: str
+    grams: Set[str]
+    source: Tuple[str, str, str]  # (tabla, columna, columna clave)
+    key: Any
+
+
+class EntityIndex:
+    """
+    Índice en memoria de valores de columnas "buscables" (nombres de comercios,
+    clientes, sucursales...) para resolver menciones del usuario a claves exactas
+    antes de generar SQL (evita LIKE '%...%' que escanean o no encuentran nada).
+
+    - Columnas: dimensiones con `searchable: true` en business_context.yaml.
+    - Construcción y refresco incremental en segundo plano (por updated_at/created_at).
+    - Búsqueda por trigramas (candidatos) + ranking difuso (thefuzz si está instalado).
+    """
+
+    _entries: List[Optional[_Entry]] = []
+    _postings: Dict[str, Set[int]] = defaultdict(set)
+    _by_key: Dict[Tuple[str, str, Any], int] = {}
+    _sizes: Dict[Tuple[str, str], int] = defaultdict(int)
+    _watermarks: Dict[Tuple[str, str], Tuple[Any, Any]] = {}  # (tabla, columna) -> (marca, clave)
+    _ready: bool = False
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return ConfigLoader.load_settings().get("entity_index", {}) or {}
+
+    @staticmethod
+    def searchable_columns() -> List[Dict[str, str]]:
+        """(tabla, columna, columna clave) de cada dimensión marcada `searchable: true`."""
+        sources = []
+        for model in ConfigLoader.load_semantic_layer().get("models", []) or []:
+            entities = model.get("entities", []) or []
+            primary = next((e for e in entities if e.get("type") == "primary"), entities[0] if entities else None)
+            if primary is None:
+                continue
+            for dim in model.get("dimensions", []) or []:
+                if dim.get("searchable") and dim.get("col") and not dim.get("pii"):
+                    sources.append({
+                        "table": model["source"].split(".")[-1],
+                        "column": dim["col"],
+                        "key_column": primary["col"],
+                    })
+        return sources
+
+    # --- Construcción ---
+    @classmethod
+    def _upsert(cls, source: Tuple[str, str, str], key: Any, value: Any, cap: int):
+        normalized = normalize(value)
+        if len(normalized) < 2:
+            return
+        entry_id = cls._by_key.get((source[0], source[1], key))
+        if entry_id is not None:
+            old = cls._entries[entry_id]
+            if old.normalized == normalized:
+                return
+            for gram in old.grams:
+                cls._postings[gram].discard(entry_id)
+        else:
+            if cls._sizes[(source[0], source[1])] >= cap:
+                return  # Fuente llena (max_values_per_column): solo se actualizan claves conocidas
+            cls._sizes[(source[0], source[1])] += 1
+            entry_id = len(cls._entries)
+            cls._entries.append(None)
+            cls._by_key[(source[0], source[1], key)] = entry_id
+        entry = _Entry(str(value), normalized, trigrams(normalized), source, key)
+        cls._entries[entry_id] = entry
+        for gram in entry.grams:
+            cls._postings[gram].add(entry_id)
+
+    @classmethod
+    async def _load_source(cls, conn, source: Dict[str, str], watermark_col: Optional[str],
+                           limit: int, batch_size: int) -> int:
+        quote = conn.dialect.identifier_preparer.quote
+        table, column, key_column = source["table"], source["column"], source["key_column"]
+        source_key = (table, column, key_column)
+        select = [quote(key_column), quote(column)] + ([quote(watermark_col)] if watermark_col else [])
+        base = f"SELECT {', '.join(select)} FROM {quote(table)} WHERE {quote(column)} IS NOT NULL"
+
+        if not watermark_col:
+            # Sin marca de agua: una única carga de hasta `limit` valores
+            sql = base + f" ORDER BY {quote(key_column)} LIMIT {int(limit)}"
+            rows = (await conn.execute(text(sql))).fetchall()
+            for row in rows:
+                cls._upsert(source_key, row[0], row[1], limit)
+            return len(rows)
+
+        # Páginas por (marca, clave): avanza aunque más de batch_size filas compartan la misma marca.
+        # Las filas con marca NULL no se pueden paginar así y quedan fuera del índice.
+        initial = (table, column) not in cls._watermarks
+        loaded = 0
+        while True:
+            sql, params = base + f" AND {quote(watermark_col)} IS NOT NULL", {}
+            last = cls._watermarks.get((table, column))
+            if last is not None:
+                sql += (f" AND ({quote(watermark_col)} > :last"
+                        f" OR ({quote(watermark_col)} = :last AND {quote(key_column)} > :last_key))")
+                params = {"last": last[0], "last_key": last[1]}
+            sql += f" ORDER BY {quote(watermark_col)}, {quote(key_column)} LIMIT {int(batch_size)}"
+
+            rows = (await conn.execute(text(sql), params)).fetchall()
+            for row in rows:
+                cls._upsert(source_key, row[0], row[1], limit)
+            loaded += len(rows)
+            if rows:
+                cls._watermarks[(table, column)] = (rows[-1][2], rows[-1][0])
+            if len(rows) < batch_size:
+                break
+            if initial and cls._sizes[(table, column)] >= limit:
+                # Carga inicial completa hasta el tope: el resto de filas ya no entraría
+                print(f"⚠️ [EntityIndex] {table}.{column} llegó a max_values_per_column ({limit})")
+                break
+        return loaded
+
+    @classmethod
+    async def refresh(cls):
+        """Carga completa la primera vez; después solo filas nuevas/modificadas."""
+        from sql_agent.database.inspector import SchemaExtractor
+
+        config = cls._config()
+        limit = int(config.get("max_values_per_column", 50000))
+        batch_size = max(int(config.get("batch_size", 5000)), 1)
+        try:
+            schema = await SchemaExtractor.get_schema_snapshot()
+        except Exception:
+            schema = {}
+
+        start = time.perf_counter()
+        loaded = 0
+        async with DatabaseManager.read_connection() as conn:
+            for source in cls.searchable_columns():
+                columns = {c["name"] for c in schema.get(source["table"], {}).get("columns", [])}
+                watermark_col = next((c for c in WATERMARK_COLUMNS if c in columns), None)
+                if not watermark_col and cls._ready:
+                    continue  # Sin marca de agua solo se carga una vez
+                try:
+                    loaded += await cls._load_source(conn, source, watermark_col, limit, batch_size)
+                except Exception as e:
+                    await conn.rollback()
+                    print(f"⚠️ [EntityIndex] No se pudo indexar {source['table']}.{source['column']}: {e}")
+        if loaded or not cls._ready:
+            print(f"🔎 [EntityIndex] {loaded} valores indexados en {(time.perf_counter() - start) * 1000:.0f}ms "
+                  f"(total {len(cls._by_key)})")
+        cls._ready = True
+
+    @classmethod
+    async def _refresh_loop(cls, interval: float):
+        while True:
+            try:
+                await cls.refresh()
+            except Exception as e:
+                print(f"⚠️ [EntityIndex] Error refrescando el índice: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def ensure_started(cls):
+        """Lanza la construcción en segundo plano (una vez) si hay un loop activo."""
+        config = cls._config()
+        if not config.get("enabled", True) or (cls._task is not None and not cls._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._task = loop.create_task(cls._refresh_loop(float(config.get("refresh_interval", 300))))
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+
+    # --- Búsqueda ---
+    @classmethod
+    def _score(cls, mention: str, entry: _Entry) -> float:
+        if fuzz is not None:
+            return float(fuzz.token_set_ratio(mention, entry.normalized))
+        # Aproximación de token_set_ratio: nombre completo o sus primeras N palabras
+        words = entry.normalized.split()
+        prefix = " ".join(words[:len(mention.split())])
+        return 100.0 * max(SequenceMatcher(None, mention, entry.normalized).ratio(),
+                           SequenceMatcher(None, mention, prefix).ratio())
+
+    @classmethod
+    def lookup(cls, mention: str, limit: int = 3) -> List[Tuple[float, _Entry]]:
+        """Mejores entradas para una mención (score 0-100)."""
+        normalized = normalize(mention)
+        grams = trigrams(normalized)
+        max_posting = int(cls._config().get("max_posting", 5000))
+        counts: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            posting = cls._postings.get(gram)
+            # Trigramas demasiado comunes no discriminan: se ignoran
+            if posting and len(posting) <= max_posting:
+                for entry_id in posting:
+                    counts[entry_id] += 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:20]
+        scored = [(cls._score(normalized, cls._entries[i]), cls._entries[i]) for i in candidates]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+    @staticmethod
+    def _mentions(question: str, max_words: int = 4) -> List[str]:
+        """Ventanas de 1..max_words palabras que no empiezan ni terminan en stopword."""
+        words = normalize(question).split()
+        windows = []
+        for size in range(max_words, 0, -1):
+            for i in range(len(words) - size + 1):
+                window = words[i:i + size]
+                if window[0] in STOPWORDS or window[-1] in STOPWORDS or len(" ".join(window)) < 4:
+                    continue
+                windows.append(" ".join(window))
+        return windows
+
+    @classmethod
+    def resolve(cls, question: str) -> List[EntityMatch]:
+        """Menciones de la pregunta resueltas a valores/claves exactas (vacío si el índice no está listo)."""
+        if not cls._ready or not cls._by_key:
+            return []
+        config = cls._config()
+        min_score = float(config.get("min_score", 85))
+        max_matches = int(config.get("max_matches", 3))
+
+        matches: List[EntityMatch] = []
+        used_words: Set[str] = set()
+        for mention in cls._mentions(question):
+            if set(mention.split()) & used_words:
+                continue  # Ya cubierta por una mención más larga
+            scored = [(score, entry) for score, entry in cls.lookup(mention, limit=20) if score >= min_score]
+            if not scored:
+                continue
+            # Un valor escrito igual a la mención gana a los que solo la contienen (token_set_ratio da 100 a ambos)
+            exact = [(score, entry) for score, entry in scored if entry.normalized == mention]
+            scored = exact or scored
+            # Se agrupa por valor: un nombre repetido en varios registros es un valor, no una clave
+            top = scored[0][0]
+            groups: Dict[Tuple[Tuple[str, str, str], str], List[_Entry]] = defaultdict(list)
+            for score, entry in scored:
+                if score == top:
+                    groups[(entry.source, entry.normalized)].append(entry)
+            if len(groups) != 1:
+                continue  # Varios valores distintos empatan ("juan" -> "Juan Pérez" / "Juan Díaz"): ambiguo
+            entries = next(iter(groups.values()))
+            entry = entries[0]
+            table, column, key_column = entry.source
+            key = entry.key if len({e.key for e in entries}) == 1 else None
+            matches.append(EntityMatch(mention, entry.value, table, column, key_column, key, top))
+            used_words.update(mention.split())
+            if len(matches) >= max_matches:
+                break
+
+        metrics.CACHE_EVENTS.inc(cache="entity_index", result="hit" if matches else "miss")
+        return matches
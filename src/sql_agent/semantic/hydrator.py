@@ -3,7 +3,6 @@ import os
 import yaml
 import json
 import re
-from sqlalchemy import text
 from langchain_core.prompts import ChatPromptTemplate
 
 # Importamos la Fábrica y Configuración
@@ -11,6 +10,9 @@ from sql_agent.llm.factory import LLMFactory
 from sql_agent.config.loader import ConfigLoader
 from sql_agent.database.connection import DatabaseManager
 from sql_agent.database.inspector import SchemaExtractor
+from sql_agent.semantic.sampler import ColumnSampler
+from sql_agent.llm.scheduler import priority
+from sql_agent.utils.executor import run_cpu
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'dictionary.yaml')
@@ -62,22 +64,56 @@ class SemanticHydrator:
 
         self.llm = LLMFactory.create(temperature=0)
 
-    async def _get_sample_data(self, table_name: str, limit: int = 3):
-        """Obtiene 3 filas de muestra para que el Agente vea el formato real."""
-        engine = DatabaseManager.get_engine()
-        async with engine.connect() as conn:
-            try:
+    async def _sampling_stage(self, models: list) -> dict:
+        """
+        Muestras + estadísticas de columnas de todos los modelos usando
+        UNA sola conexión del pool durante todo el run.
+        """
+        try:
+            schema = await SchemaExtractor.get_schema_snapshot()
+        except Exception as e:
+            print(f"   ⚠️ No se pudo leer el esquema físico: {e}")
+            schema = {}
+
+        observations = {}
+        async with DatabaseManager.get_engine().connect() as conn:
+            sampler = ColumnSampler(conn, schema)
+            for model in models:
                 # Extraemos solo el nombre de la tabla si tiene esquema (ej: db.tabla -> tabla)
-                clean_name = table_name.split('.')[-1]
-                query = text(f"SELECT * FROM {clean_name} LIMIT {limit}")
-                result = await conn.execute(query)
-                rows = result.fetchall()
-                keys = result.keys()
-                # Convertimos a string para evitar errores de serialización (fechas, decimales)
-                return [{key: str(val) for key, val in zip(keys, row)} for row in rows]
-            except Exception as e:
-                print(f"   ⚠️ No se pudo obtener muestra de '{table_name}': {e}")
-                return []
+                table = model['source'].split('.')[-1]
+                observations[model['name']] = {
+                    "samples": await sampler.sample(table, model),
+                    "stats": await sampler.profile(table, model),
+                }
+        return observations
+
+    @staticmethod
+    def _format_column_stats(stats: dict) -> str:
+        if not stats:
+            return "(sin estadísticas)"
+        lines = []
+        for col, info in stats.items():
+            line = f"- {col}: cardinalidad {info['cardinality']}"
+            if "observed_values" in info:
+                line += f", valores observados {info['observed_values']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _merge_column_stats(ai_data: dict, stats: dict):
+        """Adjunta a cada columna del diccionario sus valores observados reales."""
+        for column in ai_data.get("columns", []):
+            info = stats.get(column.get("name"))
+            if info:
+                column.update(info)
+
+    @classmethod
+    def _format_prompt(cls, prompt: ChatPromptTemplate, model_metadata: str, samples: list, stats: dict) -> list:
+        return prompt.format_messages(
+            model_metadata=model_metadata,
+            sample_data=str(samples),
+            column_stats=cls._format_column_stats(stats),
+        )
 
     def _clean_json_string(self, content: str) -> str:
         """Limpieza robusta para extraer JSON de la respuesta del LLM."""
@@ -127,6 +163,11 @@ class SemanticHydrator:
         return "\n".join(text_parts)
 
     async def run(self):
+        # La hidratación cede el LLM al tráfico interactivo (ver llm/scheduler.py)
+        with priority("background"):
+            await self._run()
+
+    async def _run(self):
         print(f"🚀 Iniciando Hidratación Semántico (v2.5 Compatible)...")
         
         # 1. Leer Modelos del Contexto de Negocio
@@ -139,14 +180,20 @@ class SemanticHydrator:
         
         print(f"📊 Procesando {len(models)} modelos definidos en la Capa Semántica.")
 
+        # 2. Etapa de muestreo (columnas del modelo + cardinalidad/enums) en una sola conexión
+        print("🧪 Muestreando columnas referenciadas por los modelos...")
+        observations = await self._sampling_stage(models)
+
         for i, model in enumerate(models):
             table_source = model['source']
             clean_table_name = table_source.split('.')[-1]
             
             print(f"\n🔍 [{i+1}/{len(models)}] Compilando Modelo: {model['name']} -> Tabla: {clean_table_name}")
             
-            # Obtener datos reales de la DB (Introspección Física)
-            samples = await self._get_sample_data(clean_table_name)
+            # Datos reales de la DB (Introspección Física)
+            observed = observations.get(model['name'], {})
+            samples = observed.get("samples", [])
+            column_stats = observed.get("stats", {})
             
             # Preparar la "Ficha Técnica" para el LLM
             model_metadata = self._format_model_metadata(model)
@@ -165,11 +212,15 @@ class SemanticHydrator:
                 2. MUESTRA DE DATOS REALES (Lo que la base de datos tiene):
                 {sample_data}
 
+                3. ESTADÍSTICAS REALES DE COLUMNAS (cardinalidad y valores observados):
+                {column_stats}
+
                 --- INSTRUCCIONES CRÍTICAS ---
                 1. Genera un JSON que describa esta tabla.
                 2. En la descripción de las columnas, DEBES incluir las reglas de negocio (Enums, Fórmulas).
                 3. Si hay una medida marcada como "FUENTE DE VERDAD", resáltalo en mayúsculas en la descripción.
                 4. Si hay dimensiones con 'allowed_values', inclúyelos explícitamente (ej: "1=Activo").
+                   Usa los VALORES OBSERVADOS para documentar enums; no inventes valores que no aparezcan.
                 5. Si hay 'sql' personalizado (campos virtuales), agrégalos como columnas virtuales en la documentación.
 
                 --- OUTPUT REQUERIDO (JSON) ---
@@ -187,18 +238,19 @@ class SemanticHydrator:
                 """
             )
 
-            chain = prompt | self.llm
+            # Muestras y estadísticas pueden ser grandes: el prompt se arma en el pool de CPU
+            messages = await run_cpu(
+                "prompt_format", self._format_prompt, prompt, model_metadata, samples, column_stats
+            )
             
             # Reintentos para robustez
             for attempt in range(3):
                 try:
-                    response = await chain.ainvoke({
-                        "model_metadata": model_metadata,
-                        "sample_data": str(samples)
-                    })
+                    response = await self.llm.ainvoke(messages)
                     
                     json_str = self._clean_json_string(response.content)
-                    ai_data = json.loads(json_str)
+                    ai_data = await run_cpu("json_parse", json.loads, json_str, size=len(json_str))
+                    self._merge_column_stats(ai_data, column_stats)
                     
                     # Guardamos el nombre real de la tabla para que el SQL funcione
                     semantic_dict["tables"].append({"name": clean_table_name, **ai_data})
@@ -209,10 +261,11 @@ class SemanticHydrator:
                     print(f"   ⚠️ Reintentando ({attempt+1})... Error: {e}")
                     await asyncio.sleep(2)
 
-        # Guardar el Cerebro Final
+        # Guardar el Cerebro Final (el dump de YAML es CPU puro: fuera del event loop)
         os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+        dumped = await run_cpu("yaml_dump", yaml.dump, semantic_dict, allow_unicode=True, sort_keys=False)
         with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-            yaml.dump(semantic_dict, f, allow_unicode=True, sort_keys=False)
+            f.write(dumped)
             
         print(f"\n💾 Diccionario Maestro generado en: {OUTPUT_PATH}")
 
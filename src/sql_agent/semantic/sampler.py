@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+class ColumnSampler:
+    """
+    Etapa de muestreo del Hidratador.
+    Lee solo las columnas que el modelo semántico referencia (nunca SELECT *),
+    recorta valores largos y perfila las dimensiones categóricas con
+    GROUP BY acotados para obtener cardinalidad y valores reales.
+    Todas las consultas se hacen sobre una única conexión compartida.
+    """
+
+    SAMPLE_ROWS = 3
+    MAX_VALUE_LEN = 60
+    # Filas que se escanean como máximo para perfilar una columna (las más recientes por PK)
+    PROFILE_SCAN_ROWS = 10000
+    # Más valores distintos que esto => columna de alta cardinalidad (no es un enum)
+    ENUM_LIMIT = 15
+    PROFILED_TYPES = ("categorical", "boolean", "string")
+
+    def __init__(self, conn: AsyncConnection, schema: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.conn = conn
+        self.schema = schema or {}
+        self.quote = conn.dialect.identifier_preparer.quote
+
+    @staticmethod
+    def referenced_columns(model: dict) -> List[str]:
+        """Columnas físicas usadas por entidades, dimensiones y medidas (sin duplicados)."""
+        columns = []
+        for section in ("entities", "dimensions", "measures"):
+            for item in model.get(section, []) or []:
+                col = item.get("col")
+                if col and col not in columns:
+                    columns.append(col)
+        return columns
+
+    def _physical(self, table: str, columns: List[str]) -> List[str]:
+        """Filtra columnas inexistentes si conocemos el esquema (evita errores de muestreo)."""
+        info = self.schema.get(table)
+        if not info:
+            return columns
+        existing = {c["name"] for c in info["columns"]}
+        missing = [c for c in columns if c not in existing]
+        if missing:
+            print(f"   ⚠️ Columnas del modelo sin equivalente físico en '{table}': {missing}")
+        return [c for c in columns if c in existing]
+
+    def _primary_key(self, table: str) -> Optional[str]:
+        for col in self.schema.get(table, {}).get("columns", []):
+            if col.get("key") == "PRI":
+                return col["name"]
+        return None
+
+    def _recent_first(self, table: str) -> str:
+        """ORDER BY PK DESC (usa el índice) para leer las filas más recientes; vacío sin PK."""
+        pk = self._primary_key(table)
+        return f" ORDER BY {self.quote(pk)} DESC" if pk else ""
+
+    def _truncate(self, value: Any) -> Any:
+        if value is None:
+            return None
+        value = str(value)
+        if len(value) > self.MAX_VALUE_LEN:
+            return value[:self.MAX_VALUE_LEN] + "…"
+        return value
+
+    async def _fetch(self, sql: str) -> List[Any]:
+        try:
+            result = await self.conn.execute(text(sql))
+            return result.fetchall()
+        except Exception:
+            # Deja la conexión compartida utilizable para el resto del run
+            await self.conn.rollback()
+            raise
+
+    async def sample(self, table: str, model: dict) -> List[Dict[str, Any]]:
+        """Filas recientes (por PK, usa el índice) con solo las columnas del modelo."""
+        pii = {d.get("col") for d in model.get("dimensions", []) or [] if d.get("pii")}
+        columns = self._physical(table, self.referenced_columns(model))
+        if not columns:
+            return []
+        sql = (f"SELECT {', '.join(self.quote(c) for c in columns)} FROM {self.quote(table)}"
+               f"{self._recent_first(table)} LIMIT {self.SAMPLE_ROWS}")
+        try:
+            rows = await self._fetch(sql)
+        except Exception as e:
+            print(f"   ⚠️ No se pudo obtener muestra de '{table}': {e}")
+            return []
+        return [
+            {col: ("<PII>" if col in pii else self._truncate(val)) for col, val in zip(columns, row)}
+            for row in rows
+        ]
+
+    async def profile(self, table: str, model: dict) -> Dict[str, Dict[str, Any]]:
+        """
+        Cardinalidad y valores observados de las dimensiones categóricas.
+        El GROUP BY se hace sobre las filas más recientes (acotadas) y con LIMIT.
+        """
+        dimensions = [
+            d for d in model.get("dimensions", []) or []
+            if d.get("col") and not d.get("pii") and not d.get("sql")
+            and (d.get("type") in self.PROFILED_TYPES or "allowed_values" in d)
+        ]
+        physical = set(self._physical(table, [d["col"] for d in dimensions]))
+        stats = {}
+        for dim in dimensions:
+            col = dim["col"]
+            if col not in physical:
+                continue
+            quoted = self.quote(col)
+            sql = (
+                f"SELECT v, COUNT(*) AS n FROM "
+                f"(SELECT {quoted} AS v FROM {self.quote(table)}{self._recent_first(table)} "
+                f"LIMIT {self.PROFILE_SCAN_ROWS}) s "
+                f"GROUP BY v ORDER BY n DESC LIMIT {self.ENUM_LIMIT + 1}"
+            )
+            try:
+                rows = await self._fetch(sql)
+            except Exception as e:
+                print(f"   ⚠️ No se pudo perfilar '{table}.{col}': {e}")
+                continue
+            if len(rows) > self.ENUM_LIMIT:
+                stats[col] = {"cardinality": f">{self.ENUM_LIMIT}"}
+            else:
+                stats[col] = {
+                    "cardinality": len(rows),
+                    "observed_values": [self._truncate(v) for v, _ in rows],
+                }
+        return stats
@@ -0,0 +1,314 @@
+import os
+import re
+import json
+import time
+import asyncio
+import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from sql_agent.config.loader import ConfigLoader, BASE_DIR
+from sql_agent.database.connection import DatabaseManager
+from sql_agent.core.formatter import REASONING_HINTS
+from sql_agent.semantic.entity_index import EntityIndex, STOPWORDS, normalize
+from sql_agent.utils import metrics
+from sql_agent.utils.cache import SharedCache
+
+# Preguntas acotadas en el tiempo: el snapshot es acumulado, van a SQL en vivo
+TIME_HINTS = ("hoy", "ayer", "semana", "mes", "ano", "trimestre", "desde", "hasta", "entre", "ultimo",
+              "ultima", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+              "septiembre", "octubre", "noviembre", "diciembre")
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+# Palabras que pueden rodear al KPI sin acotarlo; cualquier otra es un filtro y va a SQL en vivo.
+# "por" no: un desglose que el snapshot no tiene ("morosidad por comercio") tampoco se responde
+FILLER_WORDS = (STOPWORDS - {"por"}) | {
+    "es", "son", "esta", "estan", "cual", "nuestra", "nuestro", "nuestras", "nuestros", "actual", "general",
+    "global", "tenemos", "dime", "quiero", "saber", "ver", "muestra", "porcentaje", "ratio", "indice", "nivel",
+    "kpi", "tasa", "numero", "cantidad", "calcula", "podrias", "puedes",
+}
+
+
+class MetricCompiler:
+    """
+    Compila las `metrics` de business_context.yaml (ratios de count/sum) a SQL.
+    Si numerador y denominador son del mismo modelo se resuelven en un solo
+    recorrido con agregación condicional (y admiten desglose por dimensión).
+    """
+
+    def __init__(self, semantic_layer: Dict[str, Any]):
+        self.models = {m["name"]: m for m in semantic_layer.get("models", []) or []}
+
+    @staticmethod
+    def _table(model: dict) -> str:
+        return model["source"].split(".")[-1]
+
+    def _term(self, spec: Any, default_model: Optional[str]) -> Tuple[str, str, Optional[str], Optional[str]]:
+        """-> (modelo, agregación, expresión, filtro)"""
+        if isinstance(spec, str):
+            model_name, measure_name = spec.split(".", 1)
+            if measure_name == "count":
+                return model_name, "count", None, None
+            measure = next(m for m in self.models[model_name].get("measures", []) if m["name"] == measure_name)
+            agg = "count" if measure.get("type") == "count" else "sum"
+            return model_name, agg, measure.get("sql") or measure.get("col"), None
+        model_name = spec.get("model") or default_model
+        return model_name, spec.get("type", "count"), spec.get("sql") or spec.get("col"), spec.get("filter")
+
+    @staticmethod
+    def _aggregate(agg: str, expr: Optional[str], condition: Optional[str]) -> str:
+        if agg == "count":
+            return f"SUM(CASE WHEN ({condition}) THEN 1 ELSE 0 END)" if condition else "COUNT(*)"
+        return f"SUM(CASE WHEN ({condition}) THEN ({expr}) ELSE 0 END)" if condition else f"SUM({expr})"
+
+    def _dimension_col(self, model_name: str, breakdown: str) -> Optional[str]:
+        model = self.models[model_name]
+        for item in (model.get("dimensions", []) or []) + (model.get("entities", []) or []):
+            if item.get("name") == breakdown and item.get("col"):
+                return item["col"]
+        return None
+
+    def compile(self, metric: Dict[str, Any], breakdown: Optional[str] = None, limit: int = 20) -> Optional[str]:
+        if metric.get("type") != "ratio":
+            return None
+        num_spec, den_spec = metric["numerator"], metric["denominator"]
+        # Un término sin `model` hereda el del otro (ej: average_financed_amount)
+        num = self._term(num_spec, None)
+        den = self._term(den_spec, num[0])
+        if num[0] is None:
+            num = self._term(num_spec, den[0])
+
+        if num[0] != den[0]:
+            if breakdown:
+                return None  # El desglose requiere un único modelo
+            return (f"SELECT (SELECT {self._aggregate(*num[1:])} FROM {self._table(self.models[num[0]])}) AS numerator, "
+                    f"(SELECT {self._aggregate(*den[1:])} FROM {self._table(self.models[den[0]])}) AS denominator")
+
+        table = self._table(self.models[num[0]])
+        select = f"{self._aggregate(*num[1:])} AS numerator, {self._aggregate(*den[1:])} AS denominator"
+        if not breakdown:
+            return f"SELECT {select} FROM {table}"
+        col = self._dimension_col(num[0], breakdown)
+        if col is None:
+            return None
+        return (f"SELECT {col} AS breakdown, {select} FROM {table} "
+                f"GROUP BY {col} ORDER BY denominator DESC LIMIT {int(limit)}")
+
+
+class SnapshotStore:
+    """Snapshots en memoria con persistencia JSON (sobreviven reinicios y se comparten entre procesos)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Dict[str, Dict[str, Any]] = {}
+        self._mtime = 0.0
+
+    def load(self):
+        """Relee el archivo si otro proceso (el scheduler del bridge) lo actualizó."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime <= self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [Snapshots] No se pudo leer {self.path}: {e}")
+
+    def put(self, key: str, snapshot: Dict[str, Any]):
+        self.data[key] = snapshot
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.data.get(key)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)  # Escritura atómica
+        self._mtime = os.path.getmtime(self.path)
+
+
+class MetricSnapshots:
+    """
+    Precalcula en segundo plano los KPIs de `metrics` (y sus desgloses) y
+    responde preguntas sobre ellos sin LLM ni SQL mientras el snapshot esté
+    dentro del SLA de frescura (settings.yaml -> snapshots).
+    """
+
+    _store: Optional[SnapshotStore] = None
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return ConfigLoader.load_settings().get("snapshots", {}) or {}
+
+    @classmethod
+    def store(cls) -> SnapshotStore:
+        if cls._store is None:
+            path = cls._config().get("store_path", "logs/snapshots.json")
+            cls._store = SnapshotStore(path if os.path.isabs(path) else str(BASE_DIR / path))
+        return cls._store
+
+    @staticmethod
+    def _metric_defs() -> Dict[str, Dict[str, Any]]:
+        return {m["name"]: m for m in ConfigLoader.load_semantic_layer().get("metrics", []) or []}
+
+    # --- Scheduler ---
+    @classmethod
+    async def refresh(cls):
+        config = cls._config()
+        definitions = cls._metric_defs()
+        compiler = MetricCompiler(ConfigLoader.load_semantic_layer())
+        limit = int(config.get("breakdown_limit", 20))
+        store = cls.store()
+
+        async with DatabaseManager.read_connection() as conn:
+            for name, metric_cfg in (config.get("metrics") or {}).items():
+                metric = definitions.get(name)
+                if metric is None:
+                    print(f"⚠️ [Snapshots] La métrica '{name}' no existe en business_context.yaml")
+                    continue
+                for breakdown in [None] + list((metric_cfg.get("breakdowns") or {}).keys()):
+                    sql = compiler.compile(metric, breakdown, limit)
+                    key = name if breakdown is None else f"{name}:{breakdown}"
+                    if sql is None:
+                        print(f"⚠️ [Snapshots] '{key}' no se puede compilar a SQL")
+                        continue
+                    start = time.perf_counter()
+                    try:
+                        rows = (await conn.execute(text(sql))).fetchall()
+                    except Exception as e:
+                        await conn.rollback()
+                        print(f"⚠️ [Snapshots] Error calculando '{key}': {e}")
+                        continue
+                    store.put(key, {
+                        "computed_at": time.time(),
+                        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                        "rows": [
+                            {"breakdown": row[0] if breakdown else None,
+                             "numerator": float(row[-2] or 0), "denominator": float(row[-1] or 0)}
+                            for row in rows
+                        ],
+                    })
+        store.save()
+        # Con varios workers/hosts, el resto lee los snapshots desde la caché compartida
+        await SharedCache.get().set("snapshots", store.data, ttl=float(config.get("freshness_sla", 1800)))
+        print(f"📸 [Snapshots] {len(store.data)} snapshots actualizados")
+
+    @classmethod
+    async def _refresh_loop(cls, interval: float):
+        while True:
+            try:
+                # Solo el worker líder recalcula; los demás sirven lo publicado
+                if await SharedCache.get().acquire_leadership("snapshots", ttl=interval * 2):
+                    await cls.refresh()
+            except Exception as e:
+                print(f"⚠️ [Snapshots] Error en el refresco: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    def ensure_started(cls):
+        """Lanza el scheduler (una vez) si está habilitado y hay un loop activo."""
+        config = cls._config()
+        if not config.get("enabled") or (cls._task is not None and not cls._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._task = loop.create_task(cls._refresh_loop(float(config.get("refresh_interval", 600))))
+        print("📸 [Snapshots] Scheduler de métricas activo")
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+
+    # --- Respuesta ---
+    @classmethod
+    def match(cls, question: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(métrica, desglose) si la pregunta pide un KPI precalculado sin filtros (de tiempo ni de otro tipo)."""
+        if any(h in (question or "").lower() for h in REASONING_HINTS):
+            return None  # Piden análisis, no solo el dato
+        q = normalize(question)
+        if any(re.search(rf"\b{hint}\b", q) for hint in TIME_HINTS) or YEAR_PATTERN.search(q):
+            return None
+        for name, metric_cfg in (cls._config().get("metrics") or {}).items():
+            keywords = [normalize(k) for k in metric_cfg.get("keywords", []) if normalize(k) in q]
+            if not keywords:
+                continue
+            matched: Tuple[str, Optional[str]] = (name, None)
+            phrases = keywords
+            for breakdown, breakdown_phrases in (metric_cfg.get("breakdowns") or {}).items():
+                found = [normalize(p) for p in breakdown_phrases if normalize(p) in q]
+                if found:
+                    matched, phrases = (name, breakdown), keywords + found
+                    break
+            # Si sobra algo además del KPI y su desglose ("morosidad de Farmatodo",
+            # "... de clientes premium"), la pregunta tiene filtros que el snapshot no aplica
+            rest = q.replace("por favor", " ")
+            for phrase in sorted(phrases, key=len, reverse=True):
+                rest = re.sub(rf"\b{re.escape(phrase)}\b", " ", rest)
+            if any(word not in FILLER_WORDS for word in rest.split()) or EntityIndex.resolve(question):
+                return None
+            return matched
+        return None
+
+    @staticmethod
+    def _age_text(computed_at: float) -> str:
+        minutes = int((time.time() - computed_at) // 60)
+        when = datetime.datetime.fromtimestamp(computed_at).strftime("%d/%m %H:%M")
+        age = "hace menos de 1 min" if minutes < 1 else f"hace {minutes} min"
+        return f"🕒 _Dato precalculado {age} ({when})._"
+
+    @classmethod
+    async def answer(cls, question: str, formatter) -> Optional[str]:
+        """Respuesta desde el snapshot o None (no hay coincidencia o está vencido)."""
+        config = cls._config()
+        if not config.get("enabled"):
+            return None
+        matched = cls.match(question)
+        if matched is None:
+            return None
+        name, breakdown = matched
+        key = name if breakdown is None else f"{name}:{breakdown}"
+        store = cls.store()
+        shared = await SharedCache.get().get("snapshots")
+        if shared:
+            store.data = shared
+        else:
+            store.load()
+        snapshot = store.get(key)
+        sla = float(config.get("freshness_sla", 1800))
+        if snapshot is None or time.time() - snapshot["computed_at"] > sla:
+            metrics.CACHE_EVENTS.inc(cache="snapshot", result="stale" if snapshot else "miss")
+            return None
+        metrics.CACHE_EVENTS.inc(cache="snapshot", result="hit")
+
+        metric = cls._metric_defs().get(name, {})
+        label = (metric.get("description") or name).split(":")[0].strip()
+
+        as_money = config["metrics"][name].get("format") == "money"
+
+        def ratio(row: Dict[str, Any]) -> str:
+            if not row["denominator"]:
+                return "—"
+            value = row["numerator"] / row["denominator"]
+            if as_money:
+                return formatter.format_value("amount", value)
+            return (f"{formatter.format_value('rate', value)} "
+                    f"({formatter.format_value('count', row['numerator'])} de "
+                    f"{formatter.format_value('count', row['denominator'])})")
+
+        if breakdown is None:
+            body = f"📊 *{label}*: {ratio(snapshot['rows'][0])}"
+        else:
+            lines = [f"• {row['breakdown']}: {ratio(row)}" for row in snapshot["rows"]]
+            body = f"📊 *{label}* por {breakdown}:\n" + "\n".join(lines)
+        return f"{body}\n\n{cls._age_text(snapshot['computed_at'])}"
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import uuid
+import socket
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sql_agent.config.loader import BASE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks entre procesos en modo local
+    fcntl = None
+
+# Identidad del proceso para locks de liderazgo. BRIDGE_WORKER_ID se repite
+# en cada host ("0".."N-1"): el dueño del lock debe ser único en el cluster.
+LEADER_TOKEN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+
+class LocalCache:
+    """
+    Caché en proceso (LRU + TTL). El liderazgo entre workers del mismo host
+    se resuelve con un flock sobre logs/locks/<nombre>.lock.
+    """
+
+    backend = "local"
+
+    def __init__(self, max_items: int = 2048):
+        self.max_items = max_items
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock_files: Dict[str, Any] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def acquire_leadership(self, name: str, ttl: float) -> bool:
+        """True si este proceso es el líder de `name` (lo sigue siendo mientras viva)."""
+        if name in self._lock_files:
+            return True
+        if fcntl is None:
+            return True
+        lock_dir = BASE_DIR / "logs" / "locks"
+        os.makedirs(lock_dir, exist_ok=True)
+        handle = open(lock_dir / f"{name}.lock", "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_files[name] = handle
+        return True
+
+
+class RedisCache:
+    """Caché compartida entre workers y hosts (valores JSON) con liderazgo por SET NX + TTL."""
+
+    backend = "redis"
+
+    # Renueva el TTL solo si el lock sigue siendo nuestro
+    _RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "sql_agent:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.client.set(self.prefix + key, json.dumps(value, default=str),
+                              px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def acquire_leadership(self, name: str, ttl: float) -> bool:
+        key = f"{self.prefix}leader:{name}"
+        ttl_ms = int(ttl * 1000)
+        if await self.client.set(key, LEADER_TOKEN, nx=True, px=ttl_ms):
+            return True
+        return bool(await self.client.eval(self._RENEW_SCRIPT, 1, key, LEADER_TOKEN, ttl_ms))
+
+
+class SharedCache:
+    """
+    Punto de acceso a la caché compartida (CACHE_URL=redis://... o local en proceso).
+    Se usa para el liderazgo de tareas de fondo y para compartir resultados entre workers.
+    """
+
+    _instance = None
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            url = os.getenv("CACHE_URL", "")
+            if url.startswith("redis"):
+                try:
+                    cls._instance = RedisCache(url)
+                    print("🧰 Caché compartida: Redis")
+                except ImportError:
+                    print("⚠️ CACHE_URL apunta a Redis pero el paquete 'redis' no está instalado: caché local")
+            if cls._instance is None:
+                cls._instance = LocalCache()
+        return cls._instance
@@ -0,0 +1,49 @@
+import os
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from sql_agent.config.loader import BASE_DIR
+
+
+async def create_checkpointer(kind: str = None):
+    """
+    Checkpointer de LangGraph según CHECKPOINTER (memory | sqlite | redis).
+    - memory: en proceso (modo de un solo worker, se pierde al reiniciar).
+    - sqlite: archivo compartido entre workers del mismo host (WAL).
+    - redis: compartido entre hosts (REDIS_URL).
+    """
+    kind = (kind or os.getenv("CHECKPOINTER", "memory")).lower()
+
+    if kind == "memory":
+        return MemorySaver()
+
+    if kind == "sqlite":
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise RuntimeError(
+                "CHECKPOINTER=sqlite requiere 'langgraph-checkpoint-sqlite' y 'aiosqlite'"
+            ) from e
+        path = os.getenv("CHECKPOINTER_PATH", str(BASE_DIR / "logs" / "checkpoints.db"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = await aiosqlite.connect(path)
+        # WAL: lectores y un escritor concurrentes entre procesos
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA busy_timeout=5000")
+        saver = AsyncSqliteSaver(conn)
+        await saver.setup()
+        print(f"💾 Checkpointer SQLite compartido: {path}")
+        return saver
+
+    if kind == "redis":
+        try:
+            from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+        except ImportError as e:
+            raise RuntimeError("CHECKPOINTER=redis requiere 'langgraph-checkpoint-redis'") from e
+        saver = AsyncRedisSaver(redis_url=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        await saver.asetup()
+        print("💾 Checkpointer Redis compartido")
+        return saver
+
+    raise ValueError(f"CHECKPOINTER desconocido: {kind} (usa memory, sqlite o redis)")
@@ -0,0 +1,126 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from sql_agent.config.loader import ConfigLoader
+from sql_agent.utils import metrics
+
+
+def _config() -> Dict[str, Any]:
+    return ConfigLoader.load_settings().get("executor", {}) or {}
+
+
+class CpuExecutor:
+    """
+    Pool de hilos para pasos CPU del turno (formateo de prompts, render de
+    resultados, parseo/dump de YAML) que no deben correr en el event loop.
+    """
+
+    _pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def pool(cls) -> ThreadPoolExecutor:
+        if cls._pool is None:
+            cls._pool = ThreadPoolExecutor(
+                max_workers=int(_config().get("max_workers", 4)), thread_name_prefix="sql_agent_cpu"
+            )
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls):
+        if cls._pool is not None:
+            cls._pool.shutdown(wait=False)
+            cls._pool = None
+
+
+async def run_cpu(task: str, func: Callable, *args, size: Optional[int] = None, **kwargs) -> Any:
+    """
+    Ejecuta `func(*args, **kwargs)` en el pool de CPU y devuelve su resultado.
+    Si `size` (ej: caracteres a procesar) es menor que executor.offload_min_chars
+    se ejecuta en línea: para entradas chicas el salto a un hilo cuesta más.
+    """
+    if size is not None and size < int(_config().get("offload_min_chars", 2000)):
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(CpuExecutor.pool(), partial(func, *args, **kwargs))
+    finally:
+        metrics.CPU_OFFLOAD.observe(time.perf_counter() - start, task=task)
+
+
+class LoopLagMonitor:
+    """
+    Mide el retraso del event loop (cuánto tarda en despertar un sleep) y avisa
+    cuando un callback lo bloquea más de lag_monitor.threshold_ms.
+    Un hilo vigía captura la pila del loop durante el bloqueo para ubicar
+    el punto caliente (función y línea) sin activar el modo debug de asyncio.
+    """
+
+    _task: Optional[asyncio.Task] = None
+    _watchdog: Optional[threading.Thread] = None
+    _stop_event = threading.Event()
+    _beat: float = 0.0
+    _loop_thread_id: Optional[int] = None
+
+    @classmethod
+    def ensure_started(cls):
+        config = _config().get("lag_monitor", {}) or {}
+        if not config.get("enabled", True) or (cls._task is not None and not cls._task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        interval = float(config.get("interval", 0.25))
+        threshold = float(config.get("threshold_ms", 100)) / 1000
+        cls._loop_thread_id = threading.get_ident()
+        cls._beat = time.monotonic()
+        cls._stop_event.clear()
+        cls._task = loop.create_task(cls._probe(interval, threshold))
+        cls._watchdog = threading.Thread(
+            target=cls._watch, args=(interval, threshold), name="sql_agent_loop_watchdog", daemon=True
+        )
+        cls._watchdog.start()
+
+    @classmethod
+    async def stop(cls):
+        cls._stop_event.set()
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+        cls._watchdog = None
+
+    @classmethod
+    async def _probe(cls, interval: float, threshold: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - start - interval, 0.0)
+            cls._beat = time.monotonic()
+            metrics.LOOP_LAG.observe(lag)
+            if lag > threshold:
+                metrics.LOOP_STALLS.inc()
+                print(f"🐢 [LoopLag] Event loop bloqueado {lag * 1000:.0f}ms (umbral {threshold * 1000:.0f}ms)")
+
+    @classmethod
+    def _watch(cls, interval: float, threshold: float):
+        reported_beat = None
+        # Sondeo más fino que el umbral para alcanzar a ver el bloqueo en curso
+        while not cls._stop_event.wait(min(interval, threshold) / 2):
+            beat = cls._beat
+            if beat == reported_beat or time.monotonic() - beat < interval + threshold:
+                continue
+            frame = sys._current_frames().get(cls._loop_thread_id)
+            if frame is None:
+                continue
+            # Una sola pila por bloqueo: la siguiente vez que el loop despierte se rearma
+            reported_beat = beat
+            stack = "".join(traceback.format_stack(frame, limit=8))
+            print(f"🐢 [LoopLag] Callback bloqueando el loop > {threshold * 1000:.0f}ms en:\n{stack}")
@@ -0,0 +1,32 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class KeyedLocks:
+    """
+    Un asyncio.Lock por clave (ej: remote_jid) que se libera al quedar sin uso.
+    asyncio.Lock despierta a los que esperan en orden FIFO, así que los mensajes
+    de un mismo usuario se procesan en el orden en que llegaron.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = defaultdict(int)
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,45 @@
+import os
+import json
+import logging
+import datetime
+from typing import Any
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON (apto para Loki/ELK/CloudWatch)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def get_logger(name: str = "sql_agent") -> logging.Logger:
+    """
+    Logger estructurado (JSON) del paquete.
+    El nivel se toma de LOG_LEVEL (.env). Se configura una sola vez por nombre.
+    """
+    logger = logging.getLogger(name)
+    if not getattr(logger, "_sql_agent_configured", False):
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.propagate = False
+        logger._sql_agent_configured = True
+    return logger
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields: Any):
+    """Emite un evento estructurado: `event` + campos arbitrarios en el JSON."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": {"event": event, **fields}})
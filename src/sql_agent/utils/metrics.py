@@ -0,0 +1,258 @@
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Buckets por defecto (segundos): de 5ms a 60s, cubre DB rápidas y LLM lentos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Contador monotónico con etiquetas."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Valor instantáneo (puede subir y bajar)."""
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Histograma acumulativo estilo Prometheus (bucket/sum/count por etiqueta)."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        """Devuelve count/sum de una serie (útil para tests y ajustes adaptativos)."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            _, totals = self._series.get(key, ([], [0.0, 0]))
+            return {"sum": totals[0], "count": totals[1]}
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, totals) in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    le = {"le": "+Inf" if math.isinf(bound) else repr(bound)}
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(totals[0])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {totals[1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registro en memoria de métricas del proceso.
+    Implementación mínima del formato de texto de Prometheus (sin dependencias).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Función que actualiza gauges justo antes de cada exposición (ej: estado del pool)."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                pass
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métricas estándar del agente ---
+NODE_LATENCY = REGISTRY.histogram(
+    "sql_agent_node_duration_seconds", "Duración de cada nodo del grafo.", ("node", "intent"))
+NODE_ERRORS = REGISTRY.counter(
+    "sql_agent_node_errors_total", "Excepciones no controladas por nodo.", ("node",))
+LLM_LATENCY = REGISTRY.histogram(
+    "sql_agent_llm_duration_seconds", "Duración de llamadas al LLM.", ("provider", "model", "node"))
+LLM_TOKENS = REGISTRY.counter(
+    "sql_agent_llm_tokens_total", "Tokens consumidos (prompt/completion/cached).", ("provider", "node", "kind"))
+LLM_PREFIX_CACHE = REGISTRY.histogram(
+    "sql_agent_llm_prompt_cache_ratio", "Fracción del prompt servida desde la caché de prefijos del proveedor.",
+    ("provider", "node"), buckets=(0.0, 0.25, 0.5, 0.75, 0.9, 0.95, 1.0))
+LLM_ATTEMPTS = REGISTRY.counter(
+    "sql_agent_llm_attempts_total", "Llamadas a cada proveedor por rol y resultado (ok/error/cancelled).",
+    ("provider", "role", "outcome"))
+LLM_FALLBACKS = REGISTRY.counter(
+    "sql_agent_llm_fallbacks_total", "Hedges al proveedor secundario (slow/error) y deadlines vencidos.",
+    ("primary", "secondary", "role", "reason"))
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "sql_agent_llm_queue_wait_seconds", "Espera en el planificador antes de llamar al proveedor.",
+    ("provider", "priority"), buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+LLM_QUEUE_DEPTH = REGISTRY.gauge(
+    "sql_agent_llm_queue_depth", "Llamadas al LLM esperando turno en el planificador.")
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "sql_agent_llm_in_flight", "Llamadas al LLM en curso por proveedor.", ("provider",))
+LLM_COST = REGISTRY.counter(
+    "sql_agent_llm_cost_usd_total", "Costo estimado en USD según llm.pricing.", ("provider", "node"))
+DB_LATENCY = REGISTRY.histogram(
+    "sql_agent_db_duration_seconds", "Duración de ejecuciones SQL.", ("operation",))
+DB_ROWS = REGISTRY.histogram(
+    "sql_agent_db_rows", "Filas devueltas por consulta.", ("operation",), buckets=(0, 1, 5, 10, 15, 50, 100, 1000))
+HTTP_LATENCY = REGISTRY.histogram(
+    "sql_agent_http_duration_seconds", "Duración de llamadas HTTP salientes.", ("target", "status"))
+API_REACT_STEPS = REGISTRY.histogram(
+    "sql_agent_api_react_steps", "Pasos de razonamiento (llamadas al LLM) por turno del agente API.",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15))
+API_TOOL_CALLS_PER_STEP = REGISTRY.histogram(
+    "sql_agent_api_tool_calls_per_step", "Tool calls emitidas en un mismo paso ReAct (ejecutadas en paralelo).",
+    buckets=(1, 2, 3, 4, 6, 8))
+API_PROJECTION_BYTES_SAVED = REGISTRY.counter(
+    "sql_agent_api_projection_bytes_saved_total", "Bytes de respuestas API descartados por la proyección.", ("endpoint",))
+API_PROJECTION_TOKENS_SAVED = REGISTRY.counter(
+    "sql_agent_api_projection_tokens_saved_total", "Tokens de respuestas API ahorrados al agente ReAct.", ("endpoint",))
+SQL_RETRIES = REGISTRY.counter(
+    "sql_agent_sql_retries_total", "Reintentos de Self-Healing SQL.", ("error_code",))
+SQL_TIMEOUTS = REGISTRY.counter(
+    "sql_agent_sql_timeouts_total", "Consultas canceladas por superar database.timeout.", ("killed",))
+EXPORT_ROWS = REGISTRY.counter(
+    "sql_agent_export_rows_total", "Filas exportadas a archivo (CSV/Parquet).", ("format",))
+EXPORT_DURATION = REGISTRY.histogram(
+    "sql_agent_export_seconds", "Duración de las exportaciones de resultados completos.", ("format",),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600))
+NEXT_PAGES = REGISTRY.counter(
+    "sql_agent_next_pages_total", "Páginas siguientes servidas por keyset (\"más\") sin generar SQL.", ("outcome",))
+SINGLEFLIGHT_COALESCED = REGISTRY.counter(
+    "sql_agent_singleflight_coalesced_total", "Llamadas idénticas que esperaron a una ya en curso.", ("kind",))
+CACHE_EVENTS = REGISTRY.counter(
+    "sql_agent_cache_events_total", "Aciertos/fallos de cachés internas.", ("cache", "result"))
+ANSWER_PATH = REGISTRY.counter(
+    "sql_agent_answer_path_total", "Respuestas por ruta (fast = plantilla, llm = resumen).", ("path",))
+POOL_WAIT = REGISTRY.histogram(
+    "sql_agent_db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0))
+POOL_PRE_PING = REGISTRY.histogram(
+    "sql_agent_db_pool_pre_ping_seconds", "Costo del pre-ping por checkout.", ("engine",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
+POOL_IN_USE = REGISTRY.gauge(
+    "sql_agent_db_pool_in_use", "Conexiones prestadas (checked out).", ("engine",))
+POOL_OVERFLOW = REGISTRY.gauge(
+    "sql_agent_db_pool_overflow", "Conexiones por encima de pool_size.", ("engine",))
+POOL_SIZE = REGISTRY.gauge(
+    "sql_agent_db_pool_size", "Tamaño base del pool.", ("engine",))
+POOL_MAX_OVERFLOW = REGISTRY.gauge(
+    "sql_agent_db_pool_max_overflow", "Límite de overflow vigente (varía en modo adaptativo).", ("engine",))
+POOL_CONNECTS = REGISTRY.counter(
+    "sql_agent_db_pool_connects_total", "Conexiones físicas abiertas.", ("engine",))
+POOL_INVALIDATIONS = REGISTRY.counter(
+    "sql_agent_db_pool_invalidations_total", "Conexiones invalidadas (caídas detectadas).", ("engine",))
+TURN_LATENCY = REGISTRY.histogram(
+    "sql_agent_turn_duration_seconds", "Duración total de un turno por canal e intención.", ("channel", "intent"))
+CPU_OFFLOAD = REGISTRY.histogram(
+    "sql_agent_cpu_offload_seconds", "Pasos CPU ejecutados fuera del event loop (incluye espera en el pool).", ("task",))
+LOOP_LAG = REGISTRY.histogram(
+    "sql_agent_event_loop_lag_seconds", "Retraso del event loop al despertar un sleep.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+LOOP_STALLS = REGISTRY.counter(
+    "sql_agent_event_loop_stalls_total", "Bloqueos del event loop por encima de executor.lag_monitor.threshold_ms.")
+
+
+def render_latest() -> str:
+    """Exposición en formato Prometheus de todas las métricas registradas."""
+    return REGISTRY.render()
@@ -0,0 +1,46 @@
+import re
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+from sql_agent.utils import metrics
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def flight_key(*parts: Any) -> str:
+    """Clave estable de una llamada: partes con espacios colapsados, en hash."""
+    normalized = "\x1f".join(_WHITESPACE.sub(" ", str(p)).strip() for p in parts)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas idénticas en curso: la primera ejecuta `factory()`
+    y las que llegan mientras tanto esperan el mismo resultado (o excepción).
+    La llamada corre en su propia tarea, así que cancelar a un llamador
+    (ej: un usuario que se desconecta) no cancela a los demás.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Marca la excepción como leída si nadie quedó esperando
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            metrics.SINGLEFLIGHT_COALESCED.inc(kind=self.name)
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
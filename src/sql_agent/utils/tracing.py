@@ -0,0 +1,224 @@
+import time
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+from sql_agent.utils.logger import get_logger, log_event
+from sql_agent.utils import metrics
+
+logger = get_logger("sql_agent.trace")
+
+# Contexto del turno en curso (se propaga a tareas hijas y callbacks de LangChain)
+current_node: contextvars.ContextVar[str] = contextvars.ContextVar("current_node", default="-")
+current_intent: contextvars.ContextVar[str] = contextvars.ContextVar("current_intent", default="-")
+current_thread: contextvars.ContextVar[str] = contextvars.ContextVar("current_thread", default="-")
+
+# Suscriptores de spans (ej: el benchmark recoge duraciones crudas para percentiles)
+_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+
+def add_listener(listener: Callable[[Dict[str, Any]], None]):
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[Dict[str, Any]], None]):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _emit(record: Dict[str, Any]):
+    log_event(logger, "span", **record)
+    for listener in list(_listeners):
+        try:
+            listener(record)
+        except Exception:
+            pass
+
+
+def _finish(kind: str, name: str, start: float, attrs: Dict[str, Any], error: Optional[BaseException]):
+    duration = time.perf_counter() - start
+    record = {
+        "kind": kind,
+        "name": name,
+        "duration_ms": round(duration * 1000, 2),
+        "node": current_node.get(),
+        "intent": current_intent.get(),
+        "thread_id": current_thread.get(),
+        **attrs,
+    }
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+    if kind == "db":
+        metrics.DB_LATENCY.observe(duration, operation=name)
+        if "rows" in attrs:
+            metrics.DB_ROWS.observe(attrs["rows"], operation=name)
+    elif kind == "http":
+        metrics.HTTP_LATENCY.observe(duration, target=name, status=attrs.get("status", "error" if error else ""))
+    _emit(record)
+
+
+@asynccontextmanager
+async def span(kind: str, name: str, **attrs: Any):
+    """
+    Mide un bloque asíncrono (db, http, llm, branch...).
+    Devuelve un dict mutable para añadir atributos (ej: attrs["rows"] = 10).
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _finish(kind, name, start, attrs, error)
+
+
+@contextmanager
+def sync_span(kind: str, name: str, **attrs: Any):
+    """Variante síncrona de `span` (ej: RequestsWrapper.get)."""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _finish(kind, name, start, attrs, error)
+
+
+def traced_node(name: str, fn: Callable):
+    """
+    Envuelve un nodo del grafo: mide su duración por nodo e intención y
+    publica el contexto (nodo, intención, thread_id) para los spans internos.
+    """
+    # Sin functools.wraps: __wrapped__ haría que LangGraph vea la firma (state) del
+    # nodo original y nunca pase `config` (thread_id siempre "-")
+    async def wrapper(state: Dict[str, Any], config: RunnableConfig = None):
+        if config is None:
+            try:
+                from langgraph.config import get_config
+                config = get_config()
+            except (ImportError, RuntimeError):
+                config = {}
+        configurable = (config or {}).get("configurable", {}) or {}
+        tokens = [
+            current_node.set(name),
+            current_thread.set(str(configurable.get("thread_id", "-"))),
+        ]
+        intent = state.get("intent") or "-"
+        tokens.append(current_intent.set(intent))
+        start = time.perf_counter()
+        error = None
+        try:
+            output = await fn(state)
+            # El router define la intención en su propia salida
+            if isinstance(output, dict) and output.get("intent"):
+                intent = output["intent"]
+            return output
+        except BaseException as e:
+            error = e
+            metrics.NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            metrics.NODE_LATENCY.observe(duration, node=name, intent=intent)
+            record = {"kind": "node", "name": name, "duration_ms": round(duration * 1000, 2),
+                      "node": name, "intent": intent, "thread_id": current_thread.get()}
+            if error is not None:
+                record["error"] = f"{type(error).__name__}: {error}"
+            _emit(record)
+            current_intent.reset(tokens[2])
+            current_thread.reset(tokens[1])
+            current_node.reset(tokens[0])
+
+    wrapper.__name__ = wrapper.__qualname__ = getattr(fn, "__name__", name)
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    Callback de LangChain que registra latencia, tokens y costo de cada llamada
+    al LLM (incluidas las del agente ReAct), etiquetadas por el nodo en curso.
+    """
+    run_inline = True
+
+    def __init__(self, provider: str, model: str, pricing: Optional[Dict[str, float]] = None):
+        self.provider = provider
+        self.model = model
+        self.pricing = pricing or {}
+        self._starts: Dict[Any, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    @staticmethod
+    def extract_usage(response) -> Dict[str, int]:
+        """Normaliza el uso de tokens (usage_metadata o llm_output.token_usage)."""
+        usage = {"prompt": 0, "completion": 0, "cached": 0}
+        for generations in getattr(response, "generations", []) or []:
+            for gen in generations:
+                message = getattr(gen, "message", None)
+                meta = getattr(message, "usage_metadata", None)
+                if meta:
+                    usage["prompt"] += meta.get("input_tokens", 0) or 0
+                    usage["completion"] += meta.get("output_tokens", 0) or 0
+                    details = meta.get("input_token_details") or {}
+                    cached = details.get("cache_read", 0) or 0
+                    if not cached:
+                        # DeepSeek (cliente OpenAI) informa el acierto de caché solo en su token_usage
+                        raw = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+                        cached = raw.get("prompt_cache_hit_tokens", 0) or 0
+                    usage["cached"] += cached
+        if not usage["prompt"] and not usage["completion"]:
+            token_usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+            usage["prompt"] = token_usage.get("prompt_tokens", 0) or 0
+            usage["completion"] = token_usage.get("completion_tokens", 0) or 0
+            usage["cached"] = token_usage.get("prompt_cache_hit_tokens", 0) or 0
+        return usage
+
+    def _cost(self, usage: Dict[str, int]) -> float:
+        per_m = 1_000_000
+        fresh = max(usage["prompt"] - usage["cached"], 0)
+        cached_price = self.pricing.get("cached_input_per_1m", self.pricing.get("input_per_1m", 0))
+        return (fresh * self.pricing.get("input_per_1m", 0)
+                + usage["cached"] * cached_price
+                + usage["completion"] * self.pricing.get("output_per_1m", 0)) / per_m
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        duration = time.perf_counter() - start if start else 0.0
+        node = current_node.get()
+        usage = self.extract_usage(response)
+
+        metrics.LLM_LATENCY.observe(duration, provider=self.provider, model=self.model, node=node)
+        for kind, value in usage.items():
+            if value:
+                metrics.LLM_TOKENS.inc(value, provider=self.provider, node=node, kind=kind)
+        if usage["prompt"]:
+            metrics.LLM_PREFIX_CACHE.observe(usage["cached"] / usage["prompt"], provider=self.provider, node=node)
+        cost = self._cost(usage)
+        if cost:
+            metrics.LLM_COST.inc(cost, provider=self.provider, node=node)
+
+        _emit({
+            "kind": "llm", "name": self.model, "provider": self.provider,
+            "duration_ms": round(duration * 1000, 2), "node": node,
+            "intent": current_intent.get(), "thread_id": current_thread.get(),
+            "prompt_tokens": usage["prompt"], "completion_tokens": usage["completion"],
+            "cached_tokens": usage["cached"], "cost_usd": round(cost, 6),
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        _emit({"kind": "llm", "name": self.model, "provider": self.provider,
+               "node": current_node.get(), "error": f"{type(error).__name__}: {error}"})
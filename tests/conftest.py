@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Permite correr `pytest` sin instalar el paquete (layout src/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,49 @@
+import collections
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("fastapi")
+
+from api.dispatcher import merge_metrics, pick_worker
+
+WORKERS = [f"http://127.0.0.1:{8002 + i}" for i in range(4)]
+JIDS = [f"5491100{i:04d}@c.us" for i in range(2000)]
+
+
+def test_pick_worker_is_stable_and_balanced():
+    owners = {jid: pick_worker(jid, WORKERS) for jid in JIDS}
+    assert owners == {jid: pick_worker(jid, list(reversed(WORKERS))) for jid in JIDS}
+    counts = collections.Counter(owners.values())
+    assert set(counts) == set(WORKERS)
+    assert min(counts.values()) > len(JIDS) / len(WORKERS) * 0.8
+
+
+def test_removing_a_worker_only_moves_its_users():
+    before = {jid: pick_worker(jid, WORKERS) for jid in JIDS}
+    after = {jid: pick_worker(jid, WORKERS[:-1]) for jid in JIDS}
+    moved = {jid for jid in JIDS if before[jid] != after[jid]}
+    assert moved == {jid for jid in JIDS if before[jid] == WORKERS[-1]}
+
+
+WORKER_OUTPUT = """# HELP sql_agent_llm_queue_depth Llamadas al LLM esperando turno en el planificador.
+# TYPE sql_agent_llm_queue_depth gauge
+sql_agent_llm_queue_depth {depth}
+# HELP sql_agent_db_duration_seconds Duración de ejecuciones SQL.
+# TYPE sql_agent_db_duration_seconds histogram
+sql_agent_db_duration_seconds_bucket{{operation="select",le="+Inf"}} {depth}
+sql_agent_db_duration_seconds_count{{operation="select"}} {depth}
+"""
+
+
+def test_merge_metrics_labels_every_sample_with_its_worker():
+    merged = merge_metrics({"0": WORKER_OUTPUT.format(depth=1), "1": WORKER_OUTPUT.format(depth=2)})
+    lines = merged.splitlines()
+    assert lines.count("# TYPE sql_agent_llm_queue_depth gauge") == 1
+    assert 'sql_agent_llm_queue_depth{worker="0"} 1' in lines
+    assert 'sql_agent_llm_queue_depth{worker="1"} 2' in lines
+    assert 'sql_agent_db_duration_seconds_bucket{worker="1",operation="select",le="+Inf"} 2' in lines
+    # Las muestras de una familia quedan juntas, debajo de su TYPE
+    histogram = lines.index("# TYPE sql_agent_db_duration_seconds histogram")
+    assert all(line.startswith("sql_agent_db_duration_seconds") for line in lines[histogram + 1:])
+    assert len(lines) == 2 + 2 + 2 + 4
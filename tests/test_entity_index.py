@@ -0,0 +1,104 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sql_agent.semantic.entity_index import EntityIndex, EntityMatch, normalize
+
+MERCHANTS = ("merchants", "name", "id")
+
+
+@pytest.fixture
+def index(monkeypatch):
+    config = {"min_score": 85, "max_matches": 3}
+    monkeypatch.setattr(EntityIndex, "_config", staticmethod(lambda: config))
+    monkeypatch.setattr(EntityIndex, "_entries", [])
+    monkeypatch.setattr(EntityIndex, "_postings", defaultdict(set))
+    monkeypatch.setattr(EntityIndex, "_by_key", {})
+    monkeypatch.setattr(EntityIndex, "_sizes", defaultdict(int))
+    monkeypatch.setattr(EntityIndex, "_watermarks", {})
+    monkeypatch.setattr(EntityIndex, "_ready", True)
+    return EntityIndex
+
+
+def _load(index, values, cap=100):
+    for key, value in values:
+        index._upsert(MERCHANTS, key, value, cap)
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize("  Farmacia  Pérez, C.A. ") == "farmacia perez c a"
+
+
+def test_resolves_a_mention_to_its_key(index):
+    _load(index, [(1, "Farmacia Pérez"), (2, "Ferretería Central"), (3, "Panadería La Espiga")])
+    [match] = index.resolve("ventas de farmacia perez este mes")
+    assert (match.value, match.key, match.key_column) == ("Farmacia Pérez", 1, "id")
+
+
+def test_exact_value_wins_over_values_that_contain_it(index):
+    _load(index, [(1, "Central"), (2, "Ferretería Central")])
+    [match] = index.resolve("ventas de central")
+    assert match.key == 1
+
+
+def test_repeated_value_filters_by_value_not_key(index):
+    _load(index, [(1, "Farmacia Pérez"), (2, "Farmacia Pérez")])
+    [match] = index.resolve("ventas de farmacia perez")
+    assert match.key is None and match.value == "Farmacia Pérez"
+
+
+def test_ambiguous_mentions_are_not_resolved(index):
+    _load(index, [(1, "Juan Pérez"), (2, "Juan Díaz")])
+    assert index.resolve("pagos de juan") == []
+
+
+def test_cap_only_blocks_new_keys(index):
+    _load(index, [(1, "Farmacia Pérez"), (2, "Ferretería Central")], cap=1)
+    assert len(index._by_key) == 1
+    _load(index, [(1, "Farmacia Pérez Norte")], cap=1)
+    assert index._entries[0].value == "Farmacia Pérez Norte"
+    # Los trigramas del valor viejo ya no apuntan a la entrada
+    assert [e.value for _, e in index.lookup("farmacia perez norte", limit=5)] == ["Farmacia Pérez Norte"]
+
+
+def test_prompt_line_is_json():
+    match = EntityMatch('el "Rey"', 'Bodegón "El Rey" \\ 2', "merchants", "name", "id", 9, 97.4)
+    line = match.to_prompt()
+    assert line.startswith("- ")
+    assert json.loads(line[2:]) == {"mencion": 'el "Rey"', "columna": "merchants.name",
+                                     "valor": 'Bodegón "El Rey" \\ 2', "clave": {"id": 9}, "similitud": 97}
+
+
+def test_incremental_load_pages_through_shared_watermarks(index):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    source = {"table": "merchants", "column": "name", "key_column": "id"}
+
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.connect() as conn:
+            await conn.execute(text("CREATE TABLE merchants (id INTEGER PRIMARY KEY, name TEXT, updated_at TEXT)"))
+            # Más filas con la misma marca que batch_size: la paginación avanza por (marca, clave)
+            for i in range(1, 8):
+                await conn.execute(text("INSERT INTO merchants VALUES (:id, :name, '2024-01-01')"),
+                                   {"id": i, "name": f"Comercio {i}"})
+            await conn.execute(text("INSERT INTO merchants VALUES (8, NULL, '2024-01-01')"))
+            first = await index._load_source(conn, source, "updated_at", limit=100, batch_size=3)
+
+            await conn.execute(text("UPDATE merchants SET name = 'Comercio Dos', updated_at = '2024-02-01' "
+                                    "WHERE id = 2"))
+            second = await index._load_source(conn, source, "updated_at", limit=100, batch_size=3)
+        await engine.dispose()
+        return first, second
+
+    assert asyncio.run(main()) == (7, 1)
+    assert len(index._by_key) == 7
+    assert index._entries[index._by_key[("merchants", "name", 2)]].value == "Comercio Dos"
+    assert index._watermarks[("merchants", "name")] == ("2024-02-01", 2)
@@ -0,0 +1,67 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlglot")
+pytest.importorskip("dotenv")
+
+from sql_agent.core.formatter import FastAnswerer
+from sql_agent.utils import metrics
+
+
+@pytest.fixture
+def answerer():
+    return FastAnswerer({"currency_format": "USD"})
+
+
+def test_scalar(answerer):
+    sql = "SELECT COUNT(*) FROM users"
+    assert answerer.try_answer("¿Cuántos usuarios hay?", [{"COUNT(*)": 1523}], sql=sql) == "📊 *Cantidad*: 1.523"
+
+
+def test_card(answerer):
+    row = {"name": "Ana", "total_debt": Decimal("1234.5"), "created_at": datetime.date(2024, 3, 1)}
+    assert answerer.try_answer("datos de Ana", [row]) == (
+        "📋 Resultado:\n• *Name*: Ana\n• *Total debt*: $1.234,50\n• *Created at*: 01/03/2024"
+    )
+
+
+def test_list(answerer):
+    rows = [{"status": "paid", "n": 12}, {"status": "late", "n": 3}]
+    sql = "SELECT status, COUNT(*) AS n FROM loans GROUP BY status"
+    assert answerer.try_answer("préstamos por estado", rows, sql=sql) == (
+        "📋 Status / N:\n1. *paid* — 12\n2. *late* — 3"
+    )
+
+
+def test_table(answerer):
+    rows = [{"user_id": 1001, "city": "Caracas", "ratio": 0.25}, {"user_id": 1002, "city": "Maracay", "ratio": 0.5}]
+    assert answerer.try_answer("ratio por usuario", rows) == (
+        "📋 Resultado:\n```\n"
+        "User id | City    | Ratio\n"
+        "--------+---------+------\n"
+        "1001    | Caracas | 25,0%\n"
+        "1002    | Maracay | 50,0%\n"
+        "```"
+    )
+
+
+@pytest.mark.parametrize("currency, expected", [("USD", "$10,50"), ("EUR", "€10,50"), ("VES", "10,50 Bs.")])
+def test_currency_comes_from_meta(currency, expected):
+    assert FastAnswerer({"currency_format": currency}).format_value("monto", Decimal("10.5")) == expected
+    # La moneda explícita en el nombre de la columna manda sobre meta.currency_format
+    assert FastAnswerer({"currency_format": currency}).format_value("monto_usd", Decimal("10.5")) == "$10,50"
+
+
+def test_reasoning_and_large_results_go_to_the_llm(answerer):
+    assert answerer.try_answer("¿por qué bajaron las ventas?", [{"total": 1}]) is None
+    assert answerer.try_answer("ventas", [{"total": 1}], truncated=True) is None
+    assert answerer.try_answer("ventas", [{"total": i} for i in range(11)]) is None
+
+
+def test_record_counts_in_metrics():
+    before = FastAnswerer.stats()["fast"]
+    FastAnswerer.record("fast")
+    assert FastAnswerer.stats()["fast"] == before + 1
+    assert metrics.ANSWER_PATH.value(path="fast") == before + 1
@@ -0,0 +1,138 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlglot")
+
+from sql_agent.core.result import QueryResult
+from sql_agent.database.pagination import Continuation, KeysetPaginator
+
+PAGE = 3
+
+SALES_SCHEMA = {
+    "sales": {
+        "row_estimate": 20,
+        "columns": [
+            {"name": "id", "type": "int", "nullable": False, "key": "PRI"},
+            {"name": "amount", "type": "decimal", "nullable": True, "key": ""},
+            {"name": "category", "type": "varchar", "nullable": True, "key": ""},
+        ],
+        "indexes": {"PRIMARY": {"unique": True, "columns": ["id"]}},
+        "foreign_keys": [],
+    }
+}
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, amount REAL, category TEXT)")
+    amounts = [9.5, 10.25, 100, 9.5, None, 2, 10.25, 9.5, 100.5, None, 3, 9.5]
+    categories = ["b", None, "a", "b", "c", None, "a", "b", "c", None, "a", "b"]
+    conn.executemany("INSERT INTO sales VALUES (?, ?, ?)",
+                     [(i + 1, a, c) for i, (a, c) in enumerate(zip(amounts, categories))])
+    yield conn
+    conn.close()
+
+
+def _fetch(conn, sql):
+    """Como AgentNodes._execute_sql: page + 1 filas; los REAL llegan como Decimal (igual que DECIMAL en MySQL)."""
+    cursor = conn.execute(sql)
+    columns = [d[0] for d in cursor.description]
+    rows = [tuple(Decimal(str(v)) if isinstance(v, float) else v for v in row) for row in cursor.fetchmany(PAGE + 1)]
+    return QueryResult.from_rows(columns, rows[:PAGE], truncated=len(rows) > PAGE)
+
+
+def _page_through(conn, sql, schema=None):
+    first, continuation = KeysetPaginator.prepare(sql, "sqlite", page_size=PAGE, schema=schema)
+    expected = conn.execute(first.rsplit(" LIMIT ", 1)[0]).fetchall()
+
+    seen = []
+    result = _fetch(conn, first)
+    while True:
+        seen += [tuple(float(v) if isinstance(v, Decimal) else v for v in row.values()) for row in result.rows()]
+        continuation = KeysetPaginator.advance(continuation, result)
+        if continuation is None:
+            break
+        # La continuación pasa por el estado del hilo (payload serializable)
+        continuation = Continuation.from_payload(continuation.to_payload())
+        result = _fetch(conn, KeysetPaginator.next_page_sql(continuation, PAGE))
+    return seen, expected
+
+
+def test_prepare_keeps_the_validated_text():
+    sql = ("SELECT DATE_FORMAT(`created_at`, '%Y-%m') AS mes, amount /* monto */ FROM `sales` "
+           "WHERE created_at > NOW() - INTERVAL 7 DAY AND id IN (SELECT id FROM t ORDER BY id LIMIT 5) "
+           "ORDER BY mes DESC LIMIT 100;")
+    first, continuation = KeysetPaginator.prepare(sql, "mysql", page_size=15)
+    body = sql[:sql.index(" ORDER BY mes")]
+    assert continuation.sql == body
+    assert first == body + "\nORDER BY 1 DESC, 2 LIMIT 16"
+    assert continuation.limit == 100
+
+
+def test_prepare_ends_line_comments_before_the_order_by():
+    first, _ = KeysetPaginator.prepare("SELECT id, amount FROM sales -- últimas ventas", "sqlite", page_size=PAGE)
+    assert first.endswith("-- últimas ventas\nORDER BY 1, 2 LIMIT 4")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) FROM sales",
+    "SELECT SUM(amount) AS total, MAX(amount) FROM sales",
+    "SELECT id FROM sales LIMIT 3",
+    "SELECT id FROM sales LIMIT 10 OFFSET 5",
+    "SELECT * FROM sales",
+    "SELECT category, SUM(amount) FROM big_table GROUP BY category",
+    "SELECT id FROM sales ORDER BY amount",
+    "SELECT id FROM sales WHERE",
+])
+def test_prepare_skips_queries_it_cannot_or_should_not_page(sql):
+    assert KeysetPaginator.prepare(sql, "sqlite", page_size=PAGE, schema=SALES_SCHEMA) is None
+
+
+def test_tie_break_uses_the_primary_key_when_it_is_in_the_output():
+    first, continuation = KeysetPaginator.prepare(
+        "SELECT s.amount, s.category, s.id FROM sales AS s ORDER BY s.amount DESC", "sqlite",
+        page_size=PAGE, schema=SALES_SCHEMA,
+    )
+    assert continuation.keys == [(0, True), (2, False)]
+    assert first.endswith("ORDER BY 1 DESC, 3 LIMIT 4")
+
+
+def test_group_by_is_paged_only_over_small_sources_and_keyed_on_its_groups():
+    sql = "SELECT category, SUM(amount) AS total FROM sales GROUP BY category ORDER BY total DESC"
+    _, continuation = KeysetPaginator.prepare(sql, "sqlite", page_size=PAGE, schema=SALES_SCHEMA)
+    assert continuation.keys == [(1, True), (0, False)]
+    assert KeysetPaginator.prepare(sql, "sqlite", page_size=PAGE, schema=SALES_SCHEMA, max_aggregate_rows=10) is None
+    assert KeysetPaginator.prepare(sql, "sqlite", page_size=PAGE) is None
+
+
+def test_numeric_cursor_is_not_compared_as_text():
+    continuation = Continuation(sql="SELECT amount FROM sales", dialect="sqlite", keys=[(0, False)],
+                                columns=["amount"], cursor=["10.25"], types=["decimal"], shown=3, ties=1)
+    sql = KeysetPaginator.next_page_sql(continuation, PAGE)
+    assert "> 10.25" in sql and "'10.25'" not in sql
+
+
+@pytest.mark.parametrize("sql, schema", [
+    # Decimales (9.5 < 10.25 < 100) y duplicados exactos: desempate por todas las columnas
+    ("SELECT amount, category FROM sales ORDER BY amount", None),
+    # Expresión sin afinidad de tipo: SQLite no convierte un literal '10.25' a número
+    ("SELECT amount * 1 AS monto, category FROM sales ORDER BY monto", None),
+    # Claves NULL en orden descendente
+    ("SELECT category, amount FROM sales ORDER BY category DESC", None),
+    # Desempate por PK
+    ("SELECT id, amount FROM sales ORDER BY amount DESC", SALES_SCHEMA),
+    # GROUP BY sobre una tabla chica
+    ("SELECT category, COUNT(*) AS n FROM sales GROUP BY category ORDER BY n DESC", SALES_SCHEMA),
+])
+def test_pages_cover_the_result_exactly_once_in_order(db, sql, schema):
+    seen, expected = _page_through(db, sql, schema)
+    assert seen == expected
+
+
+def test_pages_respect_the_original_limit(db):
+    seen, expected = _page_through(db, "SELECT id, amount FROM sales ORDER BY amount LIMIT 7", SALES_SCHEMA)
+    assert len(seen) == 7
+    assert seen == expected[:7]
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+pytest.importorskip("yaml")
+pytest.importorskip("dotenv")
+
+from sql_agent.api import projection
+from sql_agent.api.projection import ResponseProjector
+
+SPEC = {
+    "paths": {
+        "/users/{id}": {"get": {"responses": {"200": {"content": {"application/json": {"schema": {
+            "$ref": "#/components/schemas/User"}}}}}}},
+        "/users/me": {"get": {"responses": {"200": {"content": {"application/json": {"schema": {
+            "example": {"id": 1, "email": "a@b.c"}}}}}}}},
+        "/loans": {"get": {"responses": {"200": {"content": {"application/json": {"schema": {
+            "type": "array", "items": {"properties": {"id": {}, "amount": {}}}}}}}}}},
+    },
+    "components": {"schemas": {"User": {"allOf": [
+        {"properties": {"id": {}, "name": {}}},
+        {"properties": {"address": {"properties": {"city": {}}}, "avatar": {}}},
+    ]}}},
+}
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "swagger.json"
+    path.write_text(json.dumps(SPEC), encoding="utf-8")
+    settings = {"max_array_items": 3, "max_string_chars": 20, "max_depth": 5, "token_budget": 1500}
+    monkeypatch.setattr(projection, "_swagger_path", lambda: str(path))
+    monkeypatch.setattr(projection, "tiktoken", None)
+    monkeypatch.setattr(ResponseProjector, "_config", staticmethod(lambda: settings))
+    monkeypatch.setattr(ResponseProjector, "_routes", [])
+    monkeypatch.setattr(ResponseProjector, "_mtime", None)
+    return settings
+
+
+def _project(url, data):
+    return json.loads(ResponseProjector.project(url, json.dumps(data)))
+
+
+def test_literal_routes_win_over_templates(config):
+    assert ResponseProjector.route("https://api.example.com/v1/users/me")[0] == "/users/me"
+    assert ResponseProjector.route("https://api.example.com/v1/users/42")[0] == "/users/{id}"
+    assert ResponseProjector.route("https://api.example.com/v1/other") == ("unknown", None)
+
+
+def test_keeps_documented_fields_only(config):
+    body = {"id": 7, "name": "Ana", "password_hash": "x", "address": {"city": "Caracas", "zip": "1010"},
+            "avatar": "A" * 300, "nickname": None, "tags": []}
+    assert _project("/users/7", body) == {"id": 7, "name": "Ana", "address": {"city": "Caracas"},
+                                          "avatar": "<blob omitido>"}
+
+
+def test_shape_from_example(config):
+    assert _project("/users/me", {"id": 1, "email": "a@b.c", "session": "tok"}) == {"id": 1, "email": "a@b.c"}
+
+
+def test_arrays_and_strings_are_capped(config):
+    body = [{"id": i, "amount": 10, "note": "n"} for i in range(5)]
+    assert _project("/loans", body) == [{"id": 0, "amount": 10}, {"id": 1, "amount": 10},
+                                        {"id": 2, "amount": 10}, "... (+2 más)"]
+    assert _project("/unknown", {"text": "x" * 50}) == {"text": "x" * 20 + "…"}
+
+
+def test_endpoint_overrides_replace_the_swagger_shape(config):
+    config["endpoints"] = {"/users/{id}": ["name"]}
+    assert _project("/users/7", {"id": 7, "name": "Ana"}) == {"name": "Ana"}
+
+
+def test_token_budget_shrinks_then_cuts(config):
+    config["token_budget"] = 40
+    config["max_array_items"] = 50
+    text = ResponseProjector.project("/loans", json.dumps([{"id": i, "amount": i * 100} for i in range(200)]))
+    # 50 -> 25 -> 12 -> 6 elementos: el primero que entra en ~40 tokens (4 caracteres por token)
+    assert json.loads(text)[-1] == "... (+194 más)"
+    assert len(text) // 4 <= 40
+
+    config["token_budget"] = 5
+    assert ResponseProjector.project("/loans", json.dumps([{"id": 1, "amount": 2}] * 20)).endswith(
+        "… (respuesta recortada)")
+
+
+def test_disabled_projection_returns_the_body(config):
+    config["enabled"] = False
+    body = json.dumps({"id": 7, "secret": "x"})
+    assert ResponseProjector.project("/users/7", body) == body
@@ -0,0 +1,71 @@
+import asyncio
+from collections import defaultdict, deque
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from sql_agent.llm import resilient
+from sql_agent.llm.resilient import ResilientChatModel
+from sql_agent.llm.scheduler import LLMScheduler
+
+
+class _FakeModel:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, messages, stop=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.name
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    config = {"max_concurrency": 1}
+    monkeypatch.setattr(LLMScheduler, "_config", staticmethod(lambda: config))
+    monkeypatch.setattr(LLMScheduler, "_waiting", [])
+    monkeypatch.setattr(LLMScheduler, "_active", defaultdict(int))
+    monkeypatch.setattr(LLMScheduler, "_active_total", 0)
+    monkeypatch.setattr(LLMScheduler, "_virtual_time", 0.0)
+    monkeypatch.setattr(LLMScheduler, "_finish_tags", {})
+    monkeypatch.setattr(ResilientChatModel, "_latencies", defaultdict(lambda: deque(maxlen=resilient.WINDOW_SIZE)))
+    return config
+
+
+def _model(primary, secondary):
+    return ResilientChatModel(
+        primary=primary, primary_provider="primary", secondary=secondary, secondary_provider="secondary",
+        resilience={"deadlines": {"default": 5}, "hedge": {"default_delay": 0.1}},
+    )
+
+
+def test_queue_wait_does_not_count_towards_the_hedge_delay(scheduler):
+    primary, secondary = _FakeModel("primary", 0.05), _FakeModel("secondary", 0.0)
+    model = _model(primary, secondary)
+
+    async def main():
+        async def backlog():
+            async with LLMScheduler.slot("other"):
+                await asyncio.sleep(0.3)
+
+        busy = asyncio.ensure_future(backlog())
+        await asyncio.sleep(0)
+        answer = await model._race([], None, {})
+        await busy
+        return answer
+
+    # El primario esperó 0.3s en cola (> default_delay) pero respondió a los 0.05s de su turno
+    assert asyncio.run(main()) == "primary"
+    assert secondary.calls == 0
+
+
+def test_slow_primary_is_hedged_once_it_runs(scheduler):
+    scheduler["max_concurrency"] = 4
+    primary, secondary = _FakeModel("primary", 1.0), _FakeModel("secondary", 0.0)
+
+    assert asyncio.run(_model(primary, secondary)._race([], None, {})) == "secondary"
+    assert secondary.calls == 1
@@ -0,0 +1,57 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from sql_agent.core.result import QueryResult
+
+ROW = (
+    7, True, 1.5, Decimal("1234.50"), datetime.datetime(2024, 5, 1, 13, 30), datetime.date(2024, 5, 1),
+    datetime.timedelta(minutes=90), uuid.UUID("12345678-1234-5678-1234-567812345678"), b"\x00\x01", "texto",
+)
+COLUMNS = ["id", "activo", "ratio", "monto", "creado", "dia", "duracion", "ref", "blob", "nombre"]
+
+
+def test_types_are_tagged_per_column():
+    result = QueryResult.from_rows(COLUMNS, [ROW])
+    assert result.types == ["int", "bool", "float", "decimal", "datetime", "date",
+                            "timedelta", "uuid", "bytes", "str"]
+
+
+def test_rows_round_trip_through_a_json_checkpoint():
+    result = QueryResult.from_rows(COLUMNS, [ROW, (None,) * len(ROW)], truncated=True)
+    payload = json.loads(json.dumps({k: v for k, v in result.to_payload().items() if k != "data"}))
+    payload["data"] = result.data  # bytes no es JSON; msgpack sí lo serializa
+    restored = QueryResult.from_payload(payload)
+    assert restored.rows() == [dict(zip(COLUMNS, ROW)), dict.fromkeys(COLUMNS)]
+    assert restored.truncated and restored.row_count == 2
+
+
+def test_encoded_cells_are_primitives():
+    data = QueryResult.from_rows(COLUMNS, [ROW]).data
+    assert [col[0] for col in data][3:8] == ["1234.50", "2024-05-01T13:30:00", "2024-05-01", 5400.0,
+                                             "12345678-1234-5678-1234-567812345678"]
+
+
+def test_type_comes_from_the_first_non_null_value():
+    result = QueryResult.from_rows(["monto"], [(None,), (Decimal("2.50"),)])
+    assert result.types == ["decimal"]
+    assert result.rows() == [{"monto": None}, {"monto": Decimal("2.50")}]
+
+
+def test_undecodable_values_are_returned_as_is():
+    assert QueryResult.decode("n/a", "decimal") == "n/a"
+    assert QueryResult.decode("2024-13-45", "date") == "2024-13-45"
+    assert QueryResult.decode("x", "str") == "x"
+
+
+def test_errors_map_mysql_codes():
+    class _Orig(Exception):
+        pass
+
+    exc = Exception("Unknown column")
+    exc.orig = _Orig(1054, "Unknown column 'x'")
+    result = QueryResult.from_error(exc)
+    assert not result.ok and result.error_code == "UNKNOWN_COLUMN"
+    assert result.to_text().startswith("Error SQL [UNKNOWN_COLUMN]")
+    assert QueryResult.from_error(ValueError("boom")).error_code == "SQL_ERROR"
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from sql_agent.semantic.sampler import ColumnSampler
+
+SCHEMA = {"orders": {"columns": [
+    {"name": "id", "type": "INTEGER", "nullable": False, "key": "PRI"},
+    {"name": "status", "type": "TEXT", "nullable": True, "key": ""},
+]}}
+MODEL = {"entities": [{"name": "order", "col": "id"}],
+         "dimensions": [{"name": "status", "col": "status", "type": "categorical"}]}
+
+
+def _run(scenario):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.connect() as conn:
+            await conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT)"))
+            # Estados viejos primero; los pedidos recientes usan otro vocabulario
+            for i in range(1, 21):
+                await conn.execute(text("INSERT INTO orders VALUES (:id, :status)"),
+                                   {"id": i, "status": "legacy" if i <= 15 else "paid"})
+            result = await scenario(ColumnSampler(conn, SCHEMA))
+        await engine.dispose()
+        return result
+
+    return asyncio.run(main())
+
+
+def test_profile_reads_the_most_recent_rows(monkeypatch):
+    monkeypatch.setattr(ColumnSampler, "PROFILE_SCAN_ROWS", 5)
+    stats = _run(lambda sampler: sampler.profile("orders", MODEL))
+    assert stats == {"status": {"cardinality": 1, "observed_values": ["paid"]}}
+
+
+def test_sample_reads_the_most_recent_rows():
+    rows = _run(lambda sampler: sampler.sample("orders", MODEL))
+    assert [row["id"] for row in rows] == ["20", "19", "18"]
@@ -0,0 +1,98 @@
+import asyncio
+import collections
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from sql_agent.llm.scheduler import LLMScheduler
+from sql_agent.utils import metrics, tracing
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    config = {"max_concurrency": 1}
+    monkeypatch.setattr(LLMScheduler, "_config", staticmethod(lambda: config))
+    monkeypatch.setattr(LLMScheduler, "_waiting", [])
+    monkeypatch.setattr(LLMScheduler, "_active", defaultdict(int))
+    monkeypatch.setattr(LLMScheduler, "_active_total", 0)
+    monkeypatch.setattr(LLMScheduler, "_virtual_time", 0.0)
+    monkeypatch.setattr(LLMScheduler, "_finish_tags", {})
+    return config
+
+
+def _burst(thread, calls, order, weight=1.0):
+    """Llamadas concurrentes de un hilo (traced_node publica el thread_id en current_thread)."""
+    async def call(i):
+        async with LLMScheduler.slot("fake", weight=weight):
+            order.append(thread)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        tracing.current_thread.set(thread)
+        await asyncio.gather(*(call(i) for i in range(calls)))
+
+    return asyncio.ensure_future(run())
+
+
+async def _queued(depth):
+    while len(LLMScheduler._waiting) < depth:
+        await asyncio.sleep(0.001)
+
+
+def test_scheduler_is_fair_across_threads(scheduler):
+    order = []
+
+    async def main():
+        # Ráfaga del hilo A (una llamada en curso y el resto en cola) y luego una llamada de B
+        a = _burst("A", 5, order)
+        await _queued(4)
+        await _burst("B", 1, order)
+        await a
+
+    asyncio.run(main())
+
+    assert sorted(order) == ["A"] * 5 + ["B"]
+    # B no espera a que termine la cola de A: pasa en cuanto se libera el turno en curso
+    assert order.index("B") == 1
+
+
+def test_weights_set_the_share_of_backlogged_threads(scheduler):
+    order = []
+
+    async def main():
+        await asyncio.gather(_burst("A", 12, order, weight=2.0), _burst("B", 12, order, weight=1.0))
+
+    asyncio.run(main())
+
+    # Con ambos hilos en cola, A (peso 2) recibe el doble de turnos que B
+    assert collections.Counter(order[:12]) == {"A": 8, "B": 4}
+
+
+def test_cancelled_waiters_leave_the_queue(scheduler):
+    order = []
+
+    async def main():
+        holder = _burst("A", 1, order)
+        await asyncio.sleep(0)
+        waiter = _burst("B", 3, order)
+        await _queued(3)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        depth = len(LLMScheduler._waiting), metrics.LLM_QUEUE_DEPTH.value()
+        await holder
+        return depth
+
+    assert asyncio.run(main()) == (0, 0.0)
+    # B no queda penalizado por las llamadas que nunca hizo
+    assert LLMScheduler._finish_tags["B"] == 0.0
+
+
+def test_weight_comes_from_settings_per_role(scheduler):
+    scheduler["weights"] = {"router": 2, "default": 0.5}
+    assert LLMScheduler.weight("router") == 2.0
+    assert LLMScheduler.weight("generate_answer") == 0.5
+    del scheduler["weights"]
+    assert LLMScheduler.weight("router") == 1.0
@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("sqlglot")
+pytest.importorskip("dotenv")
+
+from sql_agent.core.formatter import FastAnswerer
+from sql_agent.semantic.entity_index import EntityIndex
+from sql_agent.semantic.snapshots import MetricCompiler, MetricSnapshots, SnapshotStore
+
+CONFIG = {
+    "enabled": True,
+    "freshness_sla": 1800,
+    "metrics": {
+        "delinquency_rate": {"keywords": ["morosidad", "tasa de mora"],
+                             "breakdowns": {"merchant": ["por comercio"]}},
+        "average_ticket": {"keywords": ["ticket promedio"], "format": "money"},
+    },
+}
+
+SEMANTIC_LAYER = {
+    "models": [
+        {"name": "payments", "source": "db.payments",
+         "entities": [{"name": "payment", "col": "id", "type": "primary"}],
+         "dimensions": [{"name": "merchant", "col": "merchant_id"}],
+         "measures": [{"name": "amount", "col": "amount", "type": "sum"}]},
+        {"name": "loans", "source": "db.loans", "entities": [{"name": "loan", "col": "id", "type": "primary"}]},
+    ],
+    "metrics": [
+        {"name": "delinquency_rate", "description": "Tasa de Morosidad: pagos vencidos", "type": "ratio",
+         "numerator": {"type": "count", "model": "payments", "filter": "late = 1"},
+         "denominator": {"type": "count", "model": "payments"}},
+        {"name": "average_ticket", "type": "ratio",
+         "numerator": "payments.amount", "denominator": "loans.count"},
+        {"name": "payments_total", "type": "simple"},
+    ],
+}
+
+
+@pytest.fixture
+def snapshots(monkeypatch, tmp_path):
+    monkeypatch.setattr(MetricSnapshots, "_config", staticmethod(lambda: CONFIG))
+    monkeypatch.setattr(MetricSnapshots, "_metric_defs",
+                        staticmethod(lambda: {m["name"]: m for m in SEMANTIC_LAYER["metrics"]}))
+    monkeypatch.setattr(MetricSnapshots, "_store", SnapshotStore(str(tmp_path / "snapshots.json")))
+    monkeypatch.setattr(EntityIndex, "resolve", classmethod(lambda cls, question: []))
+    return MetricSnapshots
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("¿Cuál es la morosidad?", ("delinquency_rate", None)),
+    ("tasa de mora actual por favor", ("delinquency_rate", None)),
+    ("morosidad por comercio", ("delinquency_rate", "merchant")),
+    ("dime el ticket promedio", ("average_ticket", None)),
+    # Filtros que el snapshot no aplica: tiempo, año, desgloses no precalculados u otras palabras
+    ("morosidad de este mes", None),
+    ("morosidad en 2023", None),
+    ("morosidad por ciudad", None),
+    ("morosidad de clientes premium", None),
+    ("¿por qué subió la morosidad?", None),
+    ("ventas totales", None),
+])
+def test_match(snapshots, question, expected):
+    assert snapshots.match(question) == expected
+
+
+def test_match_refuses_questions_naming_an_entity(snapshots, monkeypatch):
+    monkeypatch.setattr(EntityIndex, "resolve", classmethod(lambda cls, question: ["Farmatodo"]))
+    assert snapshots.match("morosidad farmatodo") is None
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE payments (id INTEGER PRIMARY KEY, merchant_id INTEGER, amount REAL, late INTEGER)")
+    conn.execute("CREATE TABLE loans (id INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT INTO payments VALUES (?, ?, ?, ?)",
+                     [(1, 1, 10.0, 1), (2, 1, 20.0, 0), (3, 2, 30.0, 0), (4, 2, 40.0, 0)])
+    conn.executemany("INSERT INTO loans VALUES (?)", [(1,), (2,)])
+    yield conn
+    conn.close()
+
+
+def test_same_model_ratio_is_one_pass(db):
+    compiler = MetricCompiler(SEMANTIC_LAYER)
+    sql = compiler.compile(SEMANTIC_LAYER["metrics"][0])
+    assert sql.count("FROM") == 1
+    assert db.execute(sql).fetchall() == [(1, 4)]
+    by_merchant = compiler.compile(SEMANTIC_LAYER["metrics"][0], breakdown="merchant")
+    assert sorted(db.execute(by_merchant).fetchall()) == [(1, 1, 2), (2, 0, 2)]
+
+
+def test_cross_model_ratio_and_unsupported_metrics(db):
+    compiler = MetricCompiler(SEMANTIC_LAYER)
+    average_ticket = SEMANTIC_LAYER["metrics"][1]
+    assert db.execute(compiler.compile(average_ticket)).fetchall() == [(100.0, 2)]
+    assert compiler.compile(average_ticket, breakdown="merchant") is None
+    assert compiler.compile(SEMANTIC_LAYER["metrics"][0], breakdown="city") is None
+    assert compiler.compile(SEMANTIC_LAYER["metrics"][2]) is None
+
+
+def test_answer_uses_fresh_snapshots_only(snapshots):
+    store = snapshots.store()
+    store.put("delinquency_rate", {"computed_at": time.time(), "rows": [
+        {"breakdown": None, "numerator": 1.0, "denominator": 4.0}]})
+    store.put("average_ticket", {"computed_at": time.time() - 3600, "rows": [
+        {"breakdown": None, "numerator": 100.0, "denominator": 2.0}]})
+    formatter = FastAnswerer({"currency_format": "USD"})
+
+    answer = asyncio.run(snapshots.answer("¿cuál es la morosidad?", formatter))
+    assert answer.startswith("📊 *Tasa de Morosidad*: 25,0% (1 de 4)")
+    assert "Dato precalculado" in answer
+    # Más viejo que freshness_sla: va a SQL en vivo
+    assert asyncio.run(snapshots.answer("ticket promedio", formatter)) is None
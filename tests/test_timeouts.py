@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sql_agent.database import timeouts
+from sql_agent.database.timeouts import QueryTimeoutError, StatementTimeout
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def keys(self):
+        return ["n"]
+
+    def fetchmany(self, size):
+        return self.rows[:size]
+
+    def scalar(self):
+        return self.rows[0][0]
+
+
+class _Conn:
+    """Conexión falsa: registra cada sentencia; las que contienen 'slow' no terminan nunca."""
+
+    def __init__(self, dialect="mysql", log=None):
+        self.dialect = SimpleNamespace(name=dialect)
+        self.log = log if log is not None else []
+        self.invalidated = False
+        self.engine = _Engine(self.log)
+
+    async def get_raw_connection(self):
+        raise NotImplementedError  # Sin thread_id del driver: SELECT CONNECTION_ID()
+
+    async def execute(self, clause):
+        sql = str(clause)
+        self.log.append(sql)
+        if "CONNECTION_ID" in sql:
+            return _Result([(42,)])
+        if "slow" in sql:
+            await asyncio.sleep(60)
+        return _Result([(i,) for i in range(10)])
+
+    async def invalidate(self):
+        self.invalidated = True
+
+
+class _Engine:
+    def __init__(self, log):
+        self.log = log
+
+    def connect(self):
+        engine = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return _Conn(log=engine.log)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT 1", "SELECT /*+ MAX_EXECUTION_TIME(500) */ 1"),
+    ("  /* top */ select id FROM t", "  /* top */ select /*+ MAX_EXECUTION_TIME(500) */ id FROM t"),
+    ("SELECT /*+ MAX_EXECUTION_TIME(10) */ 1", "SELECT /*+ MAX_EXECUTION_TIME(10) */ 1"),
+    ("WITH x AS (SELECT 1) SELECT * FROM x", None),
+])
+def test_with_hint(sql, expected):
+    assert StatementTimeout.with_hint(sql, 500) == expected
+
+
+def test_fetch_hints_the_select_and_caps_rows():
+    conn = _Conn()
+    columns, rows = asyncio.run(StatementTimeout.fetch(conn, "SELECT n FROM t", 2, max_rows=3))
+    assert columns == ["n"] and len(rows) == 4
+    assert conn.log == ["SELECT CONNECTION_ID()", "SELECT /*+ MAX_EXECUTION_TIME(2000) */ n FROM t"]
+
+
+def test_non_select_uses_the_session_variable_and_restores_it():
+    conn = _Conn()
+    asyncio.run(StatementTimeout.fetch(conn, "WITH x AS (SELECT 1) SELECT * FROM x", 2, max_rows=3))
+    assert conn.log[1] == "SET SESSION max_execution_time = 2000"
+    assert conn.log[-1] == "SET SESSION max_execution_time = DEFAULT"
+
+
+def test_timeout_kills_the_query_and_discards_the_connection(monkeypatch):
+    monkeypatch.setattr(timeouts, "CLIENT_GRACE_S", 0.0)
+    conn = _Conn()
+    with pytest.raises(QueryTimeoutError) as info:
+        asyncio.run(StatementTimeout.fetch(conn, "SELECT slow FROM t", 0.05, max_rows=3))
+    assert info.value.killed
+    assert "KILL QUERY 42" in conn.log
+    assert conn.invalidated
+
+
+def test_other_dialects_only_get_the_client_deadline(monkeypatch):
+    monkeypatch.setattr(timeouts, "CLIENT_GRACE_S", 0.0)
+    conn = _Conn(dialect="sqlite")
+    with pytest.raises(QueryTimeoutError) as info:
+        asyncio.run(StatementTimeout.fetch(conn, "SELECT slow FROM t", 0.05, max_rows=3))
+    assert not info.value.killed
+    assert conn.log == ["SELECT slow FROM t"] and conn.invalidated
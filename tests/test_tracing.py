@@ -0,0 +1,53 @@
+import asyncio
+import inspect
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from sql_agent.utils import metrics, tracing
+
+
+async def _probe(state):
+    async with tracing.span("db", "probe"):
+        pass
+    return {"intent": "DATABASE"}
+
+
+async def _fail(state):
+    raise ValueError("boom")
+
+
+@pytest.fixture
+def records():
+    collected = []
+    tracing.add_listener(collected.append)
+    yield collected
+    tracing.remove_listener(collected.append)
+
+
+def test_wrapper_exposes_config_to_langgraph():
+    # LangGraph solo pasa `config` si la firma visible lo declara (sin __wrapped__ hacia el nodo original)
+    wrapper = tracing.traced_node("probe", _probe)
+    assert "config" in inspect.signature(wrapper).parameters
+    assert not hasattr(wrapper, "__wrapped__")
+
+
+def test_node_publishes_thread_id_and_node_to_inner_spans(records):
+    wrapper = tracing.traced_node("probe", _probe)
+    asyncio.run(wrapper({"question": "x"}, config={"configurable": {"thread_id": "jid-42"}}))
+
+    assert [(r["kind"], r["name"]) for r in records] == [("db", "probe"), ("node", "probe")]
+    assert {r["thread_id"] for r in records} == {"jid-42"}
+    assert records[0]["node"] == "probe"
+    # La intención que define el propio nodo (router) etiqueta su span
+    assert records[1]["intent"] == "DATABASE"
+    assert tracing.current_thread.get() == "-" and tracing.current_node.get() == "-"
+
+
+def test_node_errors_are_recorded_and_reraised(records):
+    before = metrics.NODE_ERRORS.value(node="fail")
+    with pytest.raises(ValueError):
+        asyncio.run(tracing.traced_node("fail", _fail)({}, config={}))
+    assert records[-1]["error"] == "ValueError: boom"
+    assert metrics.NODE_ERRORS.value(node="fail") == before + 1